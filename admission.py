@@ -0,0 +1,174 @@
+import asyncio
+import json
+import math
+from contextvars import ContextVar
+
+from metrics import clock
+
+# ==========================================
+# ADMISSION CONTROL & LOAD SHEDDING
+# ==========================================
+# Saat pendaftaran PPDB dibuka, request bisa datang jauh lebih cepat dari
+# kemampuan worker. Tanpa batas, uvicorn menampung semuanya sampai klien
+# menyerah (app.py menunggu maks. 10 detik), jadi server menghitung
+# jawaban yang tidak lagi ditunggu siapa pun. Middleware ini:
+#
+#   1. Membatasi request yang diproses bersamaan (max_in_flight) dan
+#      antrean di belakangnya (max_queue). Antrean penuh = langsung 503.
+#   2. Membatasi lama menunggu di antrean (max_queue_wait_s, atau sisa
+#      deadline request kalau lebih pendek). Kalau perkiraan waktu tunggu
+#      sudah melewati deadline, request ditolak tanpa ikut antre.
+#   3. Deadline per request lewat header X-Request-Deadline-Ms (sisa waktu
+#      dalam milidetik, relatif terhadap saat request diterima). Handler
+#      memanggil deadline_exceeded() sebelum inferensi untuk membuang
+#      request yang sudah terlambat.
+#
+# Semua penolakan dijawab 503 + Retry-After (perkiraan detik sampai antrean
+# lega), jadi klien bisa mundur sebentar lalu mencoba lagi.
+
+DEADLINE_HEADER = b"x-request-deadline-ms"
+request_deadline = ContextVar("request_deadline", default=None)  # clock() ns, None = tanpa deadline
+
+
+def deadline_exceeded() -> bool:
+    """True kalau request ini punya deadline dan deadline-nya sudah lewat"""
+    deadline = request_deadline.get()
+    return deadline is not None and clock() >= deadline
+
+
+class AdmissionController:
+    """
+    Batas in-flight & antrean untuk endpoint prediksi (`routes`). Dipanggil dari
+    AdmissionMiddleware di event loop, jadi penghitung antrean cukup variabel
+    biasa (tanpa lock). max_in_flight=0 mematikan admission control.
+    on_shed(route, reason) & on_admit(route, wait_ns) dipanggil untuk metrik.
+    """
+
+    def __init__(self, routes=(), max_in_flight=32, max_queue=64, max_queue_wait_s=2.0,
+                 default_deadline_ms=None, on_shed=None, on_admit=None):
+        self.routes = set(routes)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_wait_ns = int(max_queue_wait_s * 1e9)
+        self.default_deadline_ms = default_deadline_ms
+        self.on_shed = on_shed
+        self.on_admit = on_admit
+
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = None  # asyncio.Semaphore, dibuat di event loop saat request pertama
+        self._service_ns = 5_000_000.0  # Rata-rata (EWMA) lama proses 1 request, awal 5 ms
+        self._stats = {"admitted": 0, "queued": 0, "shed": {}, "max_queue_depth": 0, "total_queue_ms": 0.0}
+
+    def _deadline(self, scope, start):
+        budget_ms = self.default_deadline_ms
+        for name, value in scope.get("headers", ()):
+            if name == DEADLINE_HEADER:
+                try:
+                    budget_ms = float(value)
+                except ValueError:
+                    pass
+                break
+        if budget_ms is None or not math.isfinite(budget_ms):
+            return None
+        return start + int(budget_ms * 1e6)
+
+    def expected_wait_ns(self, position) -> float:
+        """Perkiraan lama menunggu untuk posisi antrean ke-`position` (mulai 1)"""
+        return position * self._service_ns / self.max_in_flight
+
+    def retry_after_s(self) -> int:
+        return max(1, math.ceil(self.expected_wait_ns(self.waiting + 1) / 1e9))
+
+    async def handle(self, inner, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.routes or self.max_in_flight <= 0:
+            return await inner(scope, receive, send)
+
+        route = scope["path"]
+        start = clock()
+        deadline = self._deadline(scope, start)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        if self._slots.locked():
+            # Semua slot terpakai: antre, kecuali antrean penuh / deadline pasti terlewat
+            if self.waiting >= self.max_queue:
+                return await self._shed(send, route, "queue_full")
+            timeout_ns = self.max_queue_wait_ns
+            if deadline is not None:
+                remaining = deadline - start
+                if remaining <= 0 or self.expected_wait_ns(self.waiting + 1) > remaining:
+                    return await self._shed(send, route, "deadline")
+                timeout_ns = min(timeout_ns, remaining)
+
+            self.waiting += 1
+            self._stats["queued"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self.waiting)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout_ns / 1e9)
+            except asyncio.TimeoutError:
+                reason = "deadline" if deadline is not None and clock() >= deadline else "queue_timeout"
+                return await self._shed(send, route, reason)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        admitted = clock()
+        wait_ns = admitted - start
+        self._stats["admitted"] += 1
+        self._stats["total_queue_ms"] += wait_ns / 1e6
+        if self.on_admit is not None:
+            self.on_admit(route, wait_ns)
+
+        token = request_deadline.set(deadline)
+        self.in_flight += 1
+        try:
+            await inner(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            request_deadline.reset(token)
+            self._service_ns += 0.1 * ((clock() - admitted) - self._service_ns)
+
+    async def _shed(self, send, route, reason):
+        self._stats["shed"][reason] = self._stats["shed"].get(reason, 0) + 1
+        if self.on_shed is not None:
+            self.on_shed(route, reason)
+        body = json.dumps({"detail": "Server sedang penuh, coba lagi sebentar lagi.", "reason": reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after_s()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> dict:
+        """Metrik admission (untuk endpoint monitoring & menentukan kapasitas)"""
+        stats = {**self._stats, "shed": dict(self._stats["shed"])}
+        stats["in_flight"] = self.in_flight
+        stats["queue_depth"] = self.waiting
+        stats["avg_queue_ms"] = stats["total_queue_ms"] / stats["admitted"] if stats["admitted"] else 0.0
+        stats["avg_service_ms"] = self._service_ns / 1e6
+        stats["config"] = {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "max_queue_wait_ms": self.max_queue_wait_ns / 1e6,
+            "default_deadline_ms": self.default_deadline_ms,
+        }
+        return stats
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI tipis; state & statistik ada di AdmissionController supaya bisa dibaca endpoint"""
+
+    def __init__(self, inner, controller):
+        self.inner = inner
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        await self.controller.handle(self.inner, scope, receive, send)
@@ -1,8 +1,33 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Header, Depends, UploadFile, File, Body
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Annotated, Literal, Optional
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextvars import ContextVar
 import numpy as np
+import math
 import joblib
+import hashlib
+import hmac
 import os
+import atexit
+
+from admission import AdmissionController, AdmissionMiddleware, deadline_exceeded
+from hot_reload import ModelHolder
+from knn_engine import SklearnPredictor, top_n
+from lookup_table import LookupPredictor, with_lookup_table
+from metrics import CONTENT_TYPE, MetricsRegistry, clock
+from microbatch import MicroBatcher
+from model_bundle import BUNDLE_DIR, BundleSchemaError, current_version, load_bundle, set_current
+from model_registry import ModelRegistry, registry_key
+from profiling import ProfileStore, ProfilingMiddleware, profiled
+from result_cache import QUANTUM, ResultCache, make_key, quantize
+from whatif import SUBJECTS, grid_deltas, grid_size, minimum_change, what_if
+from wire_format import (MSGPACK_TYPE, WireFormatMiddleware, accepts_msgpack, compact_results, decode_scores,
+                         dumps_json, dumps_msgpack, msgpack)
 
 # ==========================================
 # 1. SETUP API & MODEL
@@ -13,39 +38,487 @@ app = FastAPI(
     version="2.0.0"
 )
 
+# Profiling per request (lihat profiling.py), mati secara default. Kalau aktif, semua
+# endpoint dibungkus supaya thread worker-nya bisa ikut disampel profiler.
+PROFILING = os.getenv("LOLOSIN_PROFILING", "0") == "1"
+PROFILE_RATE = float(os.getenv("LOLOSIN_PROFILE_RATE", "0"))  # Peluang request acak diprofil (mis. 0.001)
+profile_store = ProfileStore(os.getenv("LOLOSIN_PROFILE_DIR", "profiles"), keep=int(os.getenv("LOLOSIN_PROFILE_KEEP", "50")))
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+if PROFILING:
+    app.router.route_class = ProfiledRoute
+
+def artifact_version(paths) -> str:
+    """Versi model = hash isi file artefak, jadi berubah setiap kali training ulang"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def use_numpy_engine() -> bool:
+    return os.getenv("LOLOSIN_ENGINE", "numpy") == "numpy" and current_version(BUNDLE_DIR) is not None
+
+USE_LOOKUP_TABLE = os.getenv("LOLOSIN_LOOKUP_TABLE", "0") == "1"
+
+def bundle_predictor(bundle):
+    """Engine NumPy dari bundle, dibungkus lookup table versi ini kalau mode tabel aktif & tabelnya ada"""
+    engine = bundle.to_engine()
+    if USE_LOOKUP_TABLE:
+        # Jumlah baris yang dijawab tabel vs model, lihat LOOKUP_ROWS di bagian metrik
+        def count_rows(n_table, n_model, version=bundle.version):
+            LOOKUP_ROWS.inc(("table", version), n_table)
+            LOOKUP_ROWS.inc(("model", version), n_model)
+        return with_lookup_table(engine, bundle.version, on_rows=count_rows)
+    return engine
+
+def load_predictor(version=None):
+    """
+    LOLOSIN_ENGINE=numpy (default): bundle model_bundle/ dibuka sebagai memory-map,
+    dipakai bersama oleh semua worker, tanpa sklearn. version=None = versi aktif (CURRENT).
+    LOLOSIN_ENGINE=sklearn: file .pkl seperti sebelumnya.
+    Mengembalikan (predictor, versi_model).
+    """
+    if use_numpy_engine():
+        bundle = load_bundle(BUNDLE_DIR, version)
+        return bundle_predictor(bundle), bundle.version
+
+    pkl_files = ['model_knn_smp.pkl', 'scaler_smp.pkl']
+    predictor = SklearnPredictor(joblib.load(pkl_files[0]), joblib.load(pkl_files[1]))
+    return predictor, artifact_version(pkl_files)
+
+def artifact_marker():
+    """Penanda perubahan artefak untuk mode pantau file (isi CURRENT / waktu ubah file .pkl)"""
+    if use_numpy_engine():
+        return current_version(BUNDLE_DIR)
+    return tuple(os.stat(path).st_mtime_ns for path in ['model_knn_smp.pkl', 'scaler_smp.pkl'])
+
 print("Memuat Otak AI (Model & Scaler)...")
 try:
-    model = joblib.load('model_knn_smp.pkl')
-    scaler = joblib.load('scaler_smp.pkl')
-    print("✅ Model berhasil dimuat!")
+    # Semua request membaca model lewat models.get(), supaya bisa diganti tanpa restart
+    models = ModelHolder(load_predictor)
+    print(f"✅ Model berhasil dimuat! ({type(models.get().predictor).__name__}, versi {models.get().version})")
 except FileNotFoundError:
-    print("❌ FATAL ERROR: File model_knn_smp.pkl atau scaler_smp.pkl tidak ditemukan.")
+    print("❌ FATAL ERROR: Bundle model_bundle/ maupun file model_knn_smp.pkl / scaler_smp.pkl tidak ditemukan.")
     raise RuntimeError("Model files not found. Please run training script first.")
 
+# Mode pantau file: muat ulang otomatis saat training / /admin/reload mengganti CURRENT.
+# Default aktif kalau dijalankan dengan beberapa worker (WEB_CONCURRENCY > 1, dibaca uvicorn
+# & gunicorn), karena /admin/reload hanya diterima satu worker; worker lain ikut lewat pemantau ini.
+MULTI_WORKER = int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+if os.getenv("LOLOSIN_WATCH_MODEL", "1" if MULTI_WORKER else "0") == "1":
+    models.watch(artifact_marker, interval_s=float(os.getenv("LOLOSIN_WATCH_INTERVAL_S", "5")))
+    print("👀 Mode pantau model aktif.")
+
+# Registry model per wilayah & tahun ajaran. Model utama di atas (default: jakut/2025)
+# selalu dimuat; model lain dari model_registry/<wilayah>/<tahun>/ dimuat saat pertama
+# diminta dan dilepas (LRU) kalau total memorinya melebihi LOLOSIN_MODEL_MEMORY_MB.
+REGISTRY_DIR = os.getenv("LOLOSIN_REGISTRY_DIR", "model_registry")
+DEFAULT_KEY = registry_key(os.getenv("LOLOSIN_DEFAULT_REGION", "jakut"), os.getenv("LOLOSIN_DEFAULT_YEAR", "2025"))
+
+def registry_root(key: str) -> str:
+    return os.path.join(REGISTRY_DIR, *key.split("/"))
+
+def load_registry_predictor(key, version=None):
+    bundle = load_bundle(registry_root(key), version)
+    return bundle_predictor(bundle), bundle.version
+
+registry = ModelRegistry(
+    load_registry_predictor,
+    memory_budget_bytes=float(os.getenv("LOLOSIN_MODEL_MEMORY_MB", "512")) * 2**20,
+    pinned={DEFAULT_KEY: models},
+    usage_path=os.path.join(REGISTRY_DIR, "usage.json")
+)
+
+# Prefetch: kunci dari LOLOSIN_PREFETCH (mis. "jaksel/2025,jaktim/2025"), atau kunci yang
+# paling sering dipakai menurut usage.json dari proses sebelumnya
+prefetch_env = os.getenv("LOLOSIN_PREFETCH")
+if prefetch_env:
+    prefetch_keys = [registry_key(*item.strip().split("/", 1)) for item in prefetch_env.split(",") if item.strip()]
+else:
+    prefetch_keys = registry.most_used(int(os.getenv("LOLOSIN_PREFETCH_TOP", "3")))
+prefetch_keys = [key for key in prefetch_keys if key != DEFAULT_KEY and current_version(registry_root(key))]
+if prefetch_keys:
+    registry.prefetch(prefetch_keys)
+    print(f"📦 Prefetch model: {prefetch_keys}")
+registry.autosave_usage(float(os.getenv("LOLOSIN_USAGE_SAVE_S", "300")))
+atexit.register(registry.save_usage)
+
+def request_key(region: Optional[str], year: Optional[int]) -> str:
+    """Kunci registry dari parameter request; yang tidak diisi diambil dari model utama"""
+    if region is None and year is None:
+        return DEFAULT_KEY
+    default_region, default_year = DEFAULT_KEY.split("/")
+    try:
+        return registry_key(region or default_region, year or default_year)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
+
+def resolve_model(region: Optional[str], year: Optional[int]):
+    """(ActiveModel, kunci) untuk wilayah/tahun yang diminta; tanpa keduanya = model utama"""
+    key = request_key(region, year)
+    if key != DEFAULT_KEY and current_version(registry_root(key)) is None:
+        raise HTTPException(status_code=404, detail=f"Model untuk '{key}' belum tersedia.")
+    try:
+        return registry.get(key), key
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"Error loading model {key}: {e}")
+        raise HTTPException(status_code=503, detail=f"Model untuk '{key}' gagal dimuat.")
+
+# Metrik Prometheus (GET /metrics). Penulisan metrik tanpa lock (per thread), jadi aman
+# dibiarkan aktif di production.
+metrics = MetricsRegistry()
+REQUESTS = metrics.counter("lolosin_requests_total", "Jumlah request HTTP per endpoint & status", ("route", "method", "status"))
+REQUEST_LATENCY = metrics.histogram("lolosin_request_duration_seconds", "Latensi request HTTP end-to-end", ("route", "method"))
+IN_FLIGHT = metrics.gauge("lolosin_requests_in_flight", "Request yang sedang diproses", ("route",))
+STAGE_LATENCY = metrics.histogram("lolosin_stage_duration_seconds", "Latensi per tahap prediksi", ("stage", "model_version"))
+PREDICTIONS = metrics.counter("lolosin_predictions_total", "Jumlah siswa yang diprediksi", ("model_version",))
+LOOKUP_ROWS = metrics.counter("lolosin_lookup_rows_total", "Siswa yang dijawab lookup table vs dihitung model", ("source", "model_version"))
+ERRORS = metrics.counter("lolosin_prediction_errors_total", "Error saat prediksi", ("route", "kind"))
+MODEL_INFO = metrics.gauge("lolosin_model_info", "Model yang sedang dimuat (nilai selalu 1)", ("model_key", "model_version", "engine"))
+MODEL_INFO.set_function(lambda: {
+    (key, active.version, type(active.predictor).__name__): 1 for key, active in registry.loaded_models().items()
+})
+request_start = ContextVar("request_start", default=None)
+
+class MetricsMiddleware:
+    """Middleware ASGI: latensi end-to-end, jumlah request per status & request in-flight per endpoint"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.routes = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.inner(scope, receive, send)
+        if self.routes is None:
+            self.routes = {route.path for route in app.routes}
+        # Path di luar endpoint yang terdaftar digabung jadi "other" supaya jumlah label tidak meledak
+        route = scope["path"] if scope["path"] in self.routes else "other"
+        method = scope["method"]
+        status = 500
+        start = clock()
+        request_start.set(start)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc((route,))
+        try:
+            await self.inner(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec((route,))
+            REQUEST_LATENCY.observe_since((route, method), start)
+            REQUESTS.inc((route, method, str(status)))
+
+# Admission control (load shedding) untuk endpoint prediksi, lihat admission.py.
+# Dipasang sebelum MetricsMiddleware, jadi request yang ditolak (503) tetap tercatat di metrik.
+SHED = metrics.counter("lolosin_requests_shed_total", "Request yang ditolak karena server penuh / deadline", ("route", "reason"))
+QUEUE_TIME = metrics.histogram("lolosin_admission_queue_seconds", "Lama menunggu slot sebelum diproses", ("route",))
+def on_admit(route, wait_ns):
+    """Request lolos admission: catat lama antre, lalu mulai ulang jam tahap parse_validate"""
+    QUEUE_TIME.observe_ns((route,), wait_ns)
+    request_start.set(clock())
+
+admission = AdmissionController(
+    # Jalur msgpack internal ikut didaftarkan: biasanya dicapai lewat WireFormatMiddleware (sudah
+    # melewati admission sebagai /predict), tapi tetap bisa dipanggil langsung
+    routes=("/predict", "/predict/batch", "/predict/upload", "/predict/whatif", "/predict/target",
+            "/predict/msgpack", "/predict/batch/msgpack"),
+    max_in_flight=int(os.getenv("LOLOSIN_MAX_IN_FLIGHT", "32")),   # 0 = admission control mati
+    max_queue=int(os.getenv("LOLOSIN_MAX_QUEUE", "64")),
+    max_queue_wait_s=float(os.getenv("LOLOSIN_MAX_QUEUE_WAIT_MS", "2000")) / 1000,
+    default_deadline_ms=float(os.environ["LOLOSIN_DEFAULT_DEADLINE_MS"]) if os.getenv("LOLOSIN_DEFAULT_DEADLINE_MS") else None,
+    on_shed=lambda route, reason: SHED.inc((route, reason)),
+    on_admit=on_admit
+)
+ADMISSION_QUEUE = metrics.gauge("lolosin_admission_queue_depth", "Request yang sedang menunggu slot", ())
+ADMISSION_QUEUE.set_function(lambda: {(): admission.waiting})
+# Request msgpack ke /predict & /predict/batch diarahkan ke endpoint pasangannya (lihat wire_format.py)
+app.add_middleware(WireFormatMiddleware, routes={"/predict": "/predict/msgpack", "/predict/batch": "/predict/batch/msgpack"})
+app.add_middleware(AdmissionMiddleware, controller=admission)
+app.add_middleware(MetricsMiddleware)
+if PROFILING:
+    # Paling luar: profil mencakup waktu antre admission, metrik & format data
+    app.add_middleware(ProfilingMiddleware, store=profile_store, rate=PROFILE_RATE,
+                       interval_s=float(os.getenv("LOLOSIN_PROFILE_INTERVAL_MS", "1")) / 1000,
+                       admin_token=os.getenv("LOLOSIN_ADMIN_TOKEN"))
+
+def check_deadline(route: str):
+    """Buang request yang deadline-nya (header X-Request-Deadline-Ms) sudah lewat, sebelum inferensi"""
+    if deadline_exceeded():
+        SHED.inc((route, "expired"))
+        raise HTTPException(status_code=503, detail="Deadline request sudah terlewat.",
+                            headers={"Retry-After": str(admission.retry_after_s())})
+
+def observe_validation(active, entered) -> int:
+    """
+    Catat tahap parse JSON + validasi Pydantic: dari request lolos admission sampai handler
+    mulai (`entered`, diambil sebelum resolve_model), jadi antrean & pemuatan model tidak ikut
+    terhitung. Kembalikan waktu sekarang sebagai awal tahap berikutnya.
+    """
+    start = request_start.get()
+    if start is not None:
+        STAGE_LATENCY.observe_ns(("parse_validate", active.version), entered - start)
+    return clock()
+
+def render_json(payload, active) -> Response:
+    """Serialisasi JSON (orjson) secara eksplisit supaya waktunya ikut terukur"""
+    start = clock()
+    response = Response(dumps_json(payload), media_type="application/json")
+    STAGE_LATENCY.observe_since(("serialize", active.version), start)
+    return response
+
+def json_safe(value):
+    """NaN / Infinity -> string, karena JSON tidak punya literal untuk keduanya"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(v) for v in value]
+    return value
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request, exc):
+    """422 standar FastAPI; input NaN/Infinity yang ditolak ditampilkan sebagai string"""
+    return Response(dumps_json({"detail": json_safe(jsonable_encoder(exc.errors()))}),
+                    status_code=422, media_type="application/json")
+
+def render_compact(results, active, key, single=False) -> Response:
+    """Balasan msgpack ringkas: ID sekolah (lihat GET /schools) + probabilitas + statistik"""
+    start = clock()
+    payload = compact_results(results, school_index(active, key), active.version, single)
+    response = Response(dumps_msgpack(payload), media_type=MSGPACK_TYPE)
+    STAGE_LATENCY.observe_since(("serialize", active.version), start)
+    return response
+
+# Tabel nama sekolah -> ID per (kunci model, versi); versi lama dibuang saat tabel bertambah
+_school_indexes = {}
+
+def school_index(active, key) -> dict:
+    index = _school_indexes.get((key, active.version))
+    if index is None:
+        if len(_school_indexes) >= 16:
+            _school_indexes.clear()
+        index = {name: i for i, name in enumerate(active.predictor.classes_)}
+        _school_indexes[(key, active.version)] = index
+    return index
+
+def wants_compact(accept: Optional[str], msgpack_request: bool) -> bool:
+    """Balasan msgpack kalau diminta lewat Accept, atau request-nya msgpack dan klien tidak minta JSON"""
+    if accepts_msgpack(accept):
+        return True
+    return msgpack_request and (accept is None or "application/json" not in accept.lower())
+
+def require_msgpack():
+    if msgpack is None:
+        raise HTTPException(status_code=415, detail="Format msgpack tidak tersedia di server (pip install msgpack).")
+
+ADMIN_TOKEN = os.getenv("LOLOSIN_ADMIN_TOKEN")
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Endpoint /admin/* hanya aktif kalau LOLOSIN_ADMIN_TOKEN diset, dan header X-Admin-Token harus cocok"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Endpoint admin nonaktif (LOLOSIN_ADMIN_TOKEN belum diset).")
+    # Header dibaca Starlette sebagai latin-1; dibandingkan sebagai bytes mentah karena
+    # compare_digest menolak str non-ASCII (TypeError -> 500)
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode("latin-1"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Token admin tidak valid.")
+
+TOP_N = 6            # Jumlah sekolah yang direkomendasikan
+N_SEMESTER = 5       # Kls 4 Smt 1 s.d. Kls 6 Smt 1
+MAX_BATCH_SIZE = 1000
+UPLOAD_CHUNK_ROWS = 1000  # Ukuran potongan saat menilai file upload
+MAX_WHATIF_SCENARIOS = 2000  # Batas jumlah skenario per request /predict/whatif
+MAX_TARGET_CHANGE = 40.0  # Batas total perubahan rata-rata (poin) yang dicari /predict/target
+MAX_TARGET_STEPS = 40     # Batas max_change / step (jumlah langkah), menentukan ukuran grid pencarian
+MAX_UPDATE_ROWS = 100_000  # Batas alumni baru per request /admin/update
+
 # ==========================================
 # 2. DEFINISI STRUKTUR DATA (Pydantic)
 # ==========================================
 # Ini seperti formulir pemesanan, memastikan data yang masuk sesuai standar.
+# Tepat 5 nilai per mapel, dicek langsung oleh Pydantic saat parsing (422 kalau tidak sesuai)
+# Setiap nilai harus angka 0-100: NaN/Infinity (json.loads menerimanya) ditolak dengan 422
+Score = Annotated[float, Field(ge=0, le=100, allow_inf_nan=False)]
+SemesterScores = Annotated[list[Score], Field(min_length=N_SEMESTER, max_length=N_SEMESTER)]
+# Pergeseran rata-rata per mapel untuk /predict/whatif, aturan NaN/Infinity sama dengan Score
+Delta = Annotated[float, Field(ge=-100, le=100, allow_inf_nan=False)]
+
 class RaporInput(BaseModel):
     # List nilai per mapel (Semester 1 s.d. 5)
-    pkn_scores: list[float]
-    ind_scores: list[float]
-    mat_scores: list[float]
-    ipa_scores: list[float]
-
-    class Config:
-        # Contoh data untuk dokumentasi API (Swagger UI)
-        json_schema_extra = {
-            "example": {
-                "pkn_scores": [85.0, 86.0, 85.0, 87.0, 88.0],
-                "ind_scores": [88.0, 89.0, 88.0, 88.0, 89.0],
-                "mat_scores": [90.0, 90.0, 92.0, 91.0, 92.0],
-                "ipa_scores": [89.0, 90.0, 90.0, 91.0, 90.0]
-            }
+    pkn_scores: SemesterScores
+    ind_scores: SemesterScores
+    mat_scores: SemesterScores
+    ipa_scores: SemesterScores
+
+    # Contoh data untuk dokumentasi API (Swagger UI)
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "pkn_scores": [85.0, 86.0, 85.0, 87.0, 88.0],
+            "ind_scores": [88.0, 89.0, 88.0, 88.0, 89.0],
+            "mat_scores": [90.0, 90.0, 92.0, 91.0, 92.0],
+            "ipa_scores": [89.0, 90.0, 90.0, 91.0, 90.0]
+        }
+    })
+
+class BatchRaporInput(BaseModel):
+    # Satu kelas / satu sekolah sekaligus
+    students: Annotated[list[RaporInput], Field(min_length=1, max_length=MAX_BATCH_SIZE)]
+
+class WhatIfInput(BaseModel):
+    # Rapor dasar + skenario pergeseran rata-rata per mapel (dalam poin)
+    rapor: RaporInput
+    deltas: Optional[Annotated[list[Annotated[list[Delta], Field(min_length=4, max_length=4)]],
+                               Field(max_length=MAX_WHATIF_SCENARIOS)]] = None  # [pkn, ind, mat, ipa] per skenario
+    grid: Optional[dict[Literal["pkn", "ind", "mat", "ipa"],
+                        Annotated[list[Delta], Field(max_length=MAX_WHATIF_SCENARIOS)]]] = None  # semua kombinasi delta per mapel
+
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "rapor": RaporInput.model_config["json_schema_extra"]["example"],
+            "grid": {"mat": [0, 1, 2, 3, 4, 5], "ipa": [0, 2]}
+        }
+    })
+
+class TargetInput(BaseModel):
+    # Rapor dasar + sekolah yang ingin dicapai
+    rapor: RaporInput
+    school_name: str
+    max_change: float = Field(default=20.0, gt=0, le=MAX_TARGET_CHANGE)  # total poin perubahan yang dicari
+    step: float = Field(default=0.5, ge=0.25, le=5.0)  # kelipatan perubahan per mapel
+    allow_decrease: bool = False  # False: hanya menaikkan nilai
+
+    @model_validator(mode="after")
+    def limit_steps(self):
+        if self.max_change / self.step > MAX_TARGET_STEPS:
+            raise ValueError(f"max_change / step maksimal {MAX_TARGET_STEPS} langkah "
+                             f"(mis. step={self.max_change / MAX_TARGET_STEPS:g} untuk max_change={self.max_change:g}).")
+        return self
+
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "rapor": RaporInput.model_config["json_schema_extra"]["example"],
+            "school_name": "SMP NEGERI 30"
+        }
+    })
+
+class AlumniInput(BaseModel):
+    # Satu alumni baru: sekolah yang diterima + rata-rata 5 semester per mapel
+    school_name: str
+    avg_pkn: Score
+    avg_ind: Score
+    avg_mat: Score
+    avg_ipa: Score
+
+class AlumniUpdateInput(BaseModel):
+    alumni: list[AlumniInput]
+    activate: bool = True  # False: terbitkan versi baru tanpa menggantikan versi aktif
+
+# ==========================================
+# 3. LOGIKA PREDIKSI (Dipakai /predict & /predict/batch)
+# ==========================================
+def rapor_to_features(students: list[RaporInput]) -> np.ndarray:
+    """Ubah daftar rapor jadi matriks rata-rata (n_siswa x 4) dengan urutan [PKN, IND, MAT, IPA]"""
+    scores = np.array(
+        [[s.pkn_scores, s.ind_scores, s.mat_scores, s.ipa_scores] for s in students],
+        dtype=np.float64
+    )
+    # (n_siswa, 4 mapel, 5 semester) -> rata-rata per mapel
+    return scores.mean(axis=2)
+
+def feature_statistics(features: np.ndarray) -> list[dict]:
+    """Rata-rata per mapel + statistik tambahan (untuk info visual di frontend), satu dict per siswa"""
+    consistency = np.std(features, axis=1)
+    min_score = np.min(features, axis=1)
+    return [
+        {
+            "avg_pkn": float(avg_pkn),
+            "avg_ind": float(avg_ind),
+            "avg_mat": float(avg_mat),
+            "avg_ipa": float(avg_ipa),
+            "consistency_std": float(consistency[i]),
+            "min_score": float(min_score[i])
         }
+        for i, (avg_pkn, avg_ind, avg_mat, avg_ipa) in enumerate(features)
+    ]
+
+def recommend_batch(features: np.ndarray, active=None) -> list[dict]:
+    """Satu kali normalisasi + k-NN untuk seluruh batch, lalu rakit balasan per siswa"""
+    # Model diambil sekali di awal: kalau ada reload di tengah jalan, batch ini tetap pakai model lama
+    active = active or models.get()
+
+    # Normalisasi + prediksi, lalu ambil Top-N sekaligus
+    version = active.version
+    t = clock()
+    if isinstance(active.predictor, LookupPredictor):
+        # Mode lookup table: titik grid dibaca dari tabel, sisanya dihitung model
+        top_idx, top_probs = active.predictor.recommend(features, TOP_N)
+        t = STAGE_LATENCY.observe_since(("lookup", version), t)
+    else:
+        probs = active.predictor.predict_proba(features)
+        t = STAGE_LATENCY.observe_since(("predict_proba", version), t)
+        top_idx, top_probs = top_n(probs, TOP_N)
+        t = STAGE_LATENCY.observe_since(("top_n", version), t)
+    classes = active.predictor.classes_
+
+    results = []
+    stats = feature_statistics(features)
+    for i in range(len(features)):
+        results.append({
+            "status": "success",
+            "statistics": stats[i],
+            "recommendations": [
+                {
+                    "school_name": classes[idx],
+                    "probability": float(prob) # Ubah ke float biar bisa jadi JSON
+                }
+                for idx, prob in zip(top_idx[i], top_probs[i])
+            ],
+            "model_version": active.version
+        })
+    STAGE_LATENCY.observe_since(("build_response", version), t)
+    PREDICTIONS.inc((version,), len(features))
+    return results
+
+# Mode micro-batching (opsional): aktifkan dengan LOLOSIN_MICROBATCH=1
+# Request /predict yang datang bersamaan dihitung sekaligus dalam satu batch.
+batcher = None
+if os.getenv("LOLOSIN_MICROBATCH", "0") == "1":
+    batcher = MicroBatcher(
+        recommend_batch,
+        max_batch_size=int(os.getenv("LOLOSIN_BATCH_MAX", "64")),
+        max_wait_ms=float(os.getenv("LOLOSIN_BATCH_WINDOW_MS", "5")),
+        timeout_s=float(os.getenv("LOLOSIN_BATCH_TIMEOUT_S", "5"))
+    )
+    print(f"⚡ Micro-batching aktif: {batcher.stats()['config']}")
+
+# Cache hasil prediksi (LRU). LOLOSIN_CACHE_SIZE=0 untuk mematikan.
+result_cache = None
+cache_size = int(os.getenv("LOLOSIN_CACHE_SIZE", "4096"))
+CACHE_QUANTUM = float(os.getenv("LOLOSIN_CACHE_QUANTUM", str(QUANTUM)))  # 0 = tanpa kuantisasi
+if cache_size > 0:
+    result_cache = ResultCache(max_size=cache_size)
+    result_cache.set_version(models.get().version)
+
+def score_one(features: np.ndarray, active, key=DEFAULT_KEY) -> dict:
+    """Hitung rekomendasi 1 siswa, lewat micro-batcher kalau mode itu aktif"""
+    if batcher is not None and key == DEFAULT_KEY:
+        # Mode micro-batching: digabung dengan request lain yang datang bersamaan
+        return batcher.submit(features[0])
+    return recommend_batch(features, active)[0]
 
 # ==========================================
-# 3. ENDPOINT API
+# 4. ENDPOINT API
 # ==========================================
 
 @app.get("/")
@@ -53,67 +526,424 @@ def read_root():
     return {"status": "online", "message": "Lolosin.ai API is running smooth!"}
 
 @app.post("/predict")
-def predict_school(data: RaporInput):
+def predict_school(data: RaporInput, region: Optional[str] = None, year: Optional[int] = None,
+                   accept: Optional[str] = Header(default=None)):
     """
     Menerima 5 nilai per mapel, menghitung rata-rata, dan mengembalikan 6 rekomendasi sekolah.
+    region & year (opsional, mis. ?region=jaksel&year=2025) memilih model wilayah/tahun lain.
+    Body msgpack (Content-Type: application/msgpack, 20 angka) & balasan msgpack ringkas
+    (Accept: application/msgpack) juga diterima, lihat wire_format.py.
     """
+    entered = clock()
+    active, key = resolve_model(region, year)
+    check_deadline("/predict")
+    t = observe_validation(active, entered)
+    features = rapor_to_features([data])
+    STAGE_LATENCY.observe_since(("features", active.version), t)
+    return predict_features(features, active, key, wants_compact(accept, False))
+
+@app.post("/predict/msgpack", include_in_schema=False)
+def predict_school_msgpack(body: bytes = Body(...), region: Optional[str] = None, year: Optional[int] = None,
+                           accept: Optional[str] = Header(default=None)):
+    """/predict dengan body msgpack (diarahkan ke sini oleh WireFormatMiddleware)"""
+    require_msgpack()
+    entered = clock()
+    active, key = resolve_model(region, year)
+    check_deadline("/predict")
+    t = observe_validation(active, entered)
     try:
-        # A. Validasi Input
-        # Pastikan setiap mapel punya tepat 5 nilai (Kls 4 Smt 1 s.d. Kls 6 Smt 1)
-        if any(len(scores) != 5 for scores in [data.pkn_scores, data.ind_scores, data.mat_scores, data.ipa_scores]):
-            raise HTTPException(status_code=400, detail="Setiap mata pelajaran harus memiliki tepat 5 nilai semester.")
-
-        # B. Hitung Rata-rata (Preprocessing)
-        avg_pkn = np.mean(data.pkn_scores)
-        avg_ind = np.mean(data.ind_scores)
-        avg_mat = np.mean(data.mat_scores)
-        avg_ipa = np.mean(data.ipa_scores)
-        
-        # C. Hitung Statistik Tambahan (Untuk Info Visual di Frontend)
-        base_features = np.array([avg_pkn, avg_ind, avg_mat, avg_ipa])
-        consistency = np.std(base_features)
-        min_score = np.min(base_features)
-
-        # D. Prediksi AI
-        # Siapkan data input model (Hanya 4 Rata-rata Murni)
-        final_input = np.array([[avg_pkn, avg_ind, avg_mat, avg_ipa]])
-        # Normalisasi
-        input_scaled = scaler.transform(final_input)
-        # Minta model berpikir
-        probs = model.predict_proba(input_scaled)[0]
-        classes = model.classes_
-
-        # E. Ambil Top 6 Hasil
-        sorted_indices = np.argsort(probs)[::-1][:6]
-        
-        recommendations = []
-        for idx in sorted_indices:
-            recommendations.append({
-                "school_name": classes[idx],
-                "probability": float(probs[idx]) # Ubah ke float biar bisa jadi JSON
-            })
-
-        # F. Kirim Balasan ke Frontend
-        return {
-            "status": "success",
-            "statistics": {
-                "avg_pkn": float(avg_pkn),
-                "avg_ind": float(avg_ind),
-                "avg_mat": float(avg_mat),
-                "avg_ipa": float(avg_ipa),
-                "consistency_std": float(consistency),
-                "min_score": float(min_score)
-            },
-            "recommendations": recommendations
-        }
+        features = decode_scores(body, batch=False).mean(axis=2)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    STAGE_LATENCY.observe_since(("features", active.version), t)
+    return predict_features(features, active, key, wants_compact(accept, True))
+
+def predict_features(features: np.ndarray, active, key, compact: bool) -> Response:
+    """Jalur bersama /predict (JSON & msgpack): cache hasil -> micro-batcher / k-NN -> balasan"""
+    # Satu siswa = batch berisi 1 baris, jadi jalurnya sama persis dengan /predict/batch
+    try:
+        if result_cache is None:
+            result = score_one(features, active, key)
+        else:
+            # Rata-rata dikuantisasi ke grid CACHE_QUANTUM, lalu tiap titik grid cukup dihitung sekali
+            # per versi model (hasil versi lama dibuang begitu model tersebut berganti versi).
+            # Statistik di balasan tetap dari rata-rata asli siswa ini.
+            result_cache.set_version(active.version, None if key == DEFAULT_KEY else key)
+            grid = quantize(features, CACHE_QUANTUM)
+            result = result_cache.get_or_compute(make_key(grid[0], active.version, CACHE_QUANTUM),
+                                                 lambda: score_one(grid, active, key))
+            result = {**result, "statistics": feature_statistics(features)[0]}
+        if compact:
+            return render_compact([result], active, key, single=True)
+        return render_json(result, active)
 
+    except FutureTimeoutError:
+        ERRORS.inc(("/predict", "timeout"))
+        raise HTTPException(status_code=503, detail="Server sedang sibuk, silakan coba lagi.")
     except Exception as e:
         # Tangkap error tak terduga
+        ERRORS.inc(("/predict", type(e).__name__))
         print(f"Error during prediction: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict/batch")
+def predict_school_batch(data: BatchRaporInput, region: Optional[str] = None, year: Optional[int] = None,
+                         accept: Optional[str] = Header(default=None)):
+    """
+    Versi massal dari /predict: satu kelas sekaligus dalam satu request (maks. 1000 siswa).
+    Hasil per siswa sama strukturnya dengan /predict, urutannya sama dengan input.
+    """
+    entered = clock()
+    active, key = resolve_model(region, year)
+    check_deadline("/predict/batch")
+    t = observe_validation(active, entered)
+    features = rapor_to_features(data.students)
+    STAGE_LATENCY.observe_since(("features", active.version), t)
+    return predict_batch_features(features, active, key, wants_compact(accept, False))
+
+@app.post("/predict/batch/msgpack", include_in_schema=False)
+def predict_school_batch_msgpack(body: bytes = Body(...), region: Optional[str] = None, year: Optional[int] = None,
+                                 accept: Optional[str] = Header(default=None)):
+    """/predict/batch dengan body msgpack (daftar 20 angka per siswa)"""
+    require_msgpack()
+    entered = clock()
+    active, key = resolve_model(region, year)
+    check_deadline("/predict/batch")
+    t = observe_validation(active, entered)
+    try:
+        scores = decode_scores(body, batch=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(scores) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_BATCH_SIZE} siswa per request.")
+    features = scores.mean(axis=2)
+    STAGE_LATENCY.observe_since(("features", active.version), t)
+    return predict_batch_features(features, active, key, wants_compact(accept, True))
+
+def predict_batch_features(features: np.ndarray, active, key, compact: bool) -> Response:
+    try:
+        results = recommend_batch(features, active)
+        if compact:
+            return render_compact(results, active, key)
+        return render_json({"status": "success", "count": len(results), "model_version": active.version,
+                            "results": results}, active)
+
+    except Exception as e:
+        ERRORS.inc(("/predict/batch", type(e).__name__))
+        print(f"Error during batch prediction: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def score_upload(reader, active, fmt: str):
+    """Nilai file per potongan dan hasilkan baris NDJSON/CSV begitu potongannya selesai"""
+    from bulk_scoring import csv_header, csv_line, error_record, ndjson_line
+    if fmt == "csv":
+        yield csv_header(TOP_N)
+    for numbers, features, ids, errors in reader.chunks(UPLOAD_CHUNK_ROWS):
+        valid = [i for i, error in enumerate(errors) if error is None]
+        results = iter(recommend_batch(features[valid], active)) if valid else iter(())
+        lines = []
+        for number, student_id, error in zip(numbers, ids, errors):
+            if error is None:
+                record = {"row": number, "student_id": student_id, **next(results)}
+            else:
+                ERRORS.inc(("/predict/upload", "invalid_row"))
+                record = error_record(number, student_id, error)
+            lines.append(csv_line(record, TOP_N) if fmt == "csv" else ndjson_line(record))
+        yield "".join(lines)
+
+@app.post("/predict/upload")
+def predict_school_upload(file: UploadFile = File(...), format: str = "ndjson",
+                          region: Optional[str] = None, year: Optional[int] = None):
+    """
+    Upload rapor satu angkatan (.csv / .xlsx, kolom pkn_1..pkn_5, ind_1..ind_5, mat_1..mat_5,
+    ipa_1..ipa_5, opsional student_id / nisn / nama). File dinilai per potongan dan hasilnya
+    dikirim bertahap sebagai NDJSON (default) atau CSV (?format=csv), urut sesuai baris file.
+    Baris yang rusak dilaporkan sebagai status "error" tanpa menghentikan baris lain.
+    """
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format hasil harus 'ndjson' atau 'csv'.")
+    # bulk_scoring memuat pandas (~150 ms), jadi baru diimpor saat upload pertama, bukan saat start
+    from bulk_scoring import RaporReader
+    active, key = resolve_model(region, year)
+    check_deadline("/predict/upload")
+    try:
+        reader = RaporReader(file.file, file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"File tidak bisa dibaca: {e}")
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(score_upload(reader, active, format), media_type=media_type,
+                             headers={"X-Model-Version": active.version})
+
+@app.post("/predict/whatif")
+def predict_what_if(data: WhatIfInput, region: Optional[str] = None, year: Optional[int] = None):
+    """
+    Simulasi "kalau nilai naik/turun": rata-rata dasar digeser dengan setiap skenario
+    (`deltas` daftar [pkn, ind, mat, ipa] dan/atau `grid` kombinasi delta per mapel),
+    semuanya dinilai dalam satu batch. Balasan: Top-6 per skenario dan peringkat &
+    probabilitas setiap sekolah yang pernah masuk Top-6 di sepanjang skenario.
+    """
+    if not data.deltas and not data.grid:
+        raise HTTPException(status_code=400, detail="Isi 'deltas' atau 'grid' dengan minimal satu skenario.")
+    # Jumlah skenario dicek sebelum kombinasi grid dibuat
+    if len(data.deltas or ()) + (grid_size(data.grid) if data.grid else 0) > MAX_WHATIF_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_WHATIF_SCENARIOS} skenario per request.")
+    parts = [np.asarray(data.deltas, dtype=np.float64).reshape(-1, 4)] if data.deltas else []
+    if data.grid:
+        parts.append(grid_deltas(data.grid))
+    deltas = np.vstack(parts)
+
+    entered = clock()
+    active, key = resolve_model(region, year)
+    check_deadline("/predict/whatif")
+    t = observe_validation(active, entered)
+    base = rapor_to_features([data.rapor])[0]
+    report = what_if(active.predictor, base, deltas, TOP_N)
+    t = STAGE_LATENCY.observe_since(("whatif", active.version), t)
+
+    classes = active.predictor.classes_
+    def recommendations(row):
+        return [{"school_name": classes[idx], "probability": float(prob)}
+                for idx, prob in zip(report.top_idx[row], report.top_probs[row])]
+
+    payload = {
+        "status": "success",
+        "model_version": active.version,
+        "base": {"averages": dict(zip(SUBJECTS, report.features[0].tolist())), "recommendations": recommendations(0)},
+        "scenarios": [
+            {
+                "delta": dict(zip(SUBJECTS, deltas[i].tolist())),
+                "averages": dict(zip(SUBJECTS, report.features[i + 1].tolist())),
+                "recommendations": recommendations(i + 1)
+            }
+            for i in range(len(deltas))
+        ],
+        # Per sekolah: nilai di rata-rata dasar + deret per skenario (urutan sama dengan "scenarios")
+        "schools": [
+            {
+                "school_name": classes[c],
+                "base_rank": int(report.ranks[0, j]),
+                "base_probability": float(report.probabilities[0, j]),
+                "ranks": report.ranks[1:, j].tolist(),
+                "probabilities": report.probabilities[1:, j].tolist()
+            }
+            for j, c in enumerate(report.tracked)
+        ]
+    }
+    STAGE_LATENCY.observe_since(("build_response", active.version), t)
+    PREDICTIONS.inc((active.version,), len(report.features))
+    return render_json(payload, active)
+
+@app.post("/predict/target")
+def predict_target(data: TargetInput, region: Optional[str] = None, year: Optional[int] = None):
+    """
+    Kebalikan /predict: perubahan rata-rata terkecil (total poin) yang membuat
+    `school_name` masuk Top-6. Lihat minimum_change() di whatif.py untuk cara pencariannya.
+    found=false kalau tidak tercapai dalam `max_change` poin, atau kalau grid pencariannya
+    terlalu besar (search.truncated=true; perbesar `step` atau perkecil `max_change`).
+    """
+    entered = clock()
+    active, key = resolve_model(region, year)
+    classes = active.predictor.classes_
+    matches = np.flatnonzero(np.asarray(classes) == data.school_name.strip())
+    if not len(matches):
+        raise HTTPException(status_code=404, detail=f"Sekolah '{data.school_name}' tidak ada di model ini.")
+    check_deadline("/predict/target")
+    t = observe_validation(active, entered)
+    base = rapor_to_features([data.rapor])[0]
+    report = minimum_change(active.predictor, base, int(matches[0]), TOP_N, step=data.step,
+                            max_change=data.max_change, allow_decrease=data.allow_decrease)
+    t = STAGE_LATENCY.observe_since(("target_search", active.version), t)
+
+    payload = {
+        "status": "success",
+        "model_version": active.version,
+        "school_name": classes[matches[0]],
+        "found": report.found,
+        "current_averages": dict(zip(SUBJECTS, base.tolist())),
+        "search": {"evaluated": report.evaluated, "pruned": report.pruned, "truncated": report.truncated}
+    }
+    if report.found:
+        payload.update({
+            "total_change": float(np.abs(report.delta).sum()),
+            "delta": dict(zip(SUBJECTS, report.delta.tolist())),
+            "required_averages": dict(zip(SUBJECTS, report.features.tolist())),
+            "rank": report.rank,
+            "probability": report.probability,
+            "recommendations": [
+                {"school_name": classes[idx], "probability": float(prob)}
+                for idx, prob in zip(report.top_idx, report.top_probs)
+            ]
+        })
+    STAGE_LATENCY.observe_since(("build_response", active.version), t)
+    PREDICTIONS.inc((active.version,), report.evaluated + 1)
+    return render_json(payload, active)
+
+@app.get("/schools")
+def school_table(region: Optional[str] = None, year: Optional[int] = None,
+                 accept: Optional[str] = Header(default=None), if_none_match: Optional[str] = Header(default=None)):
+    """
+    Tabel nama sekolah untuk school_ids di balasan msgpack (indeks = ID). Tabel hanya
+    berubah kalau versi model berubah, jadi klien cukup menyimpannya per model_version
+    (ETag = versi model, If-None-Match -> 304).
+    """
+    active, key = resolve_model(region, year)
+    etag = f'"{key}@{active.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    payload = {"model_key": key, "model_version": active.version, "schools": list(active.predictor.classes_)}
+    if accepts_msgpack(accept):
+        require_msgpack()
+        return Response(dumps_msgpack(payload), media_type=MSGPACK_TYPE, headers=headers)
+    return Response(dumps_json(payload), media_type="application/json", headers=headers)
+
+@app.get("/status")
+def model_status():
+    """Versi model yang sedang aktif & status reload terakhir"""
+    return models.status()
+
+@app.post("/admin/reload", status_code=202, dependencies=[Depends(require_admin)])
+def reload_model(version: Optional[str] = None, wait: bool = False,
+                 region: Optional[str] = None, year: Optional[int] = None):
+    """
+    Muat ulang model tanpa restart. Model baru dimuat & dipanaskan di belakang layar,
+    request yang sedang berjalan tetap selesai dengan model lama.
+    version: versi bundle tertentu (mis. untuk rollback), default versi aktif di CURRENT.
+             Versi ini juga ditulis ke CURRENT, jadi restart / worker lain memakai versi yang sama.
+    wait=true: tunggu sampai selesai dan kembalikan versi barunya.
+    region & year: reload model wilayah/tahun di registry (default: model utama).
+
+    Dengan beberapa worker, request ini hanya me-reload worker yang menerimanya. Worker lain
+    mengikuti perubahan CURRENT lewat mode pantau (LOLOSIN_WATCH_MODEL=1, default aktif kalau
+    WEB_CONCURRENCY > 1) dalam LOLOSIN_WATCH_INTERVAL_S detik. Mode pantau hanya untuk model
+    utama: model registry (region/year) di worker lain baru berganti saat dimuat ulang di sana.
+    """
+    key = request_key(region, year)
+    holder = models
+    if key != DEFAULT_KEY:
+        holder = registry.loaded_holder(key)
+
+    if version is not None and (key != DEFAULT_KEY or use_numpy_engine()):
+        # Validasi versinya dulu (manifest & skema), baru jadikan versi aktif di disk
+        root = BUNDLE_DIR if key == DEFAULT_KEY else registry_root(key)
+        try:
+            load_bundle(root, version)
+            set_current(version, root)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except BundleSchemaError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if holder is None:
+        # Belum dimuat: request berikutnya otomatis memuat versi di CURRENT
+        return {"status": "not_loaded", "key": key}
+
+    if wait:
+        try:
+            active = holder.reload(version)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Reload gagal, model lama tetap dipakai: {e}")
+        return {"status": "reloaded", "key": key, "model_version": active.version}
+
+    if not holder.reload_async(version):
+        raise HTTPException(status_code=409, detail="Reload lain sedang berjalan.")
+    return {"status": "reloading", "key": key, "model_version": holder.get().version}
+
+@app.post("/admin/update", dependencies=[Depends(require_admin)])
+def update_model(data: AlumniUpdateInput, region: Optional[str] = None, year: Optional[int] = None):
+    """
+    Tambahkan alumni baru ke model tanpa training ulang (lihat model_update.py).
+    Versi baru diterbitkan di folder bundle, lalu model yang sedang dimuat di-reload.
+    region & year: model wilayah/tahun di registry (default: model utama).
+    """
+    if not data.alumni or len(data.alumni) > MAX_UPDATE_ROWS:
+        raise HTTPException(status_code=400, detail=f"Jumlah alumni harus 1 s.d. {MAX_UPDATE_ROWS}.")
+    if any(not row.school_name.strip() for row in data.alumni):
+        raise HTTPException(status_code=400, detail="Nama sekolah tidak boleh kosong.")
+
+    key = request_key(region, year)
+    if key == DEFAULT_KEY:
+        if not use_numpy_engine():
+            raise HTTPException(status_code=409, detail="Update incremental hanya untuk bundle model (LOLOSIN_ENGINE=numpy).")
+        root = BUNDLE_DIR
+    else:
+        root = registry_root(key)
+        if current_version(root) is None:
+            raise HTTPException(status_code=404, detail=f"Model untuk '{key}' belum tersedia.")
+
+    from model_update import append_rows  # Memuat pandas, jadi tidak diimpor saat start
+    X_new = np.array([[row.avg_pkn, row.avg_ind, row.avg_mat, row.avg_ipa] for row in data.alumni])
+    labels = [row.school_name.strip() for row in data.alumni]
+    try:
+        summary = append_rows(X_new, labels, root=root, activate=data.activate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if data.activate:
+        holder = models if key == DEFAULT_KEY else registry.loaded_holder(key)
+        if holder is not None:
+            try:
+                holder.reload()
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Versi {summary['model_version']} tersimpan, tapi reload gagal: {e}")
+    return {"key": key, **summary}
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Metrik cache hasil prediksi (hit/miss, ukuran, versi model)"""
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
+@app.get("/stats/models")
+def model_registry_stats():
+    """Metrik registry model: per wilayah/tahun (hit, load, lama load, memori) & anggaran memori"""
+    return {"default_key": DEFAULT_KEY, **registry.stats()}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Metrik format Prometheus: latensi per tahap, jumlah request/error, request in-flight, versi model"""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/stats/admission")
+def admission_stats():
+    """Metrik admission control: request diterima/ditolak per alasan, antrean & waktu tunggu"""
+    return {"enabled": admission.max_in_flight > 0, **admission.stats()}
+
+@app.get("/debug/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    """Daftar profil request yang tersimpan (terbaru dulu), lihat profiling.py"""
+    return {
+        "enabled": PROFILING,
+        "rate": PROFILE_RATE,
+        "keep": profile_store.keep,
+        "profiles": profile_store.list()
+    }
+
+@app.get("/debug/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def download_profile(profile_id: str):
+    """Collapsed stacks satu profil (input flamegraph.pl / speedscope)"""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profil '{profile_id}' tidak ada (mungkin sudah terhapus dari ring).")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.collapsed")
+
+@app.get("/stats/microbatch")
+def microbatch_stats():
+    """Metrik antrean micro-batching (kedalaman antrean, ukuran batch, waktu tunggu)"""
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
 # ==========================================
-# 4. CARA MENJALANKAN
+# 5. CARA MENJALANKAN
 # ==========================================
 # Di terminal, jalankan perintah:
 # uvicorn api:app --reload
@@ -2,6 +2,12 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import joblib
+import os
+
+from knn_engine import SklearnPredictor
+from lookup_table import with_lookup_table
+from model_bundle import BUNDLE_DIR, current_version, load_bundle
+from whatif import SUBJECTS, what_if
 
 # ==========================================
 # 1. KONFIGURASI & STYLE
@@ -55,16 +61,23 @@ st.markdown("""
 # ==========================================
 @st.cache_resource
 def load_resources():
+    # Utamakan bundle model (engine NumPy, tanpa sklearn), fallback ke file .pkl
+    if current_version(BUNDLE_DIR) is not None:
+        bundle = load_bundle(BUNDLE_DIR)
+        # LOLOSIN_LOOKUP_TABLE=1: rata-rata yang tepat di titik grid dijawab dari tabel hasil prahitung
+        if os.getenv("LOLOSIN_LOOKUP_TABLE", "0") == "1":
+            return with_lookup_table(bundle.to_engine(), bundle.version)
+        return bundle.to_engine()
     try:
         model = joblib.load('model_knn_smp.pkl')
         scaler = joblib.load('scaler_smp.pkl')
-        return model, scaler
+        return SklearnPredictor(model, scaler)
     except FileNotFoundError:
-        return None, None
+        return None
 
-model, scaler = load_resources()
+predictor = load_resources()
 
-if model is None:
+if predictor is None:
     st.error("❌ File Model tidak ditemukan!")
     st.stop()
 
@@ -106,25 +119,18 @@ if st.button("🔍 Analisis & Cari Rekomendasi", type="primary"):
     
     # B. Prediksi
     try:
-        # Normalisasi
-        input_scaled = scaler.transform(final_input)
-        
-        # Hitung Probabilitas
-        probs = model.predict_proba(input_scaled)[0]
-        classes = model.classes_
-        
-        # Urutkan Top 6
-        sorted_indices = np.argsort(probs)[::-1]
+        # Normalisasi + Hitung Probabilitas + Urutkan Top 6
+        top_idx, top_probs = predictor.recommend(final_input, 6)
+        classes = predictor.classes_
         
         # C. Tampilkan Hasil
         st.success("✅ Analisis Selesai! Berikut rekomendasi sekolah untukmu:")
         
         st.markdown("### 🏫 Top 6 Sekolah Rekomendasi")
         
-        for i in range(6):
-            idx = sorted_indices[i]
-            school_name = classes[idx]
-            probability = probs[idx]
+        for i in range(len(top_idx[0])):
+            school_name = classes[top_idx[0][i]]
+            probability = top_probs[0][i]
             
             # Logic warna bar
             bar_color = "green" if probability > 0.5 else "orange" if probability > 0.2 else "red"
@@ -142,7 +148,45 @@ if st.button("🔍 Analisis & Cari Rekomendasi", type="primary"):
         st.error(f"Terjadi kesalahan: {e}")
 
 # ==========================================
-# 5. FOOTER
+# 5. SIMULASI WHAT-IF (SLIDER)
+# ==========================================
+# Semua titik slider (-10 s.d. +10 poin) dihitung sekaligus dalam satu batch,
+# jadi menggeser slider hanya memilih baris hasil yang sudah ada.
+SIM_STEP = 0.5
+SIM_RANGE = 10.0
+SUBJECT_LABELS = {"pkn": "PKN", "ind": "B. Indonesia", "mat": "Matematika", "ipa": "IPA"}
+
+with st.expander("🎚️ Simulasi What-If: bagaimana kalau nilaimu naik/turun?"):
+    sim_subject = st.selectbox("Mapel yang disimulasikan", list(SUBJECT_LABELS), index=2,
+                               format_func=SUBJECT_LABELS.get)
+    sim_delta = st.slider("Perubahan rata-rata (poin)", -SIM_RANGE, SIM_RANGE, 2.0, step=SIM_STEP)
+
+    delta_axis = np.arange(-SIM_RANGE, SIM_RANGE + SIM_STEP / 2, SIM_STEP)
+    deltas = np.zeros((len(delta_axis), len(SUBJECTS)))
+    deltas[:, SUBJECTS.index(sim_subject)] = delta_axis
+    try:
+        report = what_if(predictor, [pkn, ind, mat, ipa], deltas, 6)
+        classes = predictor.classes_
+
+        # Peluang setiap sekolah yang pernah masuk Top 6 di sepanjang slider
+        chart = pd.DataFrame(report.probabilities[1:] * 100, index=delta_axis,
+                             columns=[classes[c] for c in report.tracked])
+        chart.index.name = f"Perubahan {SUBJECT_LABELS[sim_subject]} (poin)"
+        st.line_chart(chart, y_label="Tingkat Kecocokan (%)")
+
+        row = 1 + int(round((sim_delta + SIM_RANGE) / SIM_STEP))
+        position = {c: j for j, c in enumerate(report.tracked)}
+        st.markdown(f"**Top 6 kalau rata-rata {SUBJECT_LABELS[sim_subject]} "
+                    f"menjadi {report.features[row][SUBJECTS.index(sim_subject)]:.1f}:**")
+        for i, (idx, prob) in enumerate(zip(report.top_idx[row], report.top_probs[row])):
+            change = int(report.ranks[0, position[idx]]) - (i + 1)
+            arrow = f"▲{change}" if change > 0 else f"▼{-change}" if change < 0 else "="
+            st.write(f"#{i+1} **{classes[idx]}** — {prob:.1%} ({arrow} dibanding nilai sekarang)")
+    except Exception as e:
+        st.error(f"Terjadi kesalahan: {e}")
+
+# ==========================================
+# 6. FOOTER
 # ==========================================
 st.markdown("""
 <div class="disclaimer">
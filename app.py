@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
 # ==========================================
 # 1. KONFIGURASI GLOBAL
 # ==========================================
 API_URL = "http://127.0.0.1:8000"
+HEALTH_TTL_S = 5            # Status API cukup dicek ulang tiap 5 detik (dipakai bersama semua pengguna)
+PREDICTION_CACHE_SIZE = 32  # Jumlah hasil prediksi yang diingat per sesi browser
+REQUEST_TIMEOUT_S = 10      # Batas tunggu /predict; dikirim juga sebagai deadline supaya server tidak menghitung jawaban yang sudah ditinggal
 
 st.set_page_config(
     page_title="Lolosin.ai - SMPN Jakarta Utara",
@@ -30,16 +34,65 @@ st.markdown("""
 # ==========================================
 # 2. FUNGSI UTILITAS (FRONTEND HELPER)
 # ==========================================
+@st.cache_resource
+def get_session():
+    """
+    Satu koneksi HTTP (keep-alive + connection pool) yang dipakai bersama oleh
+    semua sesi & rerun Streamlit, jadi tidak membuka koneksi TCP baru setiap klik.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=HEALTH_TTL_S, show_spinner=False)
 def check_api_status():
-    """Mengecek apakah server backend hidup"""
+    """Mengecek apakah server backend hidup (hasilnya di-cache beberapa detik)"""
     try:
-        response = requests.get(f"{API_URL}/", timeout=2)
+        response = get_session().get(f"{API_URL}/", timeout=2)
         if response.status_code == 200:
             return True
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.RequestException:
         return False
     return False
 
+def request_prediction(payload):
+    """
+    Kirim rapor ke /predict. Hasil yang sukses diingat per sesi dengan kunci 20 nilai
+    yang diisi, jadi analisis ulang tanpa mengubah nilai tidak menghubungi server lagi.
+    Mengembalikan (hasil, pesan_error).
+    """
+    cache = st.session_state.setdefault("prediction_cache", {})
+    key = tuple(payload["pkn_scores"] + payload["ind_scores"] + payload["mat_scores"] + payload["ipa_scores"])
+    if key in cache:
+        return cache[key], None
+
+    try:
+        response = get_session().post(f"{API_URL}/predict", json=payload, timeout=REQUEST_TIMEOUT_S,
+                                      headers={"X-Request-Deadline-Ms": str(REQUEST_TIMEOUT_S * 1000)})
+    except requests.exceptions.RequestException as e:
+        return None, f"Terjadi kesalahan koneksi ke API: {e}"
+
+    if response.status_code == 503:
+        # Server sedang penuh (load shedding): sarankan coba lagi sesuai Retry-After
+        retry_after = response.headers.get("Retry-After", "beberapa")
+        return None, f"Server sedang sibuk melayani banyak pengguna. Silakan coba lagi dalam {retry_after} detik."
+
+    if response.status_code != 200:
+        # Handle jika server menolak
+        try:
+            err_detail = response.json().get('detail', 'Terjadi kesalahan pada server.')
+        except ValueError:
+            err_detail = 'Terjadi kesalahan pada server.'
+        return None, f"Gagal mendapatkan prediksi. Server merespons: {response.status_code} - {err_detail}"
+
+    result = response.json() # Ubah balasan JSON jadi Dictionary Python
+    if len(cache) >= PREDICTION_CACHE_SIZE:
+        cache.pop(next(iter(cache)))  # Buang hasil paling lama
+    cache[key] = result
+    return result, None
+
 def input_group(semester_label, key_suffix):
     """Membuat 4 kotak input mapel sekaligus"""
     c1, c2 = st.columns(2)
@@ -110,63 +163,56 @@ st.markdown("---")
 # Tombol disable kalau API mati biar user ga bingung error
 if st.button("🔍 Analisis & Cari Rekomendasi Sekolah", type="primary", disabled=not api_alive):
     
+    # A. Siapkan Paket Data untuk Dikirim ke API
+    payload = {
+        "pkn_scores": scores_data['pkn'],
+        "ind_scores": scores_data['ind'],
+        "mat_scores": scores_data['mat'],
+        "ipa_scores": scores_data['ipa']
+    }
+
+    # B. Kirim POST Request ke Endpoint /predict (atau ambil dari hasil sebelumnya di sesi ini)
     with st.spinner("sedang menghubungi 'Otak AI' di server... mohon tunggu..."):
+        result, error = request_prediction(payload)
+
+    # C. Cek Balasan Server
+    if error:
+        st.error(f"⚠️ {error}")
+    else:
         try:
-            # A. Siapkan Paket Data untuk Dikirim ke API
-            payload = {
-                "pkn_scores": scores_data['pkn'],
-                "ind_scores": scores_data['ind'],
-                "mat_scores": scores_data['mat'],
-                "ipa_scores": scores_data['ipa']
-            }
+            # --- TAMPILKAN HASIL ---
+            st.success("✅ Analisis Selesai! Berikut hasilnya:")
             
-            # B. Kirim POST Request ke Endpoint /predict
-            response = requests.post(f"{API_URL}/predict", json=payload, timeout=10)
+            # 1. Tampilkan Statistik
+            stats = result['statistics']
+            with st.expander("📊 Lihat Rangkuman Statistik Nilaimu", expanded=True):
+                c1, c2, c3, c4 = st.columns(4)
+                c1.metric("Rerata PKN", f"{stats['avg_pkn']:.2f}")
+                c2.metric("Rerata B.Ind", f"{stats['avg_ind']:.2f}")
+                c3.metric("Rerata MTK", f"{stats['avg_mat']:.2f}")
+                c4.metric("Rerata IPA", f"{stats['avg_ipa']:.2f}")
+                st.divider()
+                c5, c6 = st.columns(2)
+                c5.metric("Konsistensi (Std Dev)", f"{stats['consistency_std']:.2f}", help="Semakin kecil angkanya, semakin stabil nilaimu antar mapel.")
+                c6.metric("Nilai Rerata Terendah", f"{stats['min_score']:.2f}")
             
-            # C. Cek Balasan Server
-            if response.status_code == 200:
-                result = response.json() # Ubah balasan JSON jadi Dictionary Python
-                
-                # --- TAMPILKAN HASIL ---
-                st.success("✅ Analisis Selesai! Berikut hasilnya:")
-                
-                # 1. Tampilkan Statistik
-                stats = result['statistics']
-                with st.expander("📊 Lihat Rangkuman Statistik Nilaimu", expanded=True):
-                    c1, c2, c3, c4 = st.columns(4)
-                    c1.metric("Rerata PKN", f"{stats['avg_pkn']:.2f}")
-                    c2.metric("Rerata B.Ind", f"{stats['avg_ind']:.2f}")
-                    c3.metric("Rerata MTK", f"{stats['avg_mat']:.2f}")
-                    c4.metric("Rerata IPA", f"{stats['avg_ipa']:.2f}")
-                    st.divider()
-                    c5, c6 = st.columns(2)
-                    c5.metric("Konsistensi (Std Dev)", f"{stats['consistency_std']:.2f}", help="Semakin kecil angkanya, semakin stabil nilaimu antar mapel.")
-                    c6.metric("Nilai Rerata Terendah", f"{stats['min_score']:.2f}")
-                
-                # 2. Tampilkan Rekomendasi
-                st.markdown("### 🏫 Top 6 Sekolah Rekomendasi")
-                st.caption("Diurutkan berdasarkan tingkat kecocokan dengan profil alumni tahun 2025.")
+            # 2. Tampilkan Rekomendasi
+            st.markdown("### 🏫 Top 6 Sekolah Rekomendasi")
+            st.caption("Diurutkan berdasarkan tingkat kecocokan dengan profil alumni tahun 2025.")
+            
+            for i, rec in enumerate(result['recommendations']):
+                prob = rec['probability']
                 
-                for i, rec in enumerate(result['recommendations']):
-                    prob = rec['probability']
-                    
-                    # Visualisasi Progress Bar
-                    col_icon, col_text = st.columns([1, 8])
-                    with col_icon:
-                        st.markdown(f"<h2 style='text-align: center; color: #1E88E5;'>#{i+1}</h2>", unsafe_allow_html=True)
-                    with col_text:
-                        st.markdown(f"#### {rec['school_name']}")
-                        st.progress(int(prob * 100))
-                        st.caption(f"Tingkat Kecocokan: **{prob:.1%}**")
-                    st.markdown("---")
-
-            else:
-                # Handle jika server menolak
-                err_detail = response.json().get('detail', 'Terjadi kesalahan pada server.')
-                st.error(f"⚠️ Gagal mendapatkan prediksi. Server merespons: {response.status_code} - {err_detail}")
-
-        except requests.exceptions.RequestException as e:
-            st.error(f"⚠️ Terjadi kesalahan koneksi ke API: {e}")
+                # Visualisasi Progress Bar
+                col_icon, col_text = st.columns([1, 8])
+                with col_icon:
+                    st.markdown(f"<h2 style='text-align: center; color: #1E88E5;'>#{i+1}</h2>", unsafe_allow_html=True)
+                with col_text:
+                    st.markdown(f"#### {rec['school_name']}")
+                    st.progress(int(prob * 100))
+                    st.caption(f"Tingkat Kecocokan: **{prob:.1%}**")
+                st.markdown("---")
+
         except Exception as e:
             st.error(f"⚠️ Terjadi kesalahan tak terduga: {e}")
 
@@ -0,0 +1,392 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from dataset import load_frame
+from model_bundle import FEATURE_COLUMNS
+
+# ==========================================
+# BENCHMARK API (LOAD TEST + MICRO-BENCHMARK)
+# ==========================================
+# 1. load  : jalankan `uvicorn api:app` di port lokal, lalu bebani dengan
+#            generator request asinkron (koneksi keep-alive, tanpa library
+#            tambahan) pada beberapa tingkat concurrency. Dilaporkan
+#            throughput & latensi p50/p95/p99.
+# 2. micro : ukur tahap-tahap jalur prediksi di dalam proses (validasi
+#            Pydantic, rata-rata fitur, scaling, k-NN, voting, Top-6,
+#            serialisasi JSON).
+#
+# Payload diambil dari DATASET/Data-Sampling.xlsx: setiap rata-rata mapel
+# dipecah jadi 5 nilai semester bulat yang rata-ratanya sama persis.
+# Hasil ditulis sebagai JSON ke bench_results/ (beserta commit git), dan
+# dua hasil bisa dibandingkan dengan `compare`.
+#
+# Cara pakai:
+#   python benchmark.py                                   # load + micro, setelan default
+#   python benchmark.py load --concurrency 1,16,64 --duration 15 --workers 2
+#   LOLOSIN_MICROBATCH=1 python benchmark.py load          # env diteruskan ke server
+#   LOLOSIN_CACHE_SIZE=0 python benchmark.py load          # tanpa cache hasil (payload berulang)
+#   python benchmark.py micro
+#   python benchmark.py compare bench_results/lama.json bench_results/baru.json
+
+SAMPLE_FILE = 'DATASET/Data-Sampling.xlsx'
+RESULTS_DIR = 'bench_results'
+SUBJECT_KEYS = ['pkn_scores', 'ind_scores', 'mat_scores', 'ipa_scores']
+N_SEMESTER = 5
+
+
+# ==========================================
+# 1. PAYLOAD RAPOR REALISTIS
+# ==========================================
+def split_average(avg, rng, n=N_SEMESTER):
+    """Pecah satu rata-rata jadi n nilai bulat (maks. 100) dengan rata-rata yang sama persis"""
+    total = int(round(avg * n))
+    scores = np.full(n, total // n)
+    scores[:total % n] += 1
+    # Variasi antar semester tanpa mengubah jumlah: pindahkan beberapa poin antar semester
+    for _ in range(2):
+        i, j = rng.choice(n, size=2, replace=False)
+        step = int(rng.integers(0, 3))
+        if scores[i] + step <= 100 and scores[j] - step >= 0:
+            scores[i] += step
+            scores[j] -= step
+    return [float(s) for s in rng.permutation(scores)]
+
+
+def build_payloads(path=SAMPLE_FILE, seed=42) -> list:
+    rng = np.random.default_rng(seed)
+    features = load_frame(path, FEATURE_COLUMNS).to_numpy(dtype=np.float64)
+    return [{key: split_average(avg, rng) for key, avg in zip(SUBJECT_KEYS, row)} for row in features]
+
+
+# ==========================================
+# 2. LOAD TEST (UVICORN + GENERATOR ASINKRON)
+# ==========================================
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, workers=1, timeout_s=60.0):
+    cmd = [sys.executable, '-m', 'uvicorn', 'api:app', '--host', '127.0.0.1', '--port', str(port),
+           '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+    server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn berhenti (exit code {server.returncode}) sebelum siap.")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as s:
+                s.sendall(b'GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+                if s.recv(16).startswith(b'HTTP/1.1 200'):
+                    return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"uvicorn tidak siap dalam {timeout_s:.0f} detik.")
+
+
+def encode_request(path, payload, port) -> bytes:
+    body = json.dumps(payload).encode('utf-8')
+    head = (f'POST {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n')
+    return head.encode('ascii') + body
+
+
+async def read_response(reader) -> int:
+    """Baca satu respons HTTP/1.1 (Content-Length), kembalikan status code"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.split(b'\r\n')
+    status = int(lines[0].split()[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def run_load(port, requests, concurrency, duration_s, warmup_s):
+    """Closed-loop: `concurrency` koneksi keep-alive, masing-masing kirim request berikutnya setelah dibalas"""
+    latencies, statuses = [], {}
+    state = {'measuring': False, 'stop': False}
+
+    async def client(worker_id):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        i = worker_id
+        try:
+            while not state['stop']:
+                request = requests[i % len(requests)]
+                i += concurrency
+                start = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                status = await read_response(reader)
+                if state['measuring']:
+                    latencies.append(time.perf_counter() - start)
+                    statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    tasks = [asyncio.create_task(client(w)) for w in range(concurrency)]
+    await asyncio.sleep(warmup_s)
+    state['measuring'] = True
+    started = time.perf_counter()
+    await asyncio.sleep(duration_s)
+    state['measuring'] = False
+    elapsed = time.perf_counter() - started
+    state['stop'] = True
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    lat_ms = np.asarray(latencies) * 1000.0
+    ok = sum(v for k, v in statuses.items() if 200 <= k < 300)
+    result = {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(latencies) - ok,
+        'status_counts': {str(k): v for k, v in sorted(statuses.items())},
+        'throughput_rps': len(latencies) / elapsed,
+    }
+    if len(lat_ms):
+        p50, p95, p99 = np.percentile(lat_ms, [50, 95, 99])
+        result.update(latency_ms={'mean': float(lat_ms.mean()), 'p50': float(p50), 'p95': float(p95),
+                                  'p99': float(p99), 'max': float(lat_ms.max())})
+    return result
+
+
+def load_benchmark(args, payloads) -> list:
+    port = args.port or free_port()
+    print(f"Menjalankan uvicorn api:app di port {port} ({args.workers} worker)...")
+    server = start_server(port, workers=args.workers)
+    results = []
+    try:
+        scenarios = [('/predict', [encode_request('/predict', p, port) for p in payloads])]
+        if args.batch_size > 0:
+            batches = [{'students': [payloads[(i + j) % len(payloads)] for j in range(args.batch_size)]}
+                       for i in range(0, len(payloads), args.batch_size)]
+            scenarios.append(('/predict/batch', [encode_request('/predict/batch', b, port) for b in batches]))
+
+        for endpoint, requests in scenarios:
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_load(port, requests, concurrency, args.duration, args.warmup))
+                result['endpoint'] = endpoint
+                if endpoint == '/predict/batch':
+                    result['batch_size'] = args.batch_size
+                results.append(result)
+                lat = result.get('latency_ms', {})
+                print(f"   {endpoint:<15} c={concurrency:<4} {result['throughput_rps']:9.1f} req/s   "
+                      f"p50={lat.get('p50', float('nan')):7.2f} ms  p95={lat.get('p95', float('nan')):7.2f} ms  "
+                      f"p99={lat.get('p99', float('nan')):7.2f} ms  error={result['errors']}")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return results
+
+
+# ==========================================
+# 3. MICRO-BENCHMARK JALUR PREDIKSI (DI DALAM PROSES)
+# ==========================================
+def time_call(fn, min_time_s=0.2, repeat=5) -> dict:
+    """Waktu per panggilan (µs): min & median dari `repeat` putaran, jumlah loop dikalibrasi otomatis"""
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time_s / repeat:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time_s / repeat / elapsed) + 1)
+
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        runs.append((time.perf_counter() - start) / loops * 1e6)
+    return {'loops': loops, 'min_us': float(min(runs)), 'median_us': float(np.median(runs))}
+
+
+def micro_benchmark(payloads, batch_size=64) -> list:
+    import api
+    from fastapi.responses import JSONResponse
+    from knn_engine import KNNEngine, top_n
+    from lookup_table import LookupPredictor
+
+    active = api.models.get()
+    predictor = active.predictor
+    table_predictor = None
+    if isinstance(predictor, LookupPredictor):
+        # Mode lookup table: tahap model diukur di model aslinya, tabel diukur terpisah
+        table_predictor, predictor = predictor, predictor.predictor
+    students = [api.RaporInput.model_validate(p) for p in payloads]
+    one = api.rapor_to_features(students[:1])
+    batch = api.rapor_to_features([students[i % len(students)] for i in range(batch_size)])
+    result_one = api.recommend_batch(one, active)[0]
+
+    cases = [
+        ('validate', 1, lambda: api.RaporInput.model_validate(payloads[0])),
+        ('features', 1, lambda: api.rapor_to_features(students[:1])),
+    ]
+    if isinstance(predictor, KNNEngine):
+        dist, idx = predictor.kneighbors(one)
+        probs = predictor.votes_from_neighbors(dist, idx)
+        cases += [
+            ('scale', 1, lambda: one * predictor.scale + predictor.min_),
+            ('knn_neighbors', 1, lambda: predictor.kneighbors(one)),
+            ('knn_votes', 1, lambda: predictor.votes_from_neighbors(dist, idx)),
+        ]
+    else:
+        probs = predictor.predict_proba(one)
+        cases += [
+            ('scale', 1, lambda: predictor.scaler.transform(one)),
+            ('knn_predict_proba', 1, lambda: predictor.predict_proba(one)),
+        ]
+    if table_predictor is not None:
+        grid_point = np.full((1, one.shape[1]), table_predictor.table.lo)
+        cases.append(('table_lookup', 1, lambda: table_predictor.table.lookup(grid_point, api.TOP_N)))
+    cases += [
+        ('top_k', 1, lambda: top_n(probs, api.TOP_N)),
+        ('recommend', 1, lambda: api.recommend_batch(one, active)),
+        ('recommend', batch_size, lambda: api.recommend_batch(batch, active)),
+        ('serialize_stdlib', 1, lambda: JSONResponse(result_one)),
+        ('serialize', 1, lambda: api.render_json(result_one, active)),
+    ]
+    if api.msgpack is not None:
+        packed = api.msgpack.packb([v for key in ('pkn_scores', 'ind_scores', 'mat_scores', 'ipa_scores')
+                                    for v in payloads[0][key]])
+        cases += [
+            ('decode_msgpack', 1, lambda: api.decode_scores(packed)),
+            ('serialize_msgpack', 1, lambda: api.render_compact([result_one], active, api.DEFAULT_KEY, single=True)),
+        ]
+
+    results = []
+    print(f"Micro-benchmark ({type(predictor).__name__}, model {active.version}):")
+    for name, rows, fn in cases:
+        timing = time_call(fn)
+        timing.update(name=name, rows=rows, per_row_us=timing['median_us'] / rows)
+        results.append(timing)
+        print(f"   {name:<18} rows={rows:<4} median={timing['median_us']:10.2f} µs   "
+              f"min={timing['min_us']:10.2f} µs   per baris={timing['per_row_us']:8.2f} µs")
+    return results
+
+
+# ==========================================
+# 4. HASIL & PERBANDINGAN
+# ==========================================
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'git_commit': commit,
+        'git_dirty': dirty,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'env': {k: v for k, v in os.environ.items() if k.startswith('LOLOSIN_')},
+    }
+
+
+def write_results(report, output=None) -> str:
+    if output is None:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['environment']['git_commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return output
+
+
+def compare(old_path, new_path):
+    """Cetak perubahan throughput/latensi (load) dan waktu per tahap (micro) antara dua hasil"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"Lama: {old['environment']['git_commit']}  Baru: {new['environment']['git_commit']}")
+
+    def change(a, b):
+        return f"{(b - a) / a:+7.1%}" if a else "    n/a"
+
+    old_load = {(r['endpoint'], r['concurrency']): r for r in old.get('load', [])}
+    for r in new.get('load', []):
+        prev = old_load.get((r['endpoint'], r['concurrency']))
+        if prev is None or 'latency_ms' not in r or 'latency_ms' not in prev:
+            continue
+        print(f"   {r['endpoint']:<15} c={r['concurrency']:<4} "
+              f"req/s {prev['throughput_rps']:9.1f} -> {r['throughput_rps']:9.1f} ({change(prev['throughput_rps'], r['throughput_rps'])})   "
+              f"p99 {prev['latency_ms']['p99']:7.2f} -> {r['latency_ms']['p99']:7.2f} ms "
+              f"({change(prev['latency_ms']['p99'], r['latency_ms']['p99'])})")
+
+    old_micro = {(r['name'], r['rows']): r for r in old.get('micro', [])}
+    for r in new.get('micro', []):
+        prev = old_micro.get((r['name'], r['rows']))
+        if prev is None:
+            continue
+        print(f"   {r['name']:<18} rows={r['rows']:<4} {prev['median_us']:10.2f} -> {r['median_us']:10.2f} µs "
+              f"({change(prev['median_us'], r['median_us'])})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test & micro-benchmark untuk api.py")
+    parser.add_argument('mode', nargs='?', default='all', choices=['all', 'load', 'micro', 'compare'])
+    parser.add_argument('files', nargs='*', help="Untuk compare: hasil_lama.json hasil_baru.json")
+    parser.add_argument('--concurrency', default='1,8,32',
+                        type=lambda s: [int(c) for c in s.split(',')], help="Daftar concurrency, mis. 1,8,32")
+    parser.add_argument('--duration', type=float, default=10.0, help="Lama pengukuran per skenario (detik)")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Pemanasan sebelum mengukur (detik)")
+    parser.add_argument('--batch-size', type=int, default=32, help="Siswa per request /predict/batch (0 = lewati)")
+    parser.add_argument('--workers', type=int, default=1, help="Jumlah worker uvicorn")
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--samples', default=SAMPLE_FILE, help="File sumber payload rapor")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help=f"File hasil JSON (default: {RESULTS_DIR}/<waktu>-<commit>.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.mode == 'compare':
+        if len(args.files) != 2:
+            print("❌ Error: compare butuh dua file hasil (lama & baru).")
+            return
+        compare(*args.files)
+        return
+
+    payloads = build_payloads(args.samples, args.seed)
+    report = {
+        'environment': environment(),
+        'config': {'mode': args.mode, 'concurrency': args.concurrency, 'duration_s': args.duration,
+                   'warmup_s': args.warmup, 'batch_size': args.batch_size, 'workers': args.workers,
+                   'samples': args.samples, 'n_payloads': len(payloads), 'seed': args.seed},
+    }
+    if args.mode in ('all', 'load'):
+        report['load'] = load_benchmark(args, payloads)
+    if args.mode in ('all', 'micro'):
+        report['micro'] = micro_benchmark(payloads)
+    print(f"✅ Hasil benchmark disimpan di '{write_results(report, args.output)}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+import argparse
+import csv
+import io
+import json
+import os
+import shutil
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# SKORING MASSAL DARI SPREADSHEET RAPOR (CSV / XLSX)
+# ==========================================
+# Format file sama dengan RaporInput di api.py, satu baris per siswa:
+#
+#   student_id, pkn_1..pkn_5, ind_1..ind_5, mat_1..mat_5, ipa_1..ipa_5
+#
+# Kolom identitas (student_id / nisn / nama) opsional dan hanya diteruskan
+# ke hasil. File dibaca baris demi baris (csv / openpyxl read_only) dan
+# dikumpulkan per potongan berukuran tetap, jadi memori tetap kecil berapa
+# pun jumlah barisnya. Baris yang rusak (nilai kosong / bukan angka / di
+# luar 0-100 / jumlah kolom kurang / byte bukan UTF-8) tidak menghentikan
+# proses: barisnya dilaporkan sebagai error di hasil, baris lain tetap dinilai.
+
+SUBJECTS = ['pkn', 'ind', 'mat', 'ipa']  # Urutan sama dengan fitur model [PKN, IND, MAT, IPA]
+N_SEMESTER = 5
+RAPOR_COLUMNS = [f'{subject}_{i}' for subject in SUBJECTS for i in range(1, N_SEMESTER + 1)]
+ID_COLUMNS = ['student_id', 'nisn', 'nama']
+DEFAULT_CHUNK_ROWS = 1000
+REPLACEMENT_CHAR = '\ufffd'  # Pengganti byte yang bukan UTF-8 di file CSV
+
+
+def _normalize(name) -> str:
+    return str(name).strip().lower() if name is not None else ''
+
+
+class RaporReader:
+    """
+    Pembaca file rapor per potongan. Header dibaca & dicek saat dibuat
+    (ValueError kalau ada kolom nilai yang tidak ada), baris dibaca saat
+    chunks() diiterasi.
+    """
+
+    def __init__(self, fileobj, filename):
+        self.filename = filename
+        if filename.lower().endswith('.csv'):
+            self._wb = None
+            # Byte yang bukan UTF-8 diganti U+FFFD supaya satu baris rusak tidak menghentikan
+            # pembacaan; barisnya dilaporkan sebagai error di _parse()
+            text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace', newline='')
+            self._rows = csv.reader(text)
+        elif filename.lower().endswith(('.xlsx', '.xlsm')):
+            from openpyxl import load_workbook
+            self._wb = load_workbook(fileobj, read_only=True, data_only=True)
+            self._rows = self._wb.active.iter_rows(values_only=True)
+        else:
+            raise ValueError("Format file harus .csv atau .xlsx.")
+
+        header = [_normalize(c) for c in next(self._rows, ())]
+        missing = [c for c in RAPOR_COLUMNS if c not in header]
+        if missing:
+            self.close()
+            raise ValueError(f"Kolom {missing} tidak ada di file. Kolom wajib: {RAPOR_COLUMNS}.")
+        self.positions = [header.index(c) for c in RAPOR_COLUMNS]
+        self.id_column = next((c for c in ID_COLUMNS if c in header), None)
+        self.id_position = header.index(self.id_column) if self.id_column else None
+
+    def close(self):
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+
+    def chunks(self, chunk_rows=DEFAULT_CHUNK_ROWS, skip_chunks=0):
+        """
+        Hasilkan (nomor_baris, fitur n x 4, id, error) per potongan.
+        Nomor baris = baris data ke-berapa (mulai 1, header tidak dihitung);
+        baris kosong dilewati tapi tetap dihitung nomornya.
+        Baris yang rusak: fiturnya NaN dan error berisi pesannya (selain itu None).
+        skip_chunks: lewati sejumlah potongan pertama tanpa diparse (untuk melanjutkan).
+        """
+        try:
+            numbers, buffer, index = [], [], 0
+            for number, row in enumerate(self._rows, start=1):
+                if all(cell is None or cell == '' for cell in row):
+                    continue
+                numbers.append(number)
+                buffer.append(row)
+                if len(buffer) == chunk_rows:
+                    if index >= skip_chunks:
+                        yield (numbers, *self._parse(buffer))
+                    numbers, buffer, index = [], [], index + 1
+            if buffer and index >= skip_chunks:
+                yield (numbers, *self._parse(buffer))
+        finally:
+            self.close()
+
+    def _parse(self, rows):
+        cells = [[row[i] if i < len(row) else None for i in self.positions] for row in rows]
+        ids = [None] * len(rows)
+        if self.id_position is not None:
+            ids = [str(row[self.id_position]) if self.id_position < len(row) and row[self.id_position] is not None
+                   else None for row in rows]
+
+        # Konversi seluruh potongan sekaligus; sel yang bukan angka jadi NaN
+        scores = pd.DataFrame(cells, columns=RAPOR_COLUMNS).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        invalid = ~np.isfinite(scores) | (scores < 0) | (scores > 100)
+        features = scores.reshape(len(rows), len(SUBJECTS), N_SEMESTER).mean(axis=2)
+
+        errors = [None] * len(rows)
+        for i in np.flatnonzero(invalid.any(axis=1)):
+            bad = [RAPOR_COLUMNS[j] for j in np.flatnonzero(invalid[i])]
+            errors[i] = f"Nilai tidak valid (harus angka 0-100) di kolom {bad}."
+            features[i] = np.nan
+        if self._wb is None:
+            for i, row in enumerate(rows):
+                if any(REPLACEMENT_CHAR in cell for cell in row):
+                    errors[i] = "Baris berisi karakter yang bukan UTF-8."
+                    features[i] = np.nan
+        return features, ids, errors
+
+
+# ==========================================
+# FORMAT HASIL (NDJSON / CSV)
+# ==========================================
+def error_record(row, student_id, message) -> dict:
+    return {"row": row, "student_id": student_id, "status": "error", "error": message}
+
+
+def ndjson_line(record) -> str:
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def result_columns(top=6) -> list:
+    """Kolom hasil datar (CSV / Parquet)"""
+    columns = ['row', 'student_id', 'status', 'avg_pkn', 'avg_ind', 'avg_mat', 'avg_ipa']
+    for rank in range(1, top + 1):
+        columns += [f'school_{rank}', f'probability_{rank}']
+    return columns + ['model_version', 'error']
+
+
+def flat_values(record, top=6) -> list:
+    """Record hasil (sukses maupun error) sebagai satu baris sesuai result_columns()"""
+    values = [record['row'], record.get('student_id') or '', record['status']]
+    if record['status'] == 'success':
+        stats = record['statistics']
+        values += [round(stats[key], 4) for key in ('avg_pkn', 'avg_ind', 'avg_mat', 'avg_ipa')]
+        recs = record['recommendations']
+        for rank in range(top):
+            values += [recs[rank]['school_name'], round(recs[rank]['probability'], 6)] if rank < len(recs) else ['', '']
+        values += [record.get('model_version', ''), '']
+    else:
+        values += [''] * (4 + 2 * top) + ['', record.get('error', '')]
+    return values
+
+
+def csv_header(top=6) -> str:
+    return _csv_line(result_columns(top))
+
+
+def csv_line(record, top=6) -> str:
+    return _csv_line(flat_values(record, top))
+
+
+def _csv_line(values) -> str:
+    out = io.StringIO()
+    csv.writer(out, lineterminator='\n').writerow(values)
+    return out.getvalue()
+
+
+# ==========================================
+# SKORING OFFLINE (CLI, PARALEL, BISA DILANJUTKAN)
+# ==========================================
+# Untuk daftar siswa sangat besar (ekspor satu wilayah) tanpa lewat HTTP:
+#   python bulk_scoring.py DATASET/rapor-jakut.xlsx -o hasil.csv
+#   python bulk_scoring.py rapor.csv -o hasil.parquet --jobs 4 --chunk-rows 20000
+#
+# Proses utama membaca file per potongan; potongan dinilai paralel oleh
+# beberapa proses yang membuka bundle model yang sama sebagai memory-map
+# (halaman model dibagi read-only oleh OS, tidak disalin per proses). Hasil
+# ditulis berurutan sesuai baris file begitu potongannya selesai. Kemajuan
+# dicatat di <output>.progress.json; kalau proses terhenti, jalankan ulang
+# perintah yang sama untuk melanjutkan dari potongan terakhir yang tersimpan.
+# Parquet ditulis sebagai folder berisi part-XXXXX.parquet (dibaca dengan
+# pd.read_parquet), butuh pyarrow.
+
+_engine = None
+_model_version = None
+
+
+def _init_worker(bundle_root, version):
+    global _engine, _model_version
+    from model_bundle import load_bundle
+    _engine = load_bundle(bundle_root, version).to_engine()
+    _model_version = version
+
+
+def _score_chunk(task):
+    """Nilai satu potongan (dijalankan di proses worker), kembalikan baris hasil datar"""
+    numbers, features, ids, errors, top = task
+    valid = [i for i, error in enumerate(errors) if error is None]
+    top_idx, top_probs = _engine.recommend(features[valid], top) if valid else ([], [])
+    classes = _engine.classes_
+
+    rows, k = [], 0
+    for i, (number, student_id, error) in enumerate(zip(numbers, ids, errors)):
+        if error is not None:
+            rows.append(flat_values(error_record(number, student_id, error), top))
+            continue
+        avg_pkn, avg_ind, avg_mat, avg_ipa = features[i]
+        record = {
+            "row": number,
+            "student_id": student_id,
+            "status": "success",
+            "statistics": {"avg_pkn": avg_pkn, "avg_ind": avg_ind, "avg_mat": avg_mat, "avg_ipa": avg_ipa},
+            "recommendations": [{"school_name": classes[idx], "probability": float(prob)}
+                                for idx, prob in zip(top_idx[k], top_probs[k])],
+            "model_version": _model_version,
+        }
+        rows.append(flat_values(record, top))
+        k += 1
+    return rows
+
+
+class CsvSink:
+    """Hasil CSV satu file; posisi byte dicatat supaya sisa tulisan yang terputus bisa dipotong"""
+
+    def __init__(self, path, top, resume_bytes=None):
+        self.path = path
+        if resume_bytes is None:
+            self.f = open(path, 'w', encoding='utf-8', newline='')
+            self.f.write(csv_header(top))
+        else:
+            self.f = open(path, 'r+', encoding='utf-8', newline='')
+            self.f.truncate(resume_bytes)
+            self.f.seek(resume_bytes)
+        self.writer = csv.writer(self.f, lineterminator='\n')
+
+    def write(self, index, rows):
+        self.writer.writerows(rows)
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetSink:
+    """Hasil Parquet sebagai folder part-XXXXX.parquet (satu file per potongan)"""
+
+    def __init__(self, path, top, resume_bytes=None):
+        import pyarrow  # noqa: F401 — gagal lebih awal kalau pyarrow belum terpasang
+        self.path = path
+        self.columns = result_columns(top)
+        self.numeric = [c for c in self.columns if c.startswith(('avg_', 'probability_'))]
+        if resume_bytes is None and os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, index, rows):
+        frame = pd.DataFrame(rows, columns=self.columns)
+        frame[self.numeric] = frame[self.numeric].apply(pd.to_numeric, errors='coerce')
+        target = os.path.join(self.path, f'part-{index:05d}.parquet')
+        frame.to_parquet(target + '.tmp', index=False, engine='pyarrow')
+        os.replace(target + '.tmp', target)
+        return 0
+
+    def close(self):
+        pass
+
+
+def _save_progress(path, progress):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp, path)
+
+
+def score_file(source, output, bundle_root=None, version=None, chunk_rows=10_000, n_jobs=None,
+               top=6, restart=False):
+    """Nilai seluruh file `source` ke `output` (.csv / .parquet). Mengembalikan ringkasan."""
+    from concurrent.futures import ProcessPoolExecutor
+    from dataset import file_hash
+    from model_bundle import BUNDLE_DIR, load_bundle
+
+    bundle_root = bundle_root or BUNDLE_DIR
+    bundle = load_bundle(bundle_root, version)  # Validasi sekali di proses utama, worker membuka versi yang sama
+    sink_cls = ParquetSink if output.lower().endswith('.parquet') else CsvSink
+    progress_path = f'{output}.progress.json'
+    progress = {
+        'source': os.path.abspath(source),
+        'source_hash': file_hash(source),
+        'model_version': bundle.version,
+        'chunk_rows': chunk_rows,
+        'top': top,
+        'chunks_done': 0,
+        'rows_done': 0,
+        'bytes': None,
+    }
+
+    resume_bytes = None
+    if not restart and os.path.exists(progress_path) and os.path.exists(output):
+        with open(progress_path, encoding='utf-8') as f:
+            saved = json.load(f)
+        same_job = all(saved.get(key) == progress[key]
+                       for key in ('source_hash', 'model_version', 'chunk_rows', 'top'))
+        if not same_job:
+            raise ValueError(f"'{progress_path}' berasal dari file/model/ukuran potongan lain. "
+                             "Pakai --restart untuk mengulang dari awal.")
+        progress = saved
+        resume_bytes = saved['bytes'] if sink_cls is CsvSink else 0
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    with open(source, 'rb') as f:
+        reader = RaporReader(f, source)
+        sink = sink_cls(output, top, resume_bytes)
+        if sink_cls is CsvSink and resume_bytes is None:
+            progress['bytes'] = sink.f.tell()
+        tasks = ((numbers, features, ids, errors, top)
+                 for numbers, features, ids, errors in reader.chunks(chunk_rows, progress['chunks_done']))
+
+        if n_jobs == 1:
+            _init_worker(bundle_root, bundle.version)
+            results = map(_score_chunk, tasks)
+        else:
+            pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                       initargs=(bundle_root, bundle.version))
+            results = _ordered_window(pool, tasks, window=2 * n_jobs)
+
+        started = time.perf_counter()
+        rows_start = progress['rows_done']
+        try:
+            for rows in results:
+                offset = sink.write(progress['chunks_done'], rows)
+                progress['chunks_done'] += 1
+                progress['rows_done'] += len(rows)
+                if sink_cls is CsvSink:
+                    progress['bytes'] = offset
+                _save_progress(progress_path, progress)
+                rate = (progress['rows_done'] - rows_start) / max(time.perf_counter() - started, 1e-9)
+                print(f"\r   {progress['rows_done']:,} baris ({rate:,.0f} baris/detik)", end='', flush=True)
+        finally:
+            sink.close()
+            if n_jobs != 1:
+                pool.shutdown(cancel_futures=True)
+        print()
+
+    os.remove(progress_path)
+    return {'rows': progress['rows_done'], 'resumed_rows': rows_start, 'model_version': bundle.version,
+            'seconds': time.perf_counter() - started}
+
+
+def _ordered_window(pool, tasks, window):
+    """Seperti pool.map, tapi hanya `window` potongan yang antre sekaligus (memori tetap) & urutan tetap"""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(_score_chunk, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Nilai file rapor besar secara offline (paralel, bisa dilanjutkan).")
+    parser.add_argument('source', help="File rapor (.csv / .xlsx)")
+    parser.add_argument('-o', '--output', required=True, help="File hasil (.csv) atau folder hasil (.parquet)")
+    parser.add_argument('--bundle-root', default=None, help="Folder bundle (default: model_bundle)")
+    parser.add_argument('--version', default=None, help="Versi bundle (default: versi aktif)")
+    parser.add_argument('--chunk-rows', type=int, default=10_000)
+    parser.add_argument('--jobs', type=int, default=None, help="Jumlah proses (default: semua core)")
+    parser.add_argument('--top', type=int, default=6)
+    parser.add_argument('--restart', action='store_true', help="Abaikan kemajuan sebelumnya, mulai dari awal")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    print(f"SKORING MASSAL: '{args.source}' -> '{args.output}'")
+    summary = score_file(args.source, args.output, bundle_root=args.bundle_root, version=args.version,
+                         chunk_rows=args.chunk_rows, n_jobs=args.jobs, top=args.top, restart=args.restart)
+    if summary['resumed_rows']:
+        print(f"   - Dilanjutkan dari baris ke-{summary['resumed_rows']:,}")
+    print(f"✅ {summary['rows']:,} siswa dinilai dengan model {summary['model_version']} "
+          f"({summary['seconds']:.1f} detik)")
@@ -1,40 +1,26 @@
-import pandas as pd
-import numpy as np
-import joblib
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
 from sklearn.ensemble import RandomForestClassifier
 
+from dataset import DATA_FILE, LABEL_COLUMN, open_dataset
+from evaluasi import evaluate_top_n
+from model_bundle import load_bundle
+
 # ==========================================
 # SCRIPT CEK AKURASI
 # ==========================================
 
-def get_top_n_accuracy(model, X, y, n=6):
-    """Fungsi hitung akurasi Top-N"""
-    probs = model.predict_proba(X)
-    classes = model.classes_
-    
-    hits = 0
-    for i in range(len(y)):
-        # Ambil indeks N probabilitas tertinggi
-        top_n_idx = np.argsort(probs[i])[-n:]
-        # Cek apakah kelas asli ada di top N prediksi
-        if y[i] in classes[top_n_idx]:
-            hits += 1
-    return hits / len(y)
-
 # 1. Load Data Asli
 print("📂 Memuat data...")
 try:
-    df = pd.read_excel('DATASET/Data-Cleaning.xlsx')
+    ds = open_dataset(DATA_FILE)
 except FileNotFoundError:
     print("❌ File 'DATASET/Data-Cleaning.xlsx' tidak ditemukan.")
     exit()
 
 # 2. Split Data 
 # Pastikan random_state=42 (sesuai standar)
-X = df.iloc[:, 1:5].values  # Kolom Nilai
-y = df.iloc[:, 0].values    # Kolom Sekolah
+X = ds.features()             # Kolom Nilai (float64)
+y = ds.column(LABEL_COLUMN)   # Kolom Sekolah
 
 # Split 80:20
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
@@ -42,22 +28,23 @@ print(f"✅ Data Uji siap: {len(X_test)} sampel")
 
 # 3. Load Model Utama (k-NN)
 try:
-    knn_model = joblib.load('model_knn_smp.pkl')
-    scaler = joblib.load('scaler_smp.pkl')
+    bundle = load_bundle()
+    knn_model = bundle.to_engine()  # Normalisasi sudah termasuk di dalam engine
     
     # Normalisasi Data Uji (Penting!)
-    X_test_scaled = scaler.transform(X_test)
-    X_train_scaled = scaler.transform(X_train) # Untuk RF nanti
+    X_test_scaled = bundle.transform(X_test)
+    X_train_scaled = bundle.transform(X_train) # Untuk RF nanti
     
-    print("✅ Model k-NN berhasil dimuat.")
+    print(f"✅ Model k-NN berhasil dimuat (bundle versi {bundle.version}).")
 except FileNotFoundError:
-    print("❌ Model .pkl belum ada. Jalankan training dulu!")
+    print("❌ Bundle model belum ada. Jalankan training dulu!")
     exit()
 
 # 4. Hitung Akurasi k-NN (Model Utama)
 print("\n🧮 Menghitung Akurasi k-NN...")
-acc_knn_top1 = accuracy_score(y_test, knn_model.predict(X_test_scaled))
-acc_knn_top6 = get_top_n_accuracy(knn_model, X_test_scaled, y_test, n=6)
+knn_report = evaluate_top_n(knn_model.predict_proba(X_test), knn_model.classes_, y_test, max_n=6)
+acc_knn_top1 = knn_report.accuracy(1)
+acc_knn_top6 = knn_report.accuracy(6)
 
 # 5. Latih Random Forest (Sebagai Pembanding di Tabel)
 # latih sebentar RF biar punya data pembanding yang valid
@@ -65,8 +52,9 @@ print("🌲 Melatih Random Forest (untuk pembanding)...")
 rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
 rf_model.fit(X_train_scaled, y_train)
 
-acc_rf_top1 = accuracy_score(y_test, rf_model.predict(X_test_scaled))
-acc_rf_top6 = get_top_n_accuracy(rf_model, X_test_scaled, y_test, n=6)
+rf_report = evaluate_top_n(rf_model.predict_proba(X_test_scaled), rf_model.classes_, y_test, max_n=6)
+acc_rf_top1 = rf_report.accuracy(1)
+acc_rf_top6 = rf_report.accuracy(6)
 
 # 7. TAMPILKAN HASIL
 print("\n" + "="*70)
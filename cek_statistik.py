@@ -1,9 +1,11 @@
 import pandas as pd
 
+from dataset import DATA_FILE, load_frame
+
 # 1. Load Data Asli
 try:
     # Sesuaikan nama file jika berbeda
-    df = pd.read_excel('DATASET/Data-Cleaning.xlsx')
+    df = load_frame(DATA_FILE)
     print("✅ Data Berhasil Dimuat!")
 except FileNotFoundError:
     print("❌ File tidak ditemukan. Pastikan path 'DATASET/Data-Cleaning.xlsx' benar.")
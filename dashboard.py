@@ -1,124 +1,165 @@
-import pandas as pd
-import numpy as np
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')  # Render tanpa layar (headless), aman dipakai di proses worker
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
-import joblib
+
+from dataset import CACHE_DIR, load_frame, source_hash
+from evaluasi import evaluate_top_n
+from model_bundle import load_bundle
 
 # ==========================================
-# 1. SETUP & LOAD RESOURCES
+# PIPELINE LAPORAN EVALUASI (BERTAHAP & DI-CACHE)
 # ==========================================
-print("Memuat Sumber Daya ...")
-
-# A. Load Model & Scaler
-try:
-    model = joblib.load('model_knn_smp.pkl')
-    scaler = joblib.load('scaler_smp.pkl')
-    print("Model dan Scaler berhasil dimuat!")
-except FileNotFoundError:
-    print("Error: File .pkl tidak ditemukan.")
-    exit()
-
-# B. Load Data Testing
-try:
-    df_test = pd.read_excel('DATASET/Data-Testing-Split.xlsx')
-    print(f"Data Testing dimuat: {len(df_test)} siswa.")
-except FileNotFoundError:
-    print("Error: File 'DATASET/Data-Testing-Split.xlsx' tidak ditemukan.")
-    exit()
+# Laporan dibangun dari beberapa tahap. Setiap tahap punya kunci hash dari
+# isi inputnya + kode fungsinya sendiri:
+#
+#   model    : versi bundle (hash isi bundle)
+#   data uji : hash isi DATASET/Data-Testing-Split.xlsx
+#   metrik   : model + data uji + compute_metrics()  -> metrics.npz
+#   excel    : metrik + build_detail_table()         -> Laporan_Detail_Testing.xlsx
+#   panel    : metrik + fungsi panel masing-masing   -> panel_*.png (dirender paralel)
+#   dashboard: hash keempat panel + judul            -> Dashboard_Final_Testing.png
+#
+# Tahap yang kuncinya sama dengan run sebelumnya (dan file hasilnya masih
+# ada) dilewati. Jadi kalau hanya satu grafik yang diubah, hanya panel itu
+# yang dirender ulang lalu dashboard disusun ulang dari potongan gambar.
+# Hapus folder cache (DATASET/.cache/report/) untuk memaksa semua tahap jalan.
+
+TEST_FILE = 'DATASET/Data-Testing-Split.xlsx'
+DASHBOARD_FILE = 'Dashboard_Final_Testing.png'
+EXCEL_FILE = 'Laporan_Detail_Testing.xlsx'
+REPORT_CACHE_DIR = os.path.join(CACHE_DIR, 'report')
+PANEL_SIZE = (9, 6)  # inci per panel; 2 x 2 panel = ukuran dashboard lama (18 x 12)
+DPI = 100
+
+
+def stage_key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def code_key(func) -> str:
+    """Hash kode sumber fungsi: mengubah isi fungsi (mis. warna grafik) = tahapnya jalan ulang"""
+    return hashlib.sha256(inspect.getsource(func).encode('utf-8')).hexdigest()[:16]
+
+
+class StageCache:
+    """Kunci terakhir setiap tahap, disimpan di stages.json"""
+
+    def __init__(self, root=REPORT_CACHE_DIR):
+        self.root = root
+        self.path = os.path.join(root, 'stages.json')
+        os.makedirs(root, exist_ok=True)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.state = {}
+
+    def file(self, name) -> str:
+        return os.path.join(self.root, name)
+
+    def fresh(self, stage, key, outputs) -> bool:
+        return self.state.get(stage) == key and all(os.path.exists(path) for path in outputs)
+
+    def done(self, stage, key):
+        self.state[stage] = key
+        tmp = f'{self.path}.{os.getpid()}'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
 
 # ==========================================
-# 2. PREPROCESSING
+# 1. METRIK (PREDIKSI SELURUH DATA UJI SEKALIGUS)
 # ==========================================
-print("Menyiapkan Data Uji...")
+def compute_metrics(bundle, df_test) -> dict:
+    # Ambil data mentah; normalisasi dilakukan di dalam engine (parameter scaler ikut di bundle)
+    X_test_raw = df_test.iloc[:, 1:5].values
+    y_test_true = df_test.iloc[:, 0].values
 
-# Ambil data mentah
-X_test_raw = df_test.iloc[:, 1:5].values
-y_test_true = df_test.iloc[:, 0].values
+    model = bundle.to_engine()
+    probs_all = model.predict_proba(X_test_raw)
+
+    # Ranking, Top-6, confidence & status hit untuk semua siswa sekaligus (lihat evaluasi.py)
+    report = evaluate_top_n(probs_all, model.classes_, y_test_true, max_n=6)
+    return {
+        'X_test_raw': np.asarray(X_test_raw, dtype=np.float64),
+        'y_true': np.asarray(y_test_true).astype(str),
+        'top6_schools': report.top_schools.astype(str),
+        'confidence': report.confidence,
+        'hit_top6': report.hits(6),
+        'hit_top1': report.hits(1),
+    }
+
+
+def load_metrics(path) -> dict:
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
 
-# NORMALISASI
-X_test_scaled = scaler.transform(X_test_raw)
 
 # ==========================================
-# 3. EKSEKUSI PENGUJIAN (TESTING PHASE)
+# 2. TABEL DETAIL (EXCEL, DIBANGUN PER KOLOM)
 # ==========================================
-print("Menjalankan simulasi ujian...")
-
-results = []
-hit_top6_count = 0
-hit_top1_count = 0
-
-# Prediksi Probabilitas
-probs_all = model.predict_proba(X_test_scaled)
-classes = model.classes_
-
-# Loop Analisis Per Siswa
-for i in range(len(df_test)):
-    student_probs = probs_all[i]
-    
-    # Sorting Ranking
-    sorted_idx = np.argsort(student_probs)[::-1]
-    
-    # Ambil Top 6
-    top6_schools = classes[sorted_idx[:6]]
-    top1_school = top6_schools[0]
-    top1_conf = student_probs[sorted_idx[0]]
-    
-    real_school = y_test_true[i]
-    
-    # Cek Validitas
-    is_hit_top6 = real_school in top6_schools
-    is_hit_top1 = real_school == top1_school
-    
-    if is_hit_top6: hit_top6_count += 1
-    if is_hit_top1: hit_top1_count += 1
-    
-    # Simpan Data untuk Laporan Excel
-    results.append({
-        'Siswa_ID': i+1,
-        'Sekolah_Asli': real_school,
-        'Nilai_Input': str(X_test_raw[i]),
-        'Rekomendasi_1': top1_school,
-        'Confidence_1': round(top1_conf, 4),
-        'Status_Top6': 'BERHASIL' if is_hit_top6 else 'MELESET',
-        'List_Rekomendasi': ", ".join(top6_schools)
+def build_detail_table(m) -> pd.DataFrame:
+    top6_schools = m['top6_schools']
+    return pd.DataFrame({
+        'Siswa_ID': np.arange(1, len(m['y_true']) + 1),
+        'Sekolah_Asli': m['y_true'],
+        'Nilai_Input': [str(row) for row in m['X_test_raw']],
+        'Rekomendasi_1': top6_schools[:, 0],
+        'Confidence_1': np.round(m['confidence'], 4),
+        'Status_Top6': np.where(m['hit_top6'], 'BERHASIL', 'MELESET'),
+        'List_Rekomendasi': [", ".join(row) for row in top6_schools]
     })
 
-df_results = pd.DataFrame(results)
 
 # ==========================================
-# 4. VISUALISASI DASHBOARD FINAL
+# 3. PANEL DASHBOARD (SATU FUNGSI = SATU GAMBAR)
 # ==========================================
-print("Membuat Dashboard Laporan Testing...")
-
-fig, axes = plt.subplots(2, 2, figsize=(18, 12))
-plt.suptitle(f"EVALUASI MODEL", fontsize=20, fontweight='bold')
-
-# A. PIE CHART: Akurasi Top-6
-labels = ['BERHASIL (Top-6)', 'MELESET']
-sizes = [hit_top6_count, len(df_test) - hit_top6_count]
-colors = ['#27ae60', '#c0392b'] 
-axes[0, 0].pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors, explode=(0.1, 0))
-axes[0, 0].set_title('Akurasi Sistem Rekomendasi (Top-6)', fontsize=14)
-
-# B. BAR CHART: Distribusi Rekomendasi Top-1
-top_recs = df_results['Rekomendasi_1'].value_counts().head(10)
-sns.barplot(x=top_recs.values, y=top_recs.index, ax=axes[0, 1], palette='viridis')
-axes[0, 1].set_title('10 Sekolah Paling Sering Direkomendasikan (Top-1)', fontsize=14)
-axes[0, 1].set_xlabel('Frekuensi')
-
-# C. HISTOGRAM: Confidence Score
-sns.histplot(df_results['Confidence_1'], bins=20, kde=True, ax=axes[1, 0], color='#2980b9')
-axes[1, 0].set_title('Distribusi Keyakinan Model (Confidence)', fontsize=14)
-axes[1, 0].set_xlabel('Probabilitas')
-
-# D. KARTU NILAI (REAL ACCURACY)
-acc_top6 = (hit_top6_count / len(df_test)) * 100
-acc_top1 = (hit_top1_count / len(df_test)) * 100
-
-summary_text = f"""
+def panel_accuracy(ax, m):
+    # A. PIE CHART: Akurasi Top-6
+    hit_top6_count = int(m['hit_top6'].sum())
+    labels = ['BERHASIL (Top-6)', 'MELESET']
+    sizes = [hit_top6_count, len(m['y_true']) - hit_top6_count]
+    colors = ['#27ae60', '#c0392b']
+    ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors, explode=(0.1, 0))
+    ax.set_title('Akurasi Sistem Rekomendasi (Top-6)', fontsize=14)
+
+
+def panel_top_schools(ax, m):
+    # B. BAR CHART: Distribusi Rekomendasi Top-1
+    top_recs = pd.Series(m['top6_schools'][:, 0], name='Rekomendasi_1').value_counts().head(10)
+    sns.barplot(x=top_recs.values, y=top_recs.index, ax=ax, palette='viridis')
+    ax.set_title('10 Sekolah Paling Sering Direkomendasikan (Top-1)', fontsize=14)
+    ax.set_xlabel('Frekuensi')
+
+
+def panel_confidence(ax, m):
+    # C. HISTOGRAM: Confidence Score
+    sns.histplot(np.round(m['confidence'], 4), bins=20, kde=True, ax=ax, color='#2980b9')
+    ax.set_title('Distribusi Keyakinan Model (Confidence)', fontsize=14)
+    ax.set_xlabel('Probabilitas')
+
+
+def panel_summary(ax, m):
+    # D. KARTU NILAI (REAL ACCURACY)
+    n_test = len(m['y_true'])
+    acc_top6 = (int(m['hit_top6'].sum()) / n_test) * 100
+    acc_top1 = (int(m['hit_top1'].sum()) / n_test) * 100
+
+    summary_text = f"""
 LAPORAN PENGUJIAN FINAL (JUJUR):
 --------------------------------
-Total Data Uji     : {len(df_test)} Siswa
+Total Data Uji     : {n_test} Siswa
 
 ✅ Top-6 Accuracy  : {acc_top6:.2f}%
 (Validitas Sistem Rekomendasi)
@@ -129,14 +170,115 @@ Total Data Uji     : {len(df_test)} Siswa
 Fitur yang Digunakan:
 Hanya Rata-rata Mapel (PKN, IND, MTK, IPA)
 """
-axes[1, 1].text(0.05, 0.5, summary_text, fontsize=14, fontfamily='monospace', va='center', 
-                bbox=dict(facecolor='#ecf0f1', alpha=0.8, boxstyle='round,pad=1'))
-axes[1, 1].axis('off')
+    ax.text(0.05, 0.5, summary_text, fontsize=14, fontfamily='monospace', va='center',
+            bbox=dict(facecolor='#ecf0f1', alpha=0.8, boxstyle='round,pad=1'))
+    ax.axis('off')
+
+
+# Urutan = posisi di dashboard (kiri atas, kanan atas, kiri bawah, kanan bawah)
+PANELS = [panel_accuracy, panel_top_schools, panel_confidence, panel_summary]
+
+
+def render_panel(task):
+    """Render satu panel ke file PNG (dijalankan di proses worker)"""
+    name, metrics_path, target = task
+    func = globals()[name]
+    fig, ax = plt.subplots(figsize=PANEL_SIZE)
+    func(ax, load_metrics(metrics_path))
+    fig.tight_layout()
+    fig.savefig(target, dpi=DPI)
+    plt.close(fig)
+    return name
+
+
+def compose_dashboard(panel_paths, target, title="EVALUASI MODEL"):
+    """Susun panel 2 x 2 + judul jadi satu gambar (tempel piksel, tanpa render ulang grafik)"""
+    images = [plt.imread(path) for path in panel_paths]
+    width = images[0].shape[1]
+    fig = plt.figure(figsize=(2 * width / DPI, 0.6))
+    fig.text(0.5, 0.5, title, fontsize=20, fontweight='bold', ha='center', va='center')
+    title_path = f'{target}.title.png'
+    fig.savefig(title_path, dpi=DPI)
+    plt.close(fig)
+    header = plt.imread(title_path)
+    os.remove(title_path)
+
+    grid = np.vstack([np.hstack(images[:2]), np.hstack(images[2:])])
+    plt.imsave(target, np.vstack([header[:, :grid.shape[1]], grid]))
+
+
+# ==========================================
+# 4. JALANKAN PIPELINE
+# ==========================================
+def main():
+    started = time.perf_counter()
+    cache = StageCache()
+    print("Memuat Sumber Daya ...")
+
+    # A. Model (dari bundle model, sudah termasuk parameter scaler)
+    try:
+        bundle = load_bundle()
+        print(f"Model dan Scaler berhasil dimuat! (bundle versi {bundle.version})")
+    except FileNotFoundError:
+        print("Error: Bundle model tidak ditemukan. Jalankan training.py dulu.")
+        return
+
+    # B. Data Testing (cukup hash isinya; dibaca hanya kalau metrik perlu dihitung ulang)
+    try:
+        test_key = source_hash(TEST_FILE)
+    except FileNotFoundError:
+        print(f"Error: File '{TEST_FILE}' tidak ditemukan.")
+        return
+
+    # C. Metrik
+    metrics_key = stage_key('metrics', bundle.version, test_key, code_key(compute_metrics))
+    metrics_path = cache.file('metrics.npz')
+    if cache.fresh('metrics', metrics_key, [metrics_path]):
+        print("Metrik: dari cache.")
+    else:
+        print("Menjalankan simulasi ujian...")
+        df_test = load_frame(TEST_FILE)
+        print(f"Data Testing dimuat: {len(df_test)} siswa.")
+        np.savez(metrics_path, **compute_metrics(bundle, df_test))
+        cache.done('metrics', metrics_key)
+    m = load_metrics(metrics_path)
+
+    # D. Panel grafik (hanya yang berubah, paralel)
+    panel_keys = {func.__name__: stage_key(func.__name__, metrics_key, code_key(func), PANEL_SIZE, DPI)
+                  for func in PANELS}
+    panel_paths = [cache.file(f'{func.__name__}.png') for func in PANELS]
+    stale = [(func.__name__, metrics_path, path) for func, path in zip(PANELS, panel_paths)
+             if not cache.fresh(func.__name__, panel_keys[func.__name__], [path])]
+    if stale:
+        print(f"Membuat Dashboard Laporan Testing... ({len(stale)} dari {len(PANELS)} panel dirender ulang)")
+        if len(stale) == 1:
+            done = map(render_panel, stale)
+        else:
+            pool = ProcessPoolExecutor(max_workers=min(len(stale), os.cpu_count() or 1))
+            done = list(pool.map(render_panel, stale))
+            pool.shutdown()
+        for name in done:
+            cache.done(name, panel_keys[name])
+
+    dashboard_key = stage_key('dashboard', sorted(panel_keys.values()), code_key(compose_dashboard))
+    if stale or not cache.fresh('dashboard', dashboard_key, [DASHBOARD_FILE]):
+        compose_dashboard(panel_paths, DASHBOARD_FILE)
+        cache.done('dashboard', dashboard_key)
+        print(f"Gambar Dashboard disimpan: '{DASHBOARD_FILE}'")
+    else:
+        print(f"Gambar Dashboard: tidak berubah ('{DASHBOARD_FILE}')")
+
+    # E. Laporan Excel
+    excel_key = stage_key('excel', metrics_key, code_key(build_detail_table))
+    if cache.fresh('excel', excel_key, [EXCEL_FILE]):
+        print(f"Excel Laporan: tidak berubah ('{EXCEL_FILE}')")
+    else:
+        build_detail_table(m).to_excel(EXCEL_FILE, index=False)
+        cache.done('excel', excel_key)
+        print(f"Excel Laporan disimpan: '{EXCEL_FILE}'")
+
+    print(f"Selesai dalam {time.perf_counter() - started:.2f} detik.")
 
-# Simpan Output
-plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-plt.savefig('Dashboard_Final_Testing.png')
-print("Gambar Dashboard disimpan: 'Dashboard_Final_Testing.png'")
 
-df_results.to_excel('Laporan_Detail_Testing.xlsx', index=False)
-print("Excel Laporan disimpan: 'Laporan_Detail_Testing.xlsx'")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
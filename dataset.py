@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from model_bundle import FEATURE_COLUMNS
+
+# ==========================================
+# LOADER DATASET DENGAN CACHE KOLOM (.npy)
+# ==========================================
+# Parsing Excel (openpyxl) adalah langkah paling lambat di semua script.
+# File sumber cukup diparse SEKALI, lalu setiap kolom disimpan sebagai
+# array .npy bertipe (angka -> float64, teks -> kode int32 + tabel nama).
+# Cache diberi kunci hash isi file sumber, jadi otomatis dibangun ulang
+# begitu file Excel-nya berubah.
+#
+#   DATASET/.cache/Data-Cleaning-<hash>/
+#   ├── meta.json                 # urutan kolom, tipe, tabel kategori
+#   ├── col_0.npy                 # Nama_Sekolah (kode int32)
+#   └── col_1.npy ...             # Rerata_Smt_* (float64)
+
+DATA_FILE = 'DATASET/Data-Cleaning.xlsx'
+CACHE_DIR = os.path.join('DATASET', '.cache')
+LABEL_COLUMN = 'Nama_Sekolah'
+
+
+def file_hash(path, block_size=1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_hash(path, cache_dir=CACHE_DIR) -> str:
+    """
+    Hash isi file sumber. Supaya tidak membaca ulang file besar di setiap
+    pemanggilan, hash terakhir diingat bersama ukuran & waktu ubah file.
+    """
+    stat = os.stat(path)
+    index_path = os.path.join(cache_dir, 'index.json')
+    try:
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = {}
+
+    key = os.path.abspath(path)
+    entry = index.get(key)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['hash']
+
+    digest = file_hash(path)
+    index[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f'{index_path}.{os.getpid()}'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, index_path)
+    return digest
+
+
+def read_source(path) -> pd.DataFrame:
+    """Baca file sumber apa adanya (Excel / CSV)"""
+    if path.lower().endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def iter_source_chunks(path, columns, chunk_size=50_000):
+    """
+    Baca file sumber per potongan (DataFrame berisi `columns` saja, urut sesuai
+    permintaan). Dipakai training streaming: file sebesar apa pun tidak pernah
+    dimuat utuh. Excel dibaca baris demi baris (openpyxl mode read_only).
+    """
+    columns = list(columns)
+    if path.lower().endswith('.csv'):
+        header = pd.read_csv(path, nrows=0).columns
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise KeyError(f"Kolom {missing} tidak ada di '{path}'.")
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size):
+            yield chunk[columns]
+        return
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(c) if c is not None else '' for c in next(rows, ())]
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise KeyError(f"Kolom {missing} tidak ada di '{path}'.")
+        positions = [header.index(c) for c in columns]
+
+        buffer = []
+        for row in rows:
+            buffer.append([row[i] if i < len(row) else None for i in positions])
+            if len(buffer) == chunk_size:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        wb.close()
+
+
+def _cache_path(path, digest, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'{stem}-{digest[:16]}'), stem
+
+
+def _build_cache(path, target, stem, cache_dir):
+    """Parse file sumber sekali, lalu simpan setiap kolom sebagai .npy bertipe"""
+    df = read_source(path)
+    meta = {'source': os.path.abspath(path), 'n_rows': len(df), 'columns': []}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=cache_dir)
+    try:
+        for i, name in enumerate(df.columns):
+            col = df[name]
+            info = {'name': str(name), 'file': f'col_{i}.npy'}
+            if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+                info['kind'] = 'numeric'
+                values = col.to_numpy(dtype=np.float64)
+            else:
+                # Teks (mis. nama sekolah): simpan kode kategori + tabel nama
+                info['kind'] = 'category'
+                codes, categories = pd.factorize(col.astype(object), sort=True)
+                info['categories'] = [str(c) for c in categories]
+                values = codes.astype(np.int32)
+            np.save(os.path.join(tmp, info['file']), values)
+            meta['columns'].append(info)
+
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        if os.path.isdir(target):
+            shutil.rmtree(tmp)
+        else:
+            os.replace(tmp, target)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    # Buang cache lama dari file yang sama (hash berbeda)
+    for entry in os.listdir(cache_dir):
+        old = os.path.join(cache_dir, entry)
+        if re.fullmatch(rf'{re.escape(stem)}-[0-9a-f]{{16}}', entry) and old != target and os.path.isdir(old):
+            shutil.rmtree(old, ignore_errors=True)
+
+
+class CachedDataset:
+    """Akses kolom dari cache .npy (memory-mapped) tanpa membangun DataFrame penuh"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self._columns = {c['name']: c for c in meta['columns']}
+
+    @property
+    def columns(self) -> list:
+        return [c['name'] for c in self.meta['columns']]
+
+    def __len__(self):
+        return self.meta['n_rows']
+
+    def _column_info(self, name):
+        if isinstance(name, int):
+            return self.meta['columns'][name]
+        if name not in self._columns:
+            raise KeyError(f"Kolom '{name}' tidak ada. Kolom tersedia: {self.columns}")
+        return self._columns[name]
+
+    def codes(self, name):
+        """Array mentah kolom: float64 untuk angka, kode int32 untuk teks"""
+        info = self._column_info(name)
+        return np.load(os.path.join(self.path, info['file']), mmap_mode='r')
+
+    def categories(self, name) -> np.ndarray:
+        return np.asarray(self._column_info(name)['categories'], dtype=object)
+
+    def column(self, name) -> np.ndarray:
+        """Nilai kolom siap pakai (teks sudah dikembalikan ke nama aslinya)"""
+        info = self._column_info(name)
+        values = np.asarray(self.codes(name))
+        if info['kind'] == 'category':
+            names = np.append(self.categories(name), None)  # kode -1 (kosong) -> None
+            return names[values]
+        return values
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        """DataFrame dengan urutan kolom sama seperti file sumber (atau hanya kolom yang diminta)"""
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({self._column_info(c)['name']: self.column(c) for c in columns})
+
+    def features(self, columns=FEATURE_COLUMNS) -> np.ndarray:
+        """Matriks fitur float64 (n_siswa x n_fitur)"""
+        return np.column_stack([np.asarray(self.codes(c), dtype=np.float64) for c in columns])
+
+    def labels(self, column=LABEL_COLUMN):
+        """(kode_kelas int32, nama_sekolah) — kode urut sesuai nama sekolah (seperti classes_ sklearn)"""
+        return np.asarray(self.codes(column)), self.categories(column)
+
+
+def open_dataset(path=DATA_FILE, cache_dir=CACHE_DIR) -> CachedDataset:
+    """Buka dataset dari cache; bangun cache dulu kalau belum ada / file sumber berubah"""
+    digest = source_hash(path, cache_dir)
+    target, stem = _cache_path(path, digest, cache_dir)
+    meta_path = os.path.join(target, 'meta.json')
+    if not os.path.exists(meta_path):
+        _build_cache(path, target, stem, cache_dir)
+    with open(meta_path, encoding='utf-8') as f:
+        return CachedDataset(target, json.load(f))
+
+
+def load_frame(path=DATA_FILE, columns=None) -> pd.DataFrame:
+    """Pengganti pd.read_excel(path) yang memakai cache kolom"""
+    return open_dataset(path).frame(columns)
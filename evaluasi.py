@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from knn_engine import top_n
+
+# ==========================================
+# EVALUASI TOP-N (VEKTORISASI, TANPA LOOP PER SISWA)
+# ==========================================
+# Dipakai bersama oleh training.py, cek_akurasi.py, dashboard.py & search_cv.py.
+# Semua perhitungan dilakukan sekaligus untuk seluruh baris, jadi ratusan
+# ribu siswa bisa dievaluasi dalam hitungan detik.
+
+
+def true_class_rank(scores, y_true_codes):
+    """
+    Peringkat kelas asli (0 = teratas) di sepanjang sumbu kelas terakhir.
+    Skor yang sama diurutkan berdasarkan indeks kelas terkecil, sama seperti
+    top_n() di knn_engine yang dipakai API. Kode -1 (kelas tidak dikenal
+    model) selalu dianggap meleset.
+    """
+    n_classes = scores.shape[-1]
+    shape = (len(y_true_codes),) + (1,) * (scores.ndim - 1)
+    true_idx = np.asarray(y_true_codes).reshape(shape)
+    true_score = np.take_along_axis(scores, np.maximum(true_idx, 0), axis=-1)
+    class_idx = np.arange(n_classes)
+    better = (scores > true_score) | ((scores == true_score) & (class_idx < true_idx))
+    ranks = better.sum(axis=-1)
+    return np.where(true_idx[..., 0] < 0, n_classes, ranks)
+
+
+def encode_labels(classes, y_true):
+    """Ubah nama sekolah asli jadi indeks kelas model (-1 kalau sekolahnya tidak dikenal model)"""
+    classes = np.asarray(classes)
+    order = np.argsort(classes)
+    pos = np.searchsorted(classes[order], y_true)
+    pos = np.clip(pos, 0, len(classes) - 1)
+    codes = order[pos]
+    return np.where(classes[codes] == np.asarray(y_true), codes, -1)
+
+
+@dataclass
+class TopNReport:
+    """Hasil evaluasi Top-N untuk satu matriks probabilitas"""
+    classes: np.ndarray
+    y_true: np.ndarray
+    top_idx: np.ndarray        # (n, max_n) indeks kelas Top-N, urut dari yang tertinggi
+    top_probs: np.ndarray      # (n, max_n) probabilitasnya
+    true_rank: np.ndarray      # (n,) peringkat sekolah asli, 1 = teratas
+    accuracy_curve: np.ndarray # (max_n,) akurasi Top-1 s.d. Top-max_n
+
+    @property
+    def confidence(self) -> np.ndarray:
+        """Probabilitas rekomendasi #1 setiap siswa"""
+        return self.top_probs[:, 0]
+
+    @property
+    def top_schools(self) -> np.ndarray:
+        """Nama sekolah Top-N setiap siswa (n, max_n)"""
+        return self.classes[self.top_idx]
+
+    def accuracy(self, n: int) -> float:
+        return float(self.accuracy_curve[n - 1])
+
+    def hits(self, n: int) -> np.ndarray:
+        """Boolean per siswa: apakah sekolah asli masuk Top-n"""
+        return self.true_rank <= n
+
+    def per_school_recall(self, n: int = 6):
+        """Recall Top-n per sekolah asli: DataFrame [Sekolah, Jumlah_Siswa, Recall]"""
+        import pandas as pd
+
+        schools, codes = np.unique(self.y_true, return_inverse=True)
+        total = np.bincount(codes, minlength=len(schools))
+        hit = np.bincount(codes, weights=self.hits(n), minlength=len(schools))
+        return pd.DataFrame({'Sekolah': schools, 'Jumlah_Siswa': total, f'Recall_Top{n}': hit / total})
+
+
+def evaluate_top_n(probs, classes, y_true, max_n=6) -> TopNReport:
+    """
+    Evaluasi satu pass: Top-N (argpartition), peringkat sekolah asli, kurva
+    akurasi Top-1..Top-max_n, confidence, dan recall per sekolah.
+    """
+    probs = np.asarray(probs)
+    classes = np.asarray(classes, dtype=object)
+    y_true = np.asarray(y_true, dtype=object)
+    max_n = min(max_n, probs.shape[1])
+
+    top_idx, top_probs = top_n(probs, max_n)
+    true_rank = true_class_rank(probs, encode_labels(classes, y_true)) + 1
+
+    # Kurva akurasi: jumlah siswa dengan peringkat <= n, untuk semua n sekaligus
+    rank_counts = np.bincount(np.minimum(true_rank, max_n + 1), minlength=max_n + 2)
+    accuracy_curve = np.cumsum(rank_counts[1:max_n + 1]) / max(len(y_true), 1)
+
+    return TopNReport(classes, y_true, top_idx, top_probs, true_rank, accuracy_curve)
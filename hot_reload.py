@@ -0,0 +1,123 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# ==========================================
+# HOT RELOAD MODEL TANPA DOWNTIME
+# ==========================================
+# Model aktif disimpan sebagai satu objek ActiveModel yang tidak pernah
+# diubah isinya. Request mengambil referensinya sekali di awal, jadi kalau
+# di tengah jalan model diganti, request itu tetap selesai dengan model lama.
+# Model baru dimuat & dipanaskan di thread terpisah, lalu referensinya
+# ditukar (swap) dalam satu assignment.
+
+# Contoh rata-rata rapor untuk memanaskan model baru sebelum dipakai
+WARMUP_FEATURES = np.array([
+    [85.0, 88.0, 80.0, 84.0],
+    [90.0, 90.0, 90.0, 90.0],
+    [95.0, 94.0, 96.0, 95.0],
+])
+
+
+@dataclass(frozen=True)
+class ActiveModel:
+    predictor: object
+    version: str
+    loaded_at: float = field(default_factory=time.time)
+
+
+class ModelHolder:
+    """
+    Pemegang model aktif + mekanisme reload di belakang layar.
+
+    loader(version) harus mengembalikan (predictor, versi). version=None
+    artinya "versi terbaru / aktif menurut artefak di disk".
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._reload_lock = threading.Lock()
+        self._status = {"state": "idle", "last_error": None, "last_reload_at": None,
+                        "last_reload_ms": None, "reloads": 0, "failures": 0}
+        predictor, version = loader(None)
+        self._active = ActiveModel(predictor, version)
+
+    def get(self) -> ActiveModel:
+        # Membaca satu referensi atribut bersifat atomik, jadi tidak perlu lock di jalur request
+        return self._active
+
+    def reload(self, version=None) -> ActiveModel:
+        """Muat + panaskan model baru, lalu tukar secara atomik. Gagal = model lama tetap dipakai."""
+        with self._reload_lock:
+            return self._reload_locked(version)
+
+    def _reload_locked(self, version):
+        """Isi reload(); pemanggil harus sudah memegang _reload_lock"""
+        self._status["state"] = "loading"
+        started = time.perf_counter()
+        try:
+            predictor, new_version = self._loader(version)
+            # Panaskan: sentuh seluruh data training (page-in memory-map) & jalur prediksi
+            predictor.recommend(WARMUP_FEATURES, 6)
+        except Exception as e:
+            self._status.update(state="idle", last_error=f"{type(e).__name__}: {e}")
+            self._status["failures"] += 1
+            raise
+
+        self._active = ActiveModel(predictor, new_version)
+        self._status.update(state="idle", last_error=None, last_reload_at=time.time(),
+                            last_reload_ms=(time.perf_counter() - started) * 1000.0)
+        self._status["reloads"] += 1
+        return self._active
+
+    def reload_async(self, version=None) -> bool:
+        """Jalankan reload di thread latar. False kalau reload lain sedang berjalan."""
+        # Lock diambil di sini (bukan cek locked() lalu start) supaya dua pemanggil tidak sama-sama lolos
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._reload_locked(version)
+            except Exception as e:
+                print(f"❌ Reload model gagal, tetap memakai versi {self._active.version}: {e}")
+            finally:
+                self._reload_lock.release()
+
+        try:
+            threading.Thread(target=run, name="model-reload", daemon=True).start()
+        except BaseException:
+            self._reload_lock.release()
+            raise
+        return True
+
+    def watch(self, read_marker, interval_s=5.0):
+        """
+        Mode pantau file: cek read_marker() tiap interval_s detik (mis. isi
+        model_bundle/CURRENT). Kalau berubah, model dimuat ulang otomatis.
+        Kalau saat itu reload lain sedang berjalan, perubahan dicoba lagi di cek berikutnya.
+        """
+        def run():
+            last = read_marker()
+            while True:
+                time.sleep(interval_s)
+                try:
+                    marker = read_marker()
+                except Exception:
+                    continue
+                if marker != last and self.reload_async():
+                    last = marker
+                    print(f"🔄 Artefak model berubah ({marker}), memuat ulang...")
+
+        threading.Thread(target=run, name="model-watch", daemon=True).start()
+
+    def status(self) -> dict:
+        active = self._active
+        return {
+            "model_version": active.version,
+            "engine": type(active.predictor).__name__,
+            "loaded_at": active.loaded_at,
+            "reload": dict(self._status),
+        }
@@ -0,0 +1,268 @@
+import threading
+import weakref
+
+import numpy as np
+
+# ==========================================
+# MESIN INFERENSI k-NN (NUMPY MURNI, TANPA SKLEARN)
+# ==========================================
+# Saat melayani prediksi, kita hanya butuh: MinMax scaling, k tetangga
+# terdekat (Euclidean), voting berbobot jarak (weights='distance'), lalu
+# ambil Top-N. Semua itu dikerjakan langsung di NumPy dengan buffer float32
+# yang disiapkan sekali per thread, jadi tidak perlu unpickle sklearn.
+
+# Jarak di bawah ini dianggap 0 (titik identik). Selisih pembulatan float32
+# ada di orde 1e-7, sedangkan jarak antar nilai rapor berbeda jauh lebih besar.
+ZERO_DIST = 1e-5
+
+# Batas memori satu buffer kerja (chunk x n_train float32). Jumlah baris per potongan
+# menyesuaikan n_train, jadi memori per thread tetap kecil walaupun data training besar.
+BUFFER_BYTES = 16 * 2**20
+
+
+class _WorkBuffers:
+    """Buffer kerja satu thread (objek biasa supaya bisa di-weakref dan jumlahnya bisa dihitung)"""
+    __slots__ = ('scaled', 'dist', 'diff', '__weakref__')
+
+    def __init__(self, scaled, dist, diff):
+        self.scaled, self.dist, self.diff = scaled, dist, diff
+
+
+def top_n(probs: np.ndarray, n: int = 6):
+    """
+    Ambil indeks & probabilitas N kelas teratas untuk setiap baris sekaligus.
+    Pakai argpartition (partial sort) lalu cukup urutkan N kandidatnya saja.
+    Probabilitas yang sama diurutkan berdasarkan indeks kelas terkecil.
+    """
+    n = min(n, probs.shape[1])
+    top_idx = np.argpartition(-probs, n - 1, axis=1)[:, :n]
+    top_probs = np.take_along_axis(probs, top_idx, axis=1)
+    # Nilai sama di batas potongan: pilihan argpartition tidak tentu, jadi baris
+    # tersebut diurutkan penuh (stable) supaya kelas berindeks terkecil yang masuk
+    tied = np.flatnonzero((probs >= top_probs.min(axis=1, keepdims=True)).sum(axis=1) > n)
+    if len(tied):
+        top_idx[tied] = np.argsort(-probs[tied], axis=1, kind="stable")[:, :n]
+        top_probs[tied] = np.take_along_axis(probs[tied], top_idx[tied], axis=1)
+    order = np.lexsort((top_idx, -top_probs), axis=1)
+    return np.take_along_axis(top_idx, order, axis=1), np.take_along_axis(top_probs, order, axis=1)
+
+
+def affine_params(scaler):
+    """
+    Ubah scaler sklearn yang sudah di-fit menjadi (scale, min_) untuk X * scale + min_.
+    MinMaxScaler: langsung scale_ & min_. StandardScaler / RobustScaler: (X - pusat) / skala.
+    """
+    if hasattr(scaler, 'min_'):
+        return np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+    center = getattr(scaler, 'mean_', None)
+    if center is None:
+        center = getattr(scaler, 'center_', None)
+    n_features = scaler.n_features_in_
+    center = np.zeros(n_features) if center is None else np.asarray(center, dtype=np.float64)
+    spread = scaler.scale_
+    spread = np.ones(n_features) if spread is None else np.asarray(spread, dtype=np.float64)
+    return 1.0 / spread, -center / spread
+
+
+class KNNEngine:
+    """
+    Pengganti KNeighborsClassifier + scaler sklearn untuk inferensi.
+
+    X_train : data training yang SUDAH dinormalisasi (n_train x n_fitur), atau daftar
+              beberapa array seperti itu (segmen bundle hasil update incremental,
+              dipakai apa adanya tanpa digabung)
+    y_codes : indeks kelas tiap baris training (0..n_kelas-1)
+    classes : nama sekolah sesuai urutan kode kelas
+    scale, min_ : parameter scaler dalam bentuk X * scale + min_ (MinMax,
+                  Standard & Robust scaler semuanya bisa ditulis begini)
+    weights : 'distance' (default, 1/jarak) atau 'uniform'
+    p : pangkat jarak Minkowski (2 = Euclidean, 1 = Manhattan)
+    """
+
+    def __init__(self, X_train, y_codes, classes, k, scale, min_, weights='distance', p=2, chunk_size=256,
+                 buffer_bytes=BUFFER_BYTES):
+        if weights not in ('distance', 'uniform'):
+            raise ValueError(f"weights='{weights}' tidak didukung KNNEngine.")
+        # Disimpan per kolom (n_fitur x n_train) supaya selisih per fitur dihitung secara kontigu.
+        # Kalau X_train sudah berupa transpose dari array kolom float32 (mis. memory-map dari
+        # model_bundle), tidak ada data yang disalin. Segmen: (kolom, baris_awal, baris_akhir).
+        parts = X_train if isinstance(X_train, (list, tuple)) else [X_train]
+        self._segments = []
+        offset = 0
+        for part in parts:
+            cols = np.ascontiguousarray(np.asarray(part).T, dtype=np.float32)
+            self._segments.append((cols, offset, offset + cols.shape[1]))
+            offset += cols.shape[1]
+        self.n_train = offset
+        self._X_train = None
+        self.y_codes = np.asarray(y_codes)
+        self.classes_ = np.asarray(classes, dtype=object)
+        self.k = int(min(k, self.n_train))
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.min_ = np.asarray(min_, dtype=np.float32)
+        self.weights = weights
+        self.p = p
+        # Maks. chunk_size baris per potongan, dan buffer (potongan x n_train) maks. buffer_bytes
+        self.chunk_size = int(max(1, min(chunk_size, buffer_bytes // (4 * max(self.n_train, 1)))))
+        self.n_features = self._segments[0][0].shape[0]
+        self._local = threading.local()
+        self._live_buffers = weakref.WeakSet()  # Buffer thread yang masih hidup (untuk nbytes)
+        self._buffers_lock = threading.Lock()
+
+    @property
+    def X_train(self) -> np.ndarray:
+        """Data training (n_train x n_fitur); kalau bersegmen, digabung sekali saat pertama dibutuhkan"""
+        if self._X_train is None:
+            if len(self._segments) == 1:
+                self._X_train = self._segments[0][0].T
+            else:
+                self._X_train = np.concatenate([cols for cols, _, _ in self._segments], axis=1).T
+        return self._X_train
+
+    # ------------------------------------------
+    # Konstruksi & penyimpanan
+    # ------------------------------------------
+    @classmethod
+    def from_sklearn(cls, model, scaler, **kwargs):
+        """Ambil isi model sklearn yang sudah dilatih (data training, label, k) + parameter scaler"""
+        if model.metric != 'minkowski':
+            raise ValueError("KNNEngine hanya mendukung metrik Minkowski (Euclidean/Manhattan).")
+        scale, min_ = affine_params(scaler)
+        return cls(model._fit_X, model._y, model.classes_, model.n_neighbors,
+                   scale, min_, weights=model.weights, p=model.p, **kwargs)
+
+    @property
+    def buffer_set_bytes(self) -> int:
+        """Memori satu set buffer kerja (satu per thread yang pernah memakai engine ini)"""
+        return self.chunk_size * (self.n_features + 2 * self.n_train) * 4
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memori data training + buffer kerja semua thread yang masih hidup (minimal satu set),
+        dipakai registry model untuk anggaran memori
+        """
+        with self._buffers_lock:
+            n_sets = max(1, len(self._live_buffers))
+        return sum(cols.nbytes for cols, _, _ in self._segments) + self.y_codes.nbytes + n_sets * self.buffer_set_bytes
+
+    # ------------------------------------------
+    # Buffer kerja (satu set per thread, dipakai ulang; dilepas saat thread-nya selesai)
+    # ------------------------------------------
+    def _buffers(self):
+        buf = getattr(self._local, 'buf', None)
+        if buf is None:
+            n_train = self.n_train
+            buf = _WorkBuffers(
+                scaled=np.empty((self.chunk_size, self.n_features), dtype=np.float32),
+                dist=np.empty((self.chunk_size, n_train), dtype=np.float32),
+                diff=np.empty((self.chunk_size, n_train), dtype=np.float32),
+            )
+            self._local.buf = buf
+            with self._buffers_lock:
+                self._live_buffers.add(buf)
+        return buf
+
+    # ------------------------------------------
+    # Inferensi
+    # ------------------------------------------
+    def kneighbors(self, X_raw):
+        """Jarak & indeks k tetangga terdekat (belum diurutkan) untuk data mentah (belum dinormalisasi)"""
+        # Sama seperti check_array sklearn: NaN/inf (termasuk nilai di luar jangkauan float32)
+        # akan menghasilkan jarak NaN & tetangga acak, jadi ditolak sebelum scaling
+        X_raw = np.asarray(X_raw)
+        if not np.isfinite(X_raw).all() or (X_raw.size and np.abs(X_raw).max() > np.finfo(np.float32).max):
+            raise ValueError("Input berisi NaN atau nilai tak hingga.")
+        X_raw = X_raw.astype(np.float32, copy=False).reshape(-1, self.n_features)
+        n = len(X_raw)
+        all_dist = np.empty((n, self.k), dtype=np.float32)
+        all_idx = np.empty((n, self.k), dtype=np.int64)
+        buf = self._buffers()
+
+        for start in range(0, n, self.chunk_size):
+            stop = min(start + self.chunk_size, n)
+            m = stop - start
+            scaled, dist, diff = buf.scaled[:m], buf.dist[:m], buf.diff[:m]
+
+            # 1. Scaling (X * scale + min_)
+            np.multiply(X_raw[start:stop], self.scale, out=scaled)
+            np.add(scaled, self.min_, out=scaled)
+
+            # 2. Jarak Minkowski berpangkat p (tanpa akar dulu), dijumlahkan per fitur
+            dist.fill(0.0)
+            for j in range(self.n_features):
+                for cols, lo, hi in self._segments:
+                    np.subtract(scaled[:, j:j + 1], cols[j], out=diff[:, lo:hi])
+                if self.p == 2:
+                    np.multiply(diff, diff, out=diff)
+                else:
+                    np.abs(diff, out=diff)
+                    if self.p != 1:
+                        np.power(diff, self.p, out=diff)
+                np.add(dist, diff, out=dist)
+
+            # 3. Ambil k terdekat tanpa sorting penuh
+            if self.k < dist.shape[1]:
+                idx = np.argpartition(dist, self.k - 1, axis=1)[:, :self.k]
+            else:
+                idx = np.broadcast_to(np.arange(self.k), (m, self.k))
+            all_idx[start:stop] = idx
+            nearest = np.take_along_axis(dist, idx, axis=1)
+            if self.p == 2:
+                np.sqrt(nearest, out=nearest)
+            elif self.p != 1:
+                np.power(nearest, 1.0 / self.p, out=nearest)
+            nearest[nearest < ZERO_DIST] = 0.0
+            all_dist[start:stop] = nearest
+
+        return all_dist, all_idx
+
+    def votes_from_neighbors(self, dist, idx):
+        """Voting berbobot 1/jarak (weights='distance') atau 1 suara per tetangga (weights='uniform')"""
+        n = len(dist)
+        if self.weights == 'uniform':
+            weights = np.ones(dist.shape)
+        else:
+            with np.errstate(divide='ignore'):
+                weights = 1.0 / dist.astype(np.float64)
+            # Kalau ada tetangga dengan jarak 0, hanya tetangga itu yang dihitung
+            inf_mask = np.isinf(weights)
+            inf_rows = inf_mask.any(axis=1)
+            weights[inf_rows] = inf_mask[inf_rows]
+
+        n_classes = len(self.classes_)
+        flat = (np.arange(n)[:, None] * n_classes + self.y_codes[idx]).ravel()
+        votes = np.bincount(flat, weights=weights.ravel(), minlength=n * n_classes)
+        votes = votes.reshape(n, n_classes)
+
+        total = votes.sum(axis=1, keepdims=True)
+        total[total == 0.0] = 1.0
+        return votes / total
+
+    def predict_proba(self, X_raw):
+        """Probabilitas per sekolah untuk data mentah, setara scaler.transform + model.predict_proba"""
+        dist, idx = self.kneighbors(X_raw)
+        return self.votes_from_neighbors(dist, idx)
+
+    def recommend(self, X_raw, n=6):
+        """Langsung kembalikan (indeks, probabilitas) Top-N sekolah per baris"""
+        return top_n(self.predict_proba(X_raw), n)
+
+
+class SklearnPredictor:
+    """Pembungkus model + scaler sklearn dengan antarmuka yang sama seperti KNNEngine"""
+
+    def __init__(self, model, scaler):
+        self.model = model
+        self.scaler = scaler
+        self.classes_ = model.classes_
+
+    @property
+    def nbytes(self) -> int:
+        return self.model._fit_X.nbytes + self.model._y.nbytes
+
+    def predict_proba(self, X_raw):
+        return self.model.predict_proba(self.scaler.transform(X_raw))
+
+    def recommend(self, X_raw, n=6):
+        return top_n(self.predict_proba(X_raw), n)
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from knn_engine import top_n
+from model_bundle import BUNDLE_DIR, FEATURE_COLUMNS, check_version_name, load_bundle
+
+# ==========================================
+# TABEL REKOMENDASI HASIL PRAHITUNG (LOOKUP TABLE)
+# ==========================================
+# Input model hanya 4 rata-rata di rentang terbatas (mis. 70-100), jadi
+# seluruh kombinasi di grid berjarak tetap bisa dihitung sekali secara
+# offline. Setiap titik grid menyimpan Top-6 indeks sekolah (uint8/uint16)
+# dan probabilitasnya (uint16, p * 65535), semuanya memory-mapped:
+#
+#   lookup_table/<versi_model>/
+#   ├── meta.json        # grid (min, max, step), versi model, top_n
+#   ├── top_idx.npy      # (n_titik, top_n) indeks kelas
+#   └── top_prob.npy     # (n_titik, top_n) probabilitas terkuantisasi
+#
+# Query yang tepat berada di titik grid dijawab dengan satu kali baca
+# tabel (O(1)); di luar grid dihitung model seperti biasa. Tabel terikat
+# ke versi model, jadi setelah hot reload ke versi lain tabel lama tidak
+# dipakai sampai tabel versi baru dibangun.
+#
+# Cara pakai:
+#   python lookup_table.py                                # grid 70-100 langkah 0.5 (61^4 titik)
+#   python lookup_table.py --min 75 --max 100 --step 0.5 --jobs 4
+
+LOOKUP_DIR = 'lookup_table'
+PROB_SCALE = 65535
+ON_GRID_TOL = 1e-6
+
+
+def _table_dir(root, version):
+    check_version_name(version)
+    return os.path.join(root, version)
+
+
+class LookupTable:
+    """Tabel Top-N (memory-mapped) untuk satu versi model di grid 4 dimensi"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.version = meta['model_version']
+        self.lo = float(meta['grid']['min'])
+        self.step = float(meta['grid']['step'])
+        self.n_steps = int(meta['grid']['n_steps'])
+        self.top_n = int(meta['top_n'])
+        self.top_idx = np.load(os.path.join(path, 'top_idx.npy'), mmap_mode='r')
+        self.top_prob = np.load(os.path.join(path, 'top_prob.npy'), mmap_mode='r')
+        n_features = len(meta['feature_columns'])
+        n_points = self.n_steps ** n_features
+        # Indeks datar: dimensi terakhir berubah paling cepat (sama seperti grid_points)
+        self._strides = self.n_steps ** np.arange(n_features - 1, -1, -1, dtype=np.int64)
+        if self.top_idx.shape != (n_points, self.top_n) or self.top_prob.shape != (n_points, self.top_n):
+            raise ValueError(f"Ukuran tabel di '{path}' tidak sesuai meta.json.")
+
+    def grid_index(self, X):
+        """(mask di grid, indeks baris tabel) untuk setiap baris X"""
+        X = np.asarray(X, dtype=np.float64).reshape(len(X), -1)
+        q = (X - self.lo) / self.step
+        steps = np.rint(q)
+        on_grid = ((np.abs(q - steps) <= ON_GRID_TOL).all(axis=1)
+                   & (steps.min(axis=1) >= 0) & (steps.max(axis=1) < self.n_steps))
+        flat = steps.astype(np.int64) @ self._strides
+        return on_grid, np.where(on_grid, flat, 0)
+
+    def lookup(self, X, n=6):
+        """(mask, top_idx, top_prob) — hanya baris dengan mask True yang terisi dari tabel"""
+        on_grid, flat = self.grid_index(X)
+        rows = flat[on_grid]
+        top_idx = np.zeros((len(flat), n), dtype=np.int64)
+        top_prob = np.zeros((len(flat), n), dtype=np.float64)
+        top_idx[on_grid] = self.top_idx[rows, :n]
+        top_prob[on_grid] = self.top_prob[rows, :n] / PROB_SCALE
+        return on_grid, top_idx, top_prob
+
+
+def open_table(version, root=LOOKUP_DIR):
+    """Buka tabel untuk versi model ini, atau None kalau belum dibangun"""
+    path = _table_dir(root, version)
+    try:
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    return LookupTable(path, meta)
+
+
+class LookupPredictor:
+    """
+    Predictor dengan tabel di depannya: baris di grid dijawab dari tabel,
+    sisanya (dan predict_proba penuh) diteruskan ke model asli.
+    on_rows(n_tabel, n_model) dipanggil setiap recommend() untuk metrik.
+    """
+
+    def __init__(self, predictor, table, on_rows=None):
+        self.predictor = predictor
+        self.table = table
+        self.classes_ = predictor.classes_
+        self.on_rows = on_rows
+
+    @property
+    def nbytes(self) -> int:
+        # Tabel memory-mapped: halaman yang tidak disentuh tidak memakan RAM
+        return getattr(self.predictor, 'nbytes', 0)
+
+    def predict_proba(self, X_raw):
+        return self.predictor.predict_proba(X_raw)
+
+    def recommend(self, X_raw, n=6):
+        X_raw = np.asarray(X_raw, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+        if n > self.table.top_n:
+            return self.predictor.recommend(X_raw, n)
+        on_grid, top_idx, top_prob = self.table.lookup(X_raw, n)
+        off_grid = ~on_grid
+        if off_grid.any():
+            top_idx[off_grid], top_prob[off_grid] = self.predictor.recommend(X_raw[off_grid], n)
+        if self.on_rows is not None:
+            n_table = int(on_grid.sum())
+            self.on_rows(n_table, len(X_raw) - n_table)
+        return top_idx, top_prob
+
+
+def with_lookup_table(predictor, version, root=LOOKUP_DIR, on_rows=None):
+    """Bungkus predictor dengan tabel versi ini kalau tabelnya ada; kalau tidak, kembalikan apa adanya"""
+    table = open_table(version, root)
+    if table is None:
+        return predictor
+    return LookupPredictor(predictor, table, on_rows)
+
+
+# ==========================================
+# PEMBANGUNAN TABEL (VEKTORISASI, PER POTONGAN, PARALEL)
+# ==========================================
+def grid_points(start, stop, lo, step, n_steps, n_features):
+    """Koordinat titik grid untuk indeks datar [start, stop) — dimensi terakhir berubah paling cepat"""
+    flat = np.arange(start, stop, dtype=np.int64)
+    X = np.empty((len(flat), n_features), dtype=np.float64)
+    for j in range(n_features - 1, -1, -1):
+        flat, digit = np.divmod(flat, n_steps)
+        X[:, j] = lo + digit * step
+    return X
+
+
+def _build_chunk(task):
+    """Hitung satu potongan titik grid dan tulis langsung ke file tabel"""
+    bundle_root, version, tmp, start, stop, lo, step, n_steps, n = task
+    engine = load_bundle(bundle_root, version).to_engine()
+    X = grid_points(start, stop, lo, step, n_steps, engine.n_features)
+    top_idx, top_prob = top_n(engine.predict_proba(X), n)
+
+    idx_out = np.load(os.path.join(tmp, 'top_idx.npy'), mmap_mode='r+')
+    prob_out = np.load(os.path.join(tmp, 'top_prob.npy'), mmap_mode='r+')
+    idx_out[start:stop] = top_idx
+    prob_out[start:stop] = np.rint(top_prob * PROB_SCALE)
+    idx_out.flush()
+    prob_out.flush()
+    return stop - start
+
+
+def build_table(lo=70.0, hi=100.0, step=0.5, n=6, bundle_root=BUNDLE_DIR, version=None,
+                root=LOOKUP_DIR, chunk_rows=65536, n_jobs=None):
+    """Bangun tabel untuk versi model (default: versi aktif). Mengembalikan path tabel."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    bundle = load_bundle(bundle_root, version)
+    n_features = len(bundle.manifest['feature_columns'])
+    n_classes = len(bundle.classes)
+    n_steps = int(round((hi - lo) / step)) + 1
+    n_points = n_steps ** n_features
+    n = min(n, n_classes)
+
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+    try:
+        idx_dtype = np.uint8 if n_classes <= 256 else np.uint16
+        np.lib.format.open_memmap(os.path.join(tmp, 'top_idx.npy'), mode='w+', dtype=idx_dtype, shape=(n_points, n))
+        np.lib.format.open_memmap(os.path.join(tmp, 'top_prob.npy'), mode='w+', dtype=np.uint16, shape=(n_points, n))
+
+        tasks = [(bundle_root, bundle.version, tmp, start, min(start + chunk_rows, n_points), lo, step, n_steps, n)
+                 for start in range(0, n_points, chunk_rows)]
+        n_jobs = n_jobs or os.cpu_count() or 1
+        started = time.perf_counter()
+        done = 0
+        if n_jobs == 1:
+            results = map(_build_chunk, tasks)
+        else:
+            pool = ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)))
+            results = pool.map(_build_chunk, tasks)
+        try:
+            for rows in results:
+                done += rows
+                elapsed = time.perf_counter() - started
+                print(f"\r   {done}/{n_points} titik ({done / elapsed:,.0f} titik/detik)", end='', flush=True)
+        finally:
+            if n_jobs != 1:
+                pool.shutdown()
+        print()
+
+        meta = {
+            'model_version': bundle.version,
+            'feature_columns': bundle.manifest['feature_columns'],
+            'grid': {'min': lo, 'max': lo + (n_steps - 1) * step, 'step': step, 'n_steps': n_steps},
+            'top_n': n,
+            'n_points': n_points,
+            'prob_scale': PROB_SCALE,
+        }
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        target = _table_dir(root, bundle.version)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.replace(tmp, target)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return target
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bangun tabel rekomendasi (lookup table) untuk grid 4 dimensi.")
+    parser.add_argument('--min', type=float, default=70.0)
+    parser.add_argument('--max', type=float, default=100.0)
+    parser.add_argument('--step', type=float, default=0.5)
+    parser.add_argument('--version', default=None, help="Versi bundle (default: versi aktif)")
+    parser.add_argument('--bundle-root', default=BUNDLE_DIR)
+    parser.add_argument('--root', default=LOOKUP_DIR)
+    parser.add_argument('--chunk-rows', type=int, default=65536)
+    parser.add_argument('--jobs', type=int, default=None, help="Jumlah proses (default: semua core)")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    n_steps = int(round((args.max - args.min) / args.step)) + 1
+    print(f"MEMBANGUN LOOKUP TABLE: grid {args.min}-{args.max} langkah {args.step} "
+          f"({n_steps}^{len(FEATURE_COLUMNS)} = {n_steps ** len(FEATURE_COLUMNS):,} titik)")
+    started = time.perf_counter()
+    path = build_table(args.min, args.max, args.step, bundle_root=args.bundle_root, version=args.version,
+                       root=args.root, chunk_rows=args.chunk_rows, n_jobs=args.jobs)
+    print(f"✅ Tabel disimpan di '{path}' dalam {time.perf_counter() - started:.1f} detik")
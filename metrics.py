@@ -0,0 +1,193 @@
+import threading
+import time
+from bisect import bisect_left
+
+# ==========================================
+# METRIK PROMETHEUS RINGAN (TANPA LOCK DI JALUR REQUEST)
+# ==========================================
+# Setiap thread menulis ke "shard" miliknya sendiri (dict biasa), jadi
+# counter & histogram tidak pernah berebut lock saat request berjalan.
+# Lock hanya dipakai sekali saat sebuah thread pertama kali menulis.
+# Endpoint /metrics menjumlahkan semua shard saat di-scrape.
+#
+# Waktu diukur dengan time.perf_counter_ns() (bilangan bulat nanodetik,
+# di bawah 1 mikrodetik per panggilan).
+
+clock = time.perf_counter_ns
+
+# Batas bucket latensi (detik): 25 µs s.d. 5 detik
+LATENCY_BUCKETS = (0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Dasar metrik: penyimpanan per thread + penggabungan saat scrape"""
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshots(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() berjalan atomik di bawah GIL, aman walau thread pemilik sedang menulis
+        return [shard.copy() for shard in shards]
+
+    def render(self) -> list:
+        raise NotImplementedError
+
+    def _header(self) -> list:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> dict:
+        total = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                total[labels] = total.get(labels, 0) + value
+        return total
+
+    def render(self) -> list:
+        lines = self._header()
+        for labels, value in sorted(self.values().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    """
+    Gauge naik/turun (mis. request in-flight): setiap thread menyimpan selisihnya
+    sendiri, totalnya tetap benar walau inc() & dec() terjadi di thread berbeda.
+    set_function() untuk gauge yang nilainya dibaca langsung saat scrape.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._function = None
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set_function(self, function):
+        """function() -> {tuple_label: nilai}"""
+        self._function = function
+
+    def values(self) -> dict:
+        if self._function is not None:
+            return dict(self._function())
+        return super().values()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self._bounds_ns = [int(b * 1e9) for b in self.buckets]
+
+    def observe_ns(self, labels, duration_ns):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # [jumlah per bucket ..., +Inf, total nanodetik]
+            counts = shard[labels] = [0] * (len(self._bounds_ns) + 2)
+        counts[bisect_left(self._bounds_ns, duration_ns)] += 1
+        counts[-1] += duration_ns
+
+    def observe_since(self, labels, start_ns) -> int:
+        """Catat durasi sejak start_ns, kembalikan waktu sekarang (jadi awal tahap berikutnya)"""
+        now = clock()
+        self.observe_ns(labels, now - start_ns)
+        return now
+
+    def values(self) -> dict:
+        total = {}
+        for shard in self._snapshots():
+            for labels, counts in shard.items():
+                acc = total.get(labels)
+                if acc is None:
+                    total[labels] = list(counts)
+                else:
+                    for i, c in enumerate(counts):
+                        acc[i] += c
+        return total
+
+    def render(self) -> list:
+        lines = self._header()
+        for labels, counts in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, (le,))} {cumulative}')
+            base = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{base} {_format_value(counts[-1] / 1e9)}')
+            lines.append(f'{self.name}_count{base} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Format teks Prometheus (text/plain; version=0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+# ==========================================
+# MICRO-BATCHING UNTUK /predict
+# ==========================================
+# Request /predict yang datang hampir bersamaan ditampung sebentar (window),
+# lalu dihitung sekaligus dalam satu kali scaler + k-NN. Setiap pemanggil
+# tetap menerima hasilnya masing-masing.
+
+
+class MicroBatcher:
+    """
+    Penampung request satu-siswa yang dihitung bersama oleh satu thread pekerja.
+
+    score_fn menerima matriks fitur (n x 4) dan mengembalikan list hasil
+    dengan urutan yang sama. Batch dikirim saat jumlahnya mencapai
+    max_batch_size atau saat request pertama sudah menunggu max_wait_ms.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=5.0, timeout_s=5.0):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.timeout_s = timeout_s
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "batches": 0,
+            "scored": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "max_batch_size_seen": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms_seen": 0.0,
+        }
+
+        self._worker = threading.Thread(target=self._run, name="microbatch-worker", daemon=True)
+        self._worker.start()
+
+    # ------------------------------------------
+    # Sisi pemanggil (thread request FastAPI)
+    # ------------------------------------------
+    def submit(self, features: np.ndarray):
+        """Masukkan 1 baris fitur ke antrean lalu tunggu hasilnya (maks. timeout_s detik)"""
+        future = Future()
+        self._queue.put((np.asarray(features, dtype=np.float64), time.perf_counter(), future))
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            depth = self._queue.qsize()
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+
+        try:
+            return future.result(timeout=self.timeout_s)
+        except FutureTimeoutError:
+            # Batas latensi terlewati: request dibatalkan supaya tidak ikut dihitung
+            future.cancel()
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise
+
+    def stats(self) -> dict:
+        """Metrik antrean & batch (untuk endpoint monitoring)"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = stats["scored"] / stats["batches"] if stats["batches"] else 0.0
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / stats["scored"] if stats["scored"] else 0.0
+        stats["config"] = {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+            "timeout_s": self.timeout_s,
+        }
+        return stats
+
+    # ------------------------------------------
+    # Sisi pekerja (satu thread di belakang layar)
+    # ------------------------------------------
+    def _collect(self):
+        """Ambil request pertama (blocking), lalu kumpulkan sisanya sampai window habis / batch penuh"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Buang request yang pemanggilnya sudah menyerah (timeout)
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = self.score_fn(np.vstack([item[0] for item in batch]))
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+            waits_ms = [(started - enqueued) * 1000.0 for _, enqueued, _ in batch]
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["scored"] += len(batch)
+                self._stats["last_batch_size"] = len(batch)
+                self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(batch))
+                self._stats["total_wait_ms"] += sum(waits_ms)
+                self._stats["max_wait_ms_seen"] = max(self._stats["max_wait_ms_seen"], max(waits_ms))
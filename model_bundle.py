@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# ==========================================
+# BUNDLE MODEL (SATU FORMAT, BERVERSI, BISA DI-MEMORY-MAP)
+# ==========================================
+# Struktur folder:
+#   model_bundle/
+#   ├── CURRENT                 # isinya versi yang aktif, mis. "3f9a1c2b7d10"
+#   └── 3f9a1c2b7d10/
+#       ├── manifest.json       # skema fitur, k, bobot, tabel nama sekolah, hash
+#       ├── X_train_cols.npy    # data training ternormalisasi, float32 (n_fitur x n_train)
+#       ├── y_codes.npy         # kode sekolah per baris training, int32
+#       ├── scale.npy           # MinMaxScaler.scale_ (float64)
+#       └── min.npy             # MinMaxScaler.min_ (float64)
+#
+# File .npy dibuka dengan mmap_mode='r', jadi semua worker uvicorn/gunicorn
+# berbagi halaman memori yang sama dari page cache OS dan proses load
+# hanya butuh beberapa milidetik.
+#
+# Versi hasil update incremental (model_update.py) tidak menyalin data lama:
+# folder versinya hanya berisi baris BARU, dan manifest-nya mencatat
+# "segments" = daftar versi leluhur (urut dari yang tertua) yang baris
+# miliknya sendiri ada di depan. Semua segmen memakai scaler yang sama.
+# Hash versi seperti ini = hash baris baru + metadata (termasuk content_hash
+# versi induk), jadi rantainya tetap terkunci. Versi yang disebut di
+# "segments" versi lain tidak boleh dihapus.
+
+BUNDLE_DIR = os.getenv('LOLOSIN_BUNDLE_DIR', 'model_bundle')  # Folder bundle model utama
+FORMAT_VERSION = 1
+SEGMENTED_FORMAT_VERSION = 2  # Versi bundle dengan "segments" (pembaca lama menolaknya dengan jelas)
+FEATURE_COLUMNS = ['Rerata_Smt_PKN', 'Rerata_Smt_BIND', 'Rerata_Smt_MAT', 'Rerata_Smt_IPA']
+ARRAY_FILES = {
+    'X_train_cols': np.float32,
+    'y_codes': np.int32,
+    'scale': np.float64,
+    'min': np.float64,
+}
+
+
+class BundleSchemaError(ValueError):
+    """Bundle tidak cocok dengan skema fitur / format yang diharapkan"""
+
+
+class ModelBundle:
+    """Isi satu versi bundle: array (memory-mapped) + metadata dari manifest.json"""
+
+    def __init__(self, path, manifest, arrays, segments=None):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays  # Array milik versi ini saja (untuk bundle bersegmen: baris barunya)
+        # (X_train_cols, y_codes) per segmen, urut baris training; bundle biasa = 1 segmen
+        self.segments = segments or [(arrays['X_train_cols'], arrays['y_codes'])]
+
+    @property
+    def segment_versions(self) -> list:
+        """Versi-versi yang menyimpan baris training bundle ini (urut), termasuk versi ini sendiri"""
+        return list(self.manifest.get('segments', [])) + [self.version]
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    @property
+    def classes(self) -> list:
+        return self.manifest['classes']
+
+    @property
+    def k(self) -> int:
+        return self.manifest['k']
+
+    @property
+    def X_train(self) -> np.ndarray:
+        """Data training ternormalisasi (n_train x n_fitur); view tanpa salinan kalau hanya 1 segmen"""
+        if len(self.segments) == 1:
+            return self.segments[0][0].T
+        return np.concatenate([cols for cols, _ in self.segments], axis=1).T
+
+    @property
+    def y_codes(self) -> np.ndarray:
+        if len(self.segments) == 1:
+            return self.segments[0][1]
+        return np.concatenate([codes for _, codes in self.segments])
+
+    def transform(self, X_raw) -> np.ndarray:
+        """Normalisasi MinMax memakai parameter scaler yang tersimpan di bundle"""
+        return np.asarray(X_raw, dtype=np.float64) * self.arrays['scale'] + self.arrays['min']
+
+    def to_engine(self, **kwargs):
+        """Bangun KNNEngine langsung di atas array memory-map (tanpa salinan)"""
+        from knn_engine import KNNEngine
+        if self.manifest['metric'] not in ('euclidean', 'manhattan', 'minkowski'):
+            raise BundleSchemaError(f"KNNEngine belum mendukung metric={self.manifest['metric']}.")
+        a = self.arrays
+        X_train = [cols.T for cols, _ in self.segments] if len(self.segments) > 1 else self.X_train
+        return KNNEngine(X_train, self.y_codes, self.classes, self.k, a['scale'], a['min'],
+                         weights=self.manifest['weights'], p=self.manifest.get('p', 2), **kwargs)
+
+
+def content_hash(arrays: dict, meta: dict, block_elems=1 << 20) -> str:
+    """
+    Hash SHA-256 dari metadata + isi byte setiap array.
+    Dibaca per blok, jadi array memory-map sebesar apa pun tidak dimuat penuh ke RAM.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(meta, sort_keys=True).encode('utf-8'))
+    for name in sorted(arrays):
+        arr = arrays[name]
+        digest.update(name.encode('utf-8'))
+        digest.update(str(arr.dtype).encode('utf-8'))
+        digest.update(str(arr.shape).encode('utf-8'))
+        flat = arr.reshape(-1) if arr.flags['C_CONTIGUOUS'] else np.ascontiguousarray(arr).reshape(-1)
+        for start in range(0, len(flat), block_elems):
+            digest.update(np.ascontiguousarray(flat[start:start + block_elems]).tobytes())
+    return digest.hexdigest()
+
+
+class BundleWriter:
+    """
+    Penulis bundle bertahap: data training dialokasikan langsung sebagai
+    memory-map di folder sementara, diisi per potongan (mis. saat training
+    streaming), lalu finalize() menghitung hash, menulis manifest, dan
+    me-rename folder menjadi versi baru. RAM yang dipakai tidak bergantung
+    pada jumlah data training.
+    """
+
+    def __init__(self, n_train, n_features=len(FEATURE_COLUMNS), root=BUNDLE_DIR):
+        self.root = root
+        self.n_train = int(n_train)
+        os.makedirs(root, exist_ok=True)
+        self.tmp = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+        self.X_train_cols = np.lib.format.open_memmap(
+            os.path.join(self.tmp, 'X_train_cols.npy'), mode='w+', dtype=np.float32, shape=(n_features, self.n_train))
+        self.y_codes = np.lib.format.open_memmap(
+            os.path.join(self.tmp, 'y_codes.npy'), mode='w+', dtype=np.int32, shape=(self.n_train,))
+
+    def write_rows(self, start, X_scaled, y_codes):
+        """Isi baris training [start, start+len) — X_scaled berukuran (n_baris x n_fitur)"""
+        stop = start + len(X_scaled)
+        self.X_train_cols[:, start:stop] = np.asarray(X_scaled, dtype=np.float32).T
+        self.y_codes[start:stop] = y_codes
+
+    def finalize(self, classes, k, scale, min_, feature_columns=FEATURE_COLUMNS,
+                 weights='distance', p=2, extra=None, activate=True, parent=None):
+        """
+        Tutup bundle jadi satu versi baru (dan aktifkan kalau activate=True). Mengembalikan versinya.
+        parent: ModelBundle yang barisnya dipakai ulang di depan baris versi ini (update incremental).
+        """
+        try:
+            if self.X_train_cols.shape[0] != len(feature_columns):
+                raise BundleSchemaError(
+                    f"Jumlah fitur data training ({self.X_train_cols.shape[0]}) tidak sama dengan skema ({len(feature_columns)})."
+                )
+            self.X_train_cols.flush()
+            self.y_codes.flush()
+            arrays = {
+                'X_train_cols': self.X_train_cols,
+                'y_codes': self.y_codes,
+                'scale': np.ascontiguousarray(scale, dtype=np.float64),
+                'min': np.ascontiguousarray(min_, dtype=np.float64),
+            }
+            meta = {
+                'format_version': FORMAT_VERSION,
+                'feature_columns': list(feature_columns),
+                'classes': [str(c) for c in classes],
+                'k': int(k),
+                'weights': weights,
+                'metric': {1: 'manhattan', 2: 'euclidean'}.get(p, 'minkowski'),
+                'p': p,
+                'n_train': self.n_train,
+            }
+            if parent is not None:
+                meta.update(format_version=SEGMENTED_FORMAT_VERSION, segments=parent.segment_versions,
+                            parent_hash=parent.manifest['content_hash'],
+                            n_own=self.n_train, n_train=parent.manifest['n_train'] + self.n_train)
+            if extra:
+                meta['extra'] = extra
+
+            full_hash = content_hash(arrays, meta)
+            version = full_hash[:12]
+            meta['content_hash'] = full_hash
+            meta['version'] = version
+
+            np.save(os.path.join(self.tmp, 'scale.npy'), arrays['scale'])
+            np.save(os.path.join(self.tmp, 'min.npy'), arrays['min'])
+            with open(os.path.join(self.tmp, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2, ensure_ascii=False)
+
+            # Tutup memory-map sebelum folder di-rename / dihapus
+            del arrays
+            self.X_train_cols = self.y_codes = None
+            target = os.path.join(self.root, version)
+            if os.path.isdir(target):
+                # Isi identik dengan versi yang sudah ada
+                shutil.rmtree(self.tmp, ignore_errors=True)
+            else:
+                os.replace(self.tmp, target)
+        except BaseException:
+            self.abort()
+            raise
+
+        if activate:
+            set_current(version, self.root)
+        return version
+
+    def abort(self):
+        self.X_train_cols = self.y_codes = None
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def save_bundle(X_train_scaled, y_codes, classes, k, scale, min_, root=BUNDLE_DIR,
+                feature_columns=FEATURE_COLUMNS, weights='distance', p=2, extra=None, activate=True):
+    """
+    Tulis satu versi bundle baru dan (default) jadikan versi aktif (CURRENT).
+    Penulisan dilakukan di folder sementara lalu di-rename, jadi pembaca
+    tidak pernah melihat bundle setengah jadi. Mengembalikan versinya.
+    """
+    X_train_scaled = np.asarray(X_train_scaled)
+    writer = BundleWriter(len(X_train_scaled), X_train_scaled.shape[1], root=root)
+    writer.write_rows(0, X_train_scaled, y_codes)
+    return writer.finalize(classes, k, scale, min_, feature_columns=feature_columns,
+                           weights=weights, p=p, extra=extra, activate=activate)
+
+
+def check_version_name(version):
+    """Versi hanya boleh berupa huruf/angka (mencegah path seperti '../..')"""
+    if not str(version).isalnum():
+        raise FileNotFoundError(f"Versi bundle '{version}' tidak valid.")
+
+
+def set_current(version, root=BUNDLE_DIR):
+    """Ganti versi aktif secara atomik (tulis file sementara lalu os.replace)"""
+    check_version_name(version)
+    if not os.path.isdir(os.path.join(root, version)):
+        raise FileNotFoundError(f"Versi bundle '{version}' tidak ada di '{root}'.")
+    tmp = os.path.join(root, f'.CURRENT.{os.getpid()}')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, 'CURRENT'))
+
+
+def current_version(root=BUNDLE_DIR):
+    """Versi aktif menurut file CURRENT, atau None kalau belum ada bundle"""
+    try:
+        with open(os.path.join(root, 'CURRENT'), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_bundle(root=BUNDLE_DIR, version=None, feature_columns=FEATURE_COLUMNS, mmap=True, verify=False):
+    """
+    Buka bundle (default: versi aktif). Array dibuka sebagai memory-map read-only.
+    Menolak bundle yang skema fiturnya tidak sama dengan yang diharapkan.
+    verify=True menghitung ulang hash isi (lebih lambat, membaca seluruh file).
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"Bundle model tidak ditemukan di '{root}'. Jalankan training.py dulu.")
+    manifest, arrays = _load_version(root, version, feature_columns, mmap, verify)
+
+    # Bundle bersegmen: buka baris milik setiap versi leluhur (memory-map, tanpa salinan)
+    segments = None
+    if manifest.get('segments'):
+        segments = []
+        for ancestor in manifest['segments']:
+            _, own = _load_version(root, ancestor, feature_columns, mmap, verify)
+            segments.append((own['X_train_cols'], own['y_codes']))
+        segments.append((arrays['X_train_cols'], arrays['y_codes']))
+        if sum(len(codes) for _, codes in segments) != manifest['n_train']:
+            raise BundleSchemaError(f"Jumlah baris segmen bundle '{version}' tidak sesuai manifest.")
+
+    return ModelBundle(os.path.join(root, version), manifest, arrays, segments)
+
+
+def _load_version(root, version, feature_columns, mmap, verify):
+    """Manifest + array milik satu folder versi (untuk versi bersegmen: hanya baris miliknya sendiri)"""
+    check_version_name(version)
+    path = os.path.join(root, version)
+    try:
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Versi bundle '{version}' tidak ada di '{root}'.")
+
+    if manifest.get('format_version') not in (FORMAT_VERSION, SEGMENTED_FORMAT_VERSION):
+        raise BundleSchemaError(
+            f"Format bundle v{manifest.get('format_version')} tidak didukung "
+            f"(butuh v{FORMAT_VERSION} / v{SEGMENTED_FORMAT_VERSION})."
+        )
+    if feature_columns is not None and manifest['feature_columns'] != list(feature_columns):
+        raise BundleSchemaError(
+            f"Skema fitur bundle {manifest['feature_columns']} tidak sama dengan {list(feature_columns)}."
+        )
+
+    arrays = {}
+    for name, dtype in ARRAY_FILES.items():
+        arr = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+        if arr.dtype != dtype:
+            raise BundleSchemaError(f"Array '{name}' bertipe {arr.dtype}, seharusnya {np.dtype(dtype)}.")
+        arrays[name] = arr
+
+    n_features = len(manifest['feature_columns'])
+    n_own = manifest.get('n_own', manifest['n_train'])
+    if arrays['X_train_cols'].shape != (n_features, n_own):
+        raise BundleSchemaError(f"Ukuran X_train_cols {arrays['X_train_cols'].shape} tidak sesuai manifest.")
+
+    if verify:
+        meta = {k: v for k, v in manifest.items() if k not in ('content_hash', 'version')}
+        if content_hash(arrays, meta) != manifest['content_hash']:
+            raise BundleSchemaError(f"Hash isi bundle '{version}' tidak cocok (file rusak/diubah).")
+
+    return manifest, arrays
+
+
+def save_bundle_from_sklearn(model, scaler, root=BUNDLE_DIR, **kwargs):
+    """Bungkus KNeighborsClassifier + scaler (MinMax/Standard/Robust) yang sudah dilatih menjadi bundle"""
+    from knn_engine import affine_params
+    if model.metric != 'minkowski':
+        raise BundleSchemaError("Bundle hanya mendukung metrik Minkowski (Euclidean/Manhattan).")
+    scale, min_ = affine_params(scaler)
+    return save_bundle(model._fit_X, model._y, model.classes_, model.n_neighbors,
+                       scale, min_, root=root, weights=model.weights, p=model.p, **kwargs)
+
+
+# ==========================================
+# KONVERSI DARI FILE .PKL
+# ==========================================
+# Jalankan: python model_bundle.py
+# untuk membuat bundle dari model_knn_smp.pkl + scaler_smp.pkl yang sudah ada.
+if __name__ == '__main__':
+    import joblib
+
+    version = save_bundle_from_sklearn(joblib.load('model_knn_smp.pkl'), joblib.load('scaler_smp.pkl'))
+    bundle = load_bundle(verify=True)
+    print(f"✅ Bundle model disimpan di '{BUNDLE_DIR}/{version}' (k={bundle.k}, {bundle.manifest['n_train']} data training)")
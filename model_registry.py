@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from hot_reload import ModelHolder
+
+# ==========================================
+# REGISTRY MODEL PER WILAYAH & TAHUN (LAZY LOAD + LRU)
+# ==========================================
+# Satu deployment melayani model terpisah untuk setiap wilayah (jakut,
+# jaksel, jaktim, ...) dan tahun ajaran. Setiap kunci "<wilayah>/<tahun>"
+# punya folder bundle sendiri dengan struktur sama seperti model_bundle/:
+#
+#   model_registry/
+#   ├── jaksel/2025/              # CURRENT + folder versi (hasil training_stream.py --root ...)
+#   ├── jaktim/2024/
+#   └── usage.json                # jumlah pemakaian per kunci, untuk prefetch saat startup
+#
+# Model baru dimuat saat pertama dipakai, lalu disimpan selama total
+# memorinya masih di bawah anggaran. Kalau melebihi anggaran, model yang
+# paling lama tidak dipakai (LRU) dilepas. Setiap model dipegang oleh
+# ModelHolder, jadi tetap bisa di-hot-reload per kunci.
+
+
+def registry_key(region, year) -> str:
+    """Kunci registry "<wilayah>/<tahun>". Wilayah hanya huruf/angka (mencegah path seperti '../..')"""
+    region = str(region).strip().lower()
+    if not region.isalnum():
+        raise KeyError(f"Wilayah '{region}' tidak valid.")
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        raise KeyError(f"Tahun '{year}' tidak valid.")
+    return f"{region}/{year}"
+
+
+def predictor_nbytes(predictor) -> int:
+    """Perkiraan memori satu predictor (data training + buffer kerja)"""
+    nbytes = getattr(predictor, 'nbytes', None)
+    return int(nbytes) if nbytes is not None else 0
+
+
+class ModelRegistry:
+    """
+    Kumpulan ModelHolder per kunci dengan anggaran memori.
+
+    loader(key, version) harus mengembalikan (predictor, versi), sama seperti
+    loader ModelHolder. pinned: {kunci: ModelHolder} yang selalu dimuat dan
+    tidak pernah dilepas (mis. model default yang sudah dipakai /predict).
+    """
+
+    def __init__(self, loader, memory_budget_bytes, pinned=None, usage_path=None):
+        self._loader = loader
+        self.memory_budget_bytes = int(memory_budget_bytes)
+        self.usage_path = usage_path
+        self._pinned = dict(pinned or {})
+        self._holders = OrderedDict()     # kunci -> ModelHolder, urutan = LRU (paling lama di depan)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._evictions = 0
+        self._usage = self._read_usage()
+        self._usage_dirty = False
+
+    # ------------------------------------------
+    # Jalur request
+    # ------------------------------------------
+    def get(self, key):
+        """ActiveModel untuk kunci tersebut; dimuat dulu kalau belum ada (single-flight)"""
+        holder = self.holder(key)
+        return holder.get()
+
+    def holder(self, key) -> ModelHolder:
+        with self._lock:
+            holder = self._pinned.get(key)
+            if holder is None:
+                # Hanya kunci non-pinned yang dicatat: model pinned selalu dimuat (tidak perlu
+                # prefetch), jadi request ke model utama tidak membuat usage.json perlu ditulis ulang
+                self._usage[key] = self._usage.get(key, 0) + 1
+                self._usage_dirty = True
+                holder = self._holders.get(key)
+                if holder is not None:
+                    self._holders.move_to_end(key)
+            if holder is not None:
+                self._count(key, "hits")
+                return holder
+
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+                self._count(key, "misses")
+            else:
+                self._count(key, "coalesced")
+
+        if not is_leader:
+            return future.result()
+
+        started = time.perf_counter()
+        try:
+            holder = ModelHolder(lambda version: self._loader(key, version))
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._count(key, "load_failures")
+            future.set_exception(e)
+            raise
+        load_ms = (time.perf_counter() - started) * 1000.0
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._holders[key] = holder
+            stats = self._stats[key]
+            stats["loads"] = stats.get("loads", 0) + 1
+            stats["last_load_ms"] = load_ms
+            stats["total_load_ms"] = stats.get("total_load_ms", 0.0) + load_ms
+            self._evict_over_budget(keep=key)
+        future.set_result(holder)
+        return holder
+
+    def loaded_holder(self, key):
+        """ModelHolder kalau kunci sedang dimuat di memori, tanpa memicu load & tanpa menghitung hit"""
+        with self._lock:
+            return self._pinned.get(key) or self._holders.get(key)
+
+    def loaded_models(self) -> dict:
+        """{kunci: ActiveModel} untuk semua model yang sedang dimuat"""
+        with self._lock:
+            holders = {**self._pinned, **self._holders}
+        return {key: holder.get() for key, holder in holders.items()}
+
+    def _count(self, key, name):
+        stats = self._stats.setdefault(key, {})
+        stats[name] = stats.get(name, 0) + 1
+
+    # ------------------------------------------
+    # Anggaran memori
+    # ------------------------------------------
+    @staticmethod
+    def _nbytes(holder) -> int:
+        return predictor_nbytes(holder.get().predictor)
+
+    def _evict_over_budget(self, keep):
+        """Lepas model LRU sampai total memori (tanpa model pinned) di bawah anggaran. Dipanggil dengan lock."""
+        used = sum(self._nbytes(h) for h in self._holders.values())
+        for key in list(self._holders):
+            if used <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            # Request yang masih memegang ActiveModel lama tetap selesai; memorinya dilepas setelah itu
+            used -= self._nbytes(self._holders.pop(key))
+            self._count(key, "evictions")
+            self._evictions += 1
+
+    def evict(self, key) -> bool:
+        with self._lock:
+            if self._holders.pop(key, None) is None:
+                return False
+            self._count(key, "evictions")
+            self._evictions += 1
+            return True
+
+    # ------------------------------------------
+    # Prefetch & catatan pemakaian
+    # ------------------------------------------
+    def _read_usage(self) -> dict:
+        if not self.usage_path:
+            return {}
+        try:
+            with open(self.usage_path, encoding='utf-8') as f:
+                return {str(k): int(v) for k, v in json.load(f).items()}
+        except (FileNotFoundError, json.JSONDecodeError, ValueError, AttributeError):
+            return {}
+
+    def save_usage(self):
+        """Tulis jumlah pemakaian per kunci (atomik) supaya startup berikutnya bisa prefetch"""
+        with self._lock:
+            if not self.usage_path or not self._usage_dirty:
+                return
+            usage = dict(self._usage)
+            self._usage_dirty = False
+        os.makedirs(os.path.dirname(self.usage_path) or '.', exist_ok=True)
+        tmp = f'{self.usage_path}.{os.getpid()}'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(usage, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.usage_path)
+
+    def autosave_usage(self, interval_s=300.0):
+        """Simpan usage.json di background setiap `interval_s` (hanya kalau ada perubahan)"""
+        def run():
+            while True:
+                time.sleep(interval_s)
+                try:
+                    self.save_usage()
+                except OSError as e:
+                    print(f"⚠️  Gagal menyimpan {self.usage_path}: {e}")
+
+        threading.Thread(target=run, name="registry-usage", daemon=True).start()
+
+    def most_used(self, n) -> list:
+        with self._lock:
+            ranked = sorted(self._usage.items(), key=lambda item: (-item[1], item[0]))
+        return [key for key, _ in ranked[:n]]
+
+    def prefetch(self, keys, background=True):
+        """Muat kunci-kunci ini lebih awal (berhenti kalau anggaran memori sudah penuh)"""
+        def run():
+            for key in keys:
+                if key in self._pinned or key in self._holders:
+                    continue
+                try:
+                    holder = ModelHolder(lambda version, key=key: self._loader(key, version))
+                except Exception as e:
+                    print(f"⚠️  Prefetch model '{key}' gagal: {e}")
+                    continue
+                with self._lock:
+                    used = sum(self._nbytes(h) for h in self._holders.values())
+                    if used + self._nbytes(holder) > self.memory_budget_bytes:
+                        break
+                    if key not in self._holders:
+                        self._holders[key] = holder
+                        self._holders.move_to_end(key, last=False)  # prefetch tidak dianggap "baru dipakai"
+                        self._count(key, "prefetched")
+
+        if background:
+            threading.Thread(target=run, name="registry-prefetch", daemon=True).start()
+        else:
+            run()
+
+    # ------------------------------------------
+    # Statistik
+    # ------------------------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = {**self._pinned, **self._holders}
+            keys = sorted(set(self._stats) | set(loaded))
+            per_model = {}
+            for key in keys:
+                entry = dict(self._stats.get(key, {}))
+                holder = loaded.get(key)
+                entry["loaded"] = holder is not None
+                entry["pinned"] = key in self._pinned
+                entry["usage"] = self._usage.get(key, 0)
+                if holder is not None:
+                    active = holder.get()
+                    entry["model_version"] = active.version
+                    entry["memory_bytes"] = predictor_nbytes(active.predictor)
+                per_model[key] = entry
+            used = sum(self._nbytes(h) for h in self._holders.values())
+            pinned = sum(self._nbytes(h) for h in self._pinned.values())
+        return {
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "memory_used_bytes": used,
+            "memory_pinned_bytes": pinned,
+            "loaded": len(loaded),
+            "evictions": self._evictions,
+            "models": per_model,
+        }
@@ -0,0 +1,205 @@
+import argparse
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from dataset import LABEL_COLUMN, iter_source_chunks
+from model_bundle import BUNDLE_DIR, FEATURE_COLUMNS, BundleWriter, load_bundle
+
+try:
+    import fcntl
+except ImportError:  # Windows: kunci hanya berlaku di dalam satu proses
+    fcntl = None
+
+# ==========================================
+# UPDATE MODEL INCREMENTAL (TAMBAH ALUMNI BARU TANPA TRAINING ULANG)
+# ==========================================
+# k-NN tidak punya bobot yang perlu dilatih ulang: menambah alumni baru
+# cukup dengan menambahkan barisnya ke data tetangga dan ke tabel nama
+# sekolah. Langkahnya:
+#   1. Normalisasi baris baru dengan scaler bundle yang sedang aktif.
+#   2. Kalau ada nilai di luar batas min/max MinMaxScaler, batas diperlebar
+#      dan data lama di-rescale (transformasi affine langsung pada data yang
+#      sudah ternormalisasi, tanpa membaca Excel lagi).
+#   3. Sekolah yang belum dikenal ditambahkan di AKHIR tabel nama, jadi kode
+#      kelas lama tidak berubah.
+#   4. Hasilnya diterbitkan sebagai versi bundle baru (k & bobot tetap sama,
+#      versi asal dicatat di manifest).
+#
+# Kalau batas MinMax tetap (kasus umum), versi baru hanya berisi baris baru
+# sebagai segmen tambahan yang merujuk baris versi-versi sebelumnya (lihat
+# model_bundle.py), jadi biaya tulis + hash sebanding dengan jumlah baris
+# BARU, bukan seluruh riwayat. Data lama ditulis ulang (dipadatkan jadi satu
+# segmen) hanya kalau batas MinMax berubah, atau rantai segmen sudah
+# mencapai MAX_SEGMENTS (supaya load & k-NN tidak membuka terlalu banyak file).
+#
+# Cara pakai:
+#   python model_update.py DATASET/alumni-2026.xlsx                # terbitkan & aktifkan versi baru
+#   python model_update.py alumni-2026.csv --no-activate           # terbitkan saja
+#   python model_update.py alumni.csv --root model_registry/jaksel/2025
+# Lewat API: POST /admin/update (header X-Admin-Token)
+
+# Satu update per folder bundle dalam satu waktu, supaya dua update tidak berangkat dari versi asal yang sama.
+# Worker uvicorn adalah proses terpisah, jadi selain lock thread dipakai flock pada <root>/.update.lock.
+_update_locks = {}
+_update_locks_guard = threading.Lock()
+
+MAX_SEGMENTS = 16  # Batas panjang rantai segmen sebelum data dipadatkan ulang
+
+
+@contextmanager
+def update_lock(root):
+    with _update_locks_guard:
+        thread_lock = _update_locks.setdefault(os.path.abspath(root), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, '.update.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def minmax_bounds(scale, min_):
+    """Batas data (min, max) dari parameter MinMaxScaler(feature_range=(0, 1)): X * scale + min_"""
+    data_min = -min_ / scale
+    return data_min, data_min + 1.0 / scale
+
+
+def append_rows(X_new, labels, root=BUNDLE_DIR, version=None, activate=True, block_cols=1 << 20, compact=False):
+    """
+    Tambahkan alumni baru (rata-rata mentah n x 4 + nama sekolah) ke bundle versi
+    `version` (default: aktif) dan terbitkan versi baru. Mengembalikan ringkasan update.
+    Seluruh update berjalan di bawah update_lock(root), dan versi aktif (CURRENT)
+    baru dibaca setelah lock didapat, jadi update dari proses lain tidak tertimpa.
+    compact=True: selalu tulis ulang seluruh data jadi satu segmen.
+    """
+    X_new = np.asarray(X_new, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+    labels = [str(name) for name in labels]
+    if len(X_new) == 0:
+        raise ValueError("Tidak ada baris baru untuk ditambahkan.")
+    if len(labels) != len(X_new) or not np.isfinite(X_new).all():
+        raise ValueError("Baris baru tidak valid (jumlah label tidak sama / ada nilai kosong).")
+
+    with update_lock(root):
+        return _append_rows(X_new, labels, root, version, activate, block_cols, compact)
+
+
+def _append_rows(X_new, labels, root, version, activate, block_cols, compact):
+    base = load_bundle(root, version)
+    extra = dict(base.manifest.get('extra') or {})
+    scale = np.asarray(base.arrays['scale'], dtype=np.float64)
+    min_ = np.asarray(base.arrays['min'], dtype=np.float64)
+
+    # 1-2. Perlebar batas MinMax kalau perlu. Scaler lain (Standard/Robust) dipakai apa adanya.
+    rescaled = False
+    new_scale, new_min = scale, min_
+    if extra.get('scaler', 'minmax') == 'minmax':
+        data_min, data_max = minmax_bounds(scale, min_)
+        # Toleransi kecil: batas hasil hitung balik dari scale/min_ bisa meleset di digit terakhir
+        tol = 1e-9 * np.maximum(1.0, data_max - data_min)
+        below = X_new.min(axis=0) < data_min - tol
+        above = X_new.max(axis=0) > data_max + tol
+        if below.any() or above.any():
+            lo = np.where(below, X_new.min(axis=0), data_min)
+            hi = np.where(above, X_new.max(axis=0), data_max)
+            data_range = hi - lo
+            data_range[data_range == 0.0] = 1.0
+            new_scale = 1.0 / data_range
+            new_min = -lo * new_scale
+            rescaled = True
+
+    # 3. Kode kelas: sekolah lama tetap, sekolah baru ditambahkan di akhir
+    classes = list(base.classes)
+    positions = {name: i for i, name in enumerate(classes)}
+    new_schools = sorted(set(labels) - set(positions))
+    for name in new_schools:
+        positions[name] = len(classes)
+        classes.append(name)
+    new_codes = np.array([positions[name] for name in labels], dtype=np.int32)
+
+    # 4. Tulis versi baru: segmen baru saja, atau data lama (disalin / di-rescale per blok) + baris baru
+    n_old = base.manifest['n_train']
+    segmented = not (compact or rescaled or len(base.segment_versions) >= MAX_SEGMENTS)
+    writer = BundleWriter(len(X_new) if segmented else n_old + len(X_new), root=root)
+    try:
+        offset = 0
+        if not segmented:
+            # x_baru = x_lama_ternormalisasi * a + b, dengan a = scale_baru / scale_lama
+            a = (new_scale / scale).astype(np.float32)[:, None]
+            b = (new_min - min_ * new_scale / scale).astype(np.float32)[:, None]
+            for old_cols, old_codes in base.segments:
+                for start in range(0, old_cols.shape[1], block_cols):
+                    stop = min(start + block_cols, old_cols.shape[1])
+                    block = old_cols[:, start:stop]
+                    writer.X_train_cols[:, offset + start:offset + stop] = block * a + b if rescaled else block
+                    writer.y_codes[offset + start:offset + stop] = old_codes[start:stop]
+                offset += old_cols.shape[1]
+        writer.write_rows(offset, X_new * new_scale + new_min, new_codes)
+
+        extra.update(parent_version=base.version, appended_rows=int(len(X_new)), rescaled=rescaled)
+        new_version = writer.finalize(classes, base.k, new_scale, new_min,
+                                      feature_columns=base.manifest['feature_columns'],
+                                      weights=base.manifest['weights'], p=base.manifest.get('p', 2),
+                                      extra=extra, activate=activate, parent=base if segmented else None)
+    except BaseException:
+        writer.abort()
+        raise
+
+    return {
+        'parent_version': base.version,
+        'model_version': new_version,
+        'appended_rows': int(len(X_new)),
+        'new_schools': new_schools,
+        'rescaled': rescaled,
+        'segmented': segmented,
+        'n_train': n_old + len(X_new),
+        'activated': activate,
+    }
+
+
+def read_new_rows(paths, chunk_size=50_000):
+    """Baca file alumni baru (kolom Nama_Sekolah + Rerata_Smt_*), baris tidak lengkap dibuang"""
+    X_parts, label_parts = [], []
+    for path in paths:
+        for chunk in iter_source_chunks(path, [LABEL_COLUMN] + FEATURE_COLUMNS, chunk_size):
+            features = chunk[FEATURE_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            valid = chunk[LABEL_COLUMN].notna().to_numpy() & np.isfinite(features).all(axis=1)
+            X_parts.append(features[valid])
+            label_parts.append(chunk[LABEL_COLUMN][valid].astype(str).to_numpy(dtype=object))
+    if not X_parts:
+        return np.empty((0, len(FEATURE_COLUMNS))), np.empty(0, dtype=object)
+    return np.concatenate(X_parts), np.concatenate(label_parts)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tambahkan alumni baru ke model aktif tanpa training ulang.")
+    parser.add_argument('sources', nargs='+', help="File alumni baru (.xlsx / .csv)")
+    parser.add_argument('--root', default=BUNDLE_DIR, help="Folder bundle (mis. model_registry/jaksel/2025)")
+    parser.add_argument('--version', default=None, help="Versi asal (default: versi aktif)")
+    parser.add_argument('--no-activate', action='store_true', help="Jangan jadikan versi baru sebagai versi aktif")
+    parser.add_argument('--compact', action='store_true', help="Tulis ulang seluruh data jadi satu segmen")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    X_new, labels = read_new_rows(args.sources)
+    print(f"Menambahkan {len(X_new)} alumni baru ke '{args.root}'...")
+    summary = append_rows(X_new, labels, root=args.root, version=args.version,
+                          activate=not args.no_activate, compact=args.compact)
+    print(f"   - Versi asal   : {summary['parent_version']}")
+    print(f"   - Data training: {summary['n_train']} siswa")
+    print(f"   - Sekolah baru : {summary['new_schools'] or '-'}")
+    print(f"   - Rescale      : {'ya (batas MinMax berubah)' if summary['rescaled'] else 'tidak'}")
+    print(f"   - Penyimpanan  : {'segmen baru (data lama dipakai ulang)' if summary['segmented'] else 'ditulis ulang (1 segmen)'}")
+    status = "versi aktif" if summary['activated'] else "belum aktif"
+    print(f"✅ Bundle baru disimpan di '{args.root}/{summary['model_version']}' ({status})")
+    print("   API yang berjalan: POST /admin/reload atau aktifkan LOLOSIN_WATCH_MODEL=1")
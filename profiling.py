@@ -0,0 +1,249 @@
+import asyncio
+import functools
+import hmac
+import inspect
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import clock
+
+# ==========================================
+# PROFILING PER REQUEST (OPT-IN, DISAMPEL)
+# ==========================================
+# Untuk menyelidiki regresi latensi di production: sebagian kecil request
+# dijalankan di bawah sampling profiler, dan stack-nya disimpan sebagai
+# "collapsed stacks" (satu baris "frame;frame;frame jumlah_sampel", format
+# input flamegraph.pl / speedscope). Request dipilih kalau:
+#
+#   - kena sampel acak dengan peluang `rate`, atau
+#   - membawa header X-Profile: 1 + X-Admin-Token yang cocok.
+#
+# Profiler mengambil stack thread event loop (parsing body, validasi
+# Pydantic, middleware) dan thread worker yang menjalankan endpoint
+# (numpy / predict_proba, encoding response) setiap `interval_s`, diberi
+# awalan "loop" / "endpoint". Stack thread loop bisa ikut memuat request
+# lain yang berjalan bersamaan.
+#
+# Hasilnya disimpan di folder dengan batas jumlah file (ring: yang paling
+# lama dihapus). Request yang tidak disampel hanya melewati satu cek acak di
+# middleware dan satu ContextVar.get() di endpoint; kalau profiling mati
+# (default), middleware & pembungkus endpoint sama sekali tidak dipasang.
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_HEADER = b"x-admin-token"
+PROFILE_ID = re.compile(r"^\d{13}-\d+-\d+$")
+active_session = ContextVar("active_session", default=None)
+
+
+class ProfileSession:
+    """Sampling profiler untuk satu request: thread sampler membaca stack thread yang terdaftar"""
+
+    def __init__(self, interval_s=0.001):
+        self.interval_s = interval_s
+        self.threads = {}  # thread id -> label ("loop" / "endpoint")
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    @contextmanager
+    def thread(self, label):
+        """Ikutkan thread saat ini dalam sampling selama blok berjalan"""
+        ident = threading.get_ident()
+        self.threads[ident] = label
+        try:
+            yield
+        finally:
+            self.threads.pop(ident, None)
+
+    def start(self):
+        self._sampler = threading.Thread(target=self._run, name="lolosin-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            for ident, label in list(self.threads.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[collapse(label, frame)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def collapse(label, frame) -> str:
+    """Stack frame -> "label;fungsi (file:baris);..." dari akar ke daun"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(label)
+    return ";".join(reversed(names))
+
+
+class ProfileStore:
+    """
+    Folder profil berbatas: <id>.collapsed (stack) + <id>.json (metadata). ID diawali
+    waktu dalam milidetik, jadi urutan nama = urutan waktu; lebih dari `keep` profil,
+    yang paling lama dihapus. Aman dipakai beberapa proses worker sekaligus.
+    """
+
+    def __init__(self, directory, keep=50):
+        self.directory = directory
+        self.keep = keep
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".json")] for name in names
+                      if name.endswith(".json") and PROFILE_ID.match(name[:-len(".json")]))
+
+    def save(self, meta, collapsed) -> str:
+        with self._lock:
+            self._seq += 1
+            profile_id = f"{int(time.time() * 1000):013d}-{os.getpid()}-{self._seq}"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{profile_id}.collapsed"), "w", encoding="utf-8") as f:
+            f.write(collapsed)
+        # Metadata ditulis terakhir: profil baru terlihat di daftar setelah stack-nya lengkap
+        tmp = os.path.join(self.directory, f".{profile_id}.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"id": profile_id, **meta}, f)
+        os.replace(tmp, os.path.join(self.directory, f"{profile_id}.json"))
+        self._trim()
+        return profile_id
+
+    def _trim(self):
+        ids = self._ids()
+        for old in ids[:max(0, len(ids) - self.keep)]:
+            for ext in (".json", ".collapsed"):
+                try:
+                    os.remove(os.path.join(self.directory, old + ext))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> list:
+        """Metadata semua profil, terbaru dulu"""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(os.path.join(self.directory, f"{profile_id}.json"), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue  # Baru saja terhapus oleh proses lain
+        return profiles
+
+    def path(self, profile_id):
+        """Path file collapsed stack, None kalau ID tidak valid / sudah terhapus dari ring"""
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.collapsed")
+        return path if os.path.exists(path) else None
+
+
+def profiled(endpoint):
+    """Bungkus endpoint sync supaya thread worker-nya ikut disampel kalau request ini sedang diprofil"""
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint  # Endpoint async sudah berjalan di thread event loop
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = active_session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        with session.thread("endpoint"):
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI: pilih request yang diprofil (acak dengan peluang `rate`, atau
+    header X-Profile dari admin), jalankan di bawah ProfileSession, lalu simpan
+    hasilnya ke `store` setelah response terkirim.
+    """
+
+    def __init__(self, inner, store, rate=0.0, interval_s=0.001, admin_token=None):
+        self.inner = inner
+        self.store = store
+        self.rate = rate
+        self.interval_s = interval_s
+        self.admin_token = admin_token
+        # Dibandingkan sebagai bytes: compare_digest menolak str non-ASCII (TypeError -> 500)
+        self._token_bytes = admin_token.encode("utf-8") if admin_token else None
+
+    def _requested(self, scope) -> bool:
+        wanted = token = None
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                wanted = value
+            elif name == ADMIN_HEADER:
+                token = value
+        return wanted in (b"1", b"true") and token is not None and hmac.compare_digest(token, self._token_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.inner(scope, receive, send)
+        if self.rate > 0 and random.random() < self.rate:
+            trigger = "sample"
+        elif self.admin_token and self._requested(scope):
+            trigger = "header"
+        else:
+            return await self.inner(scope, receive, send)
+
+        session = ProfileSession(self.interval_s)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = active_session.set(session)
+        start = clock()
+        try:
+            with session.thread("loop"):
+                session.start()
+                try:
+                    await self.inner(scope, receive, send_with_status)
+                finally:
+                    session.stop()
+        finally:
+            active_session.reset(token)
+            meta = {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "trigger": trigger,
+                "duration_ms": (clock() - start) / 1e6,
+                "samples": session.samples,
+                "interval_ms": self.interval_s * 1000,
+            }
+            # Tulis file di thread lain supaya event loop tidak menunggu disk
+            try:
+                await asyncio.to_thread(self.store.save, meta, session.collapsed())
+            except OSError as e:
+                print(f"⚠️ Profil {scope['path']} gagal disimpan: {e}")
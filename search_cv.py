@@ -0,0 +1,87 @@
+import argparse
+
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+
+from dataset import DATA_FILE, load_frame
+from evaluasi import evaluate_top_n
+from model_bundle import BUNDLE_DIR, save_bundle_from_sklearn
+from tuning import cv_search, make_scaler
+
+# ==========================================
+# MODE PENCARIAN HYPERPARAMETER (CROSS-VALIDATION)
+# ==========================================
+# Berbeda dengan training.py yang memilih k dari satu split 80/20, script ini
+# memakai Stratified K-Fold di data TRAINING untuk mencari kombinasi terbaik
+# dari k, skema bobot, pangkat Minkowski p, dan jenis scaler.
+# Data testing (20%) tetap tidak diintip, hanya dipakai untuk laporan akhir.
+#
+# Cara pakai:
+#   python search_cv.py                      # cari & simpan bundle pemenang (belum aktif)
+#   python search_cv.py --activate           # sekaligus jadikan versi aktif
+#   python search_cv.py --k-max 150 --folds 10 --jobs 4
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pencarian hyperparameter k-NN dengan Stratified K-Fold CV.")
+    parser.add_argument('--k-min', type=int, default=1)
+    parser.add_argument('--k-max', type=int, default=300)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=None, help="Jumlah proses (default: semua core)")
+    parser.add_argument('--output', default='hasil_search_cv.csv')
+    parser.add_argument('--activate', action='store_true', help="Jadikan bundle pemenang sebagai versi aktif")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("MEMULAI PENCARIAN HYPERPARAMETER (CV)...")
+
+    try:
+        df = load_frame(DATA_FILE)
+    except FileNotFoundError:
+        print("❌ Error: File Data tidak ditemukan.")
+        return
+
+    # Split yang sama persis dengan training.py
+    df_train, df_test = train_test_split(df, test_size=0.2, random_state=42, stratify=df.iloc[:, 0])
+    X_train = df_train.iloc[:, 1:5].values
+    y_train = df_train.iloc[:, 0].values
+    X_test = df_test.iloc[:, 1:5].values
+    y_test = df_test.iloc[:, 0].values
+
+    # 1. Cross-validation paralel
+    print(f"Stratified {args.folds}-Fold CV pada {len(df_train)} siswa training...")
+    ranked = cv_search(X_train, y_train, k_values=range(args.k_min, args.k_max + 1),
+                       n_splits=args.folds, n_jobs=args.jobs)
+    ranked.to_csv(args.output, index=False)
+
+    print("\n" + "=" * 70)
+    print("🏆 10 KONFIGURASI TERBAIK (Top-6 Accuracy, rata-rata antar fold)")
+    print("=" * 70)
+    print(ranked.head(10).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"\n✅ Tabel lengkap ({len(ranked)} konfigurasi) disimpan di '{args.output}'")
+
+    # 2. Latih model final dengan konfigurasi pemenang (hanya dari data training)
+    best = ranked.iloc[0]
+    scaler = make_scaler(best['scaler']).fit(X_train)
+    model = KNeighborsClassifier(n_neighbors=int(best['k']), weights=best['weights'], p=int(best['p']))
+    model.fit(scaler.transform(X_train), y_train)
+
+    # 3. Laporan di data testing (hold-out)
+    test_acc = evaluate_top_n(model.predict_proba(scaler.transform(X_test)), model.classes_, y_test).accuracy(6)
+
+    version = save_bundle_from_sklearn(
+        model, scaler, activate=args.activate,
+        extra={'scaler': best['scaler'], 'cv_folds': args.folds,
+               'cv_top6_mean': float(best['mean_acc']), 'test_top6': float(test_acc)}
+    )
+    print(f"\nKonfigurasi pemenang: scaler={best['scaler']}, p={best['p']}, weights={best['weights']}, k={best['k']}")
+    print(f"   - CV Top-6   : {best['mean_acc']:.2%} (± {best['std_acc']:.2%})")
+    print(f"   - Test Top-6 : {test_acc:.2%}")
+    status = "versi aktif" if args.activate else "belum aktif, pakai --activate atau /admin/reload?version=..."
+    print(f"✅ Bundle pemenang disimpan di '{BUNDLE_DIR}/{version}' ({status})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Modul proyek ada di root repo (bukan paket). `import api` memuat model utama saat import,
+# jadi bundle & registry diarahkan ke folder sementara sebelum modul proyek mana pun di-import
+# (subprocess di tes ikut mewarisinya); tes tidak bergantung pada model_bundle/ asli.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BUNDLE_ROOT = tempfile.mkdtemp(prefix="lolosin-bundle-")
+os.environ["LOLOSIN_BUNDLE_DIR"] = BUNDLE_ROOT
+os.environ.setdefault("LOLOSIN_REGISTRY_DIR", tempfile.mkdtemp(prefix="lolosin-registry-"))
+
+from model_bundle import BundleWriter  # noqa: E402
+
+SCHOOLS = [f"SMP NEGERI {i}" for i in (1, 12, 30, 41, 53, 68, 75, 99)]
+
+
+def write_synthetic_bundle(root, n=400, seed=0):
+    """Bundle kecil: rata-rata acak 80-100 (MinMax 0-1), 8 sekolah, k=5"""
+    rng = np.random.default_rng(seed)
+    writer = BundleWriter(n, root=root)
+    writer.write_rows(0, rng.uniform(0, 1, (n, 4)), rng.integers(0, len(SCHOOLS), n))
+    return writer.finalize(SCHOOLS, 5, np.full(4, 0.05), np.full(4, -4.0))
+
+
+BUNDLE_VERSION = write_synthetic_bundle(BUNDLE_ROOT)
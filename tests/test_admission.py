@@ -0,0 +1,81 @@
+import asyncio
+
+from admission import AdmissionController, deadline_exceeded
+
+
+def http_scope(path="/predict", deadline_ms=None):
+    headers = [] if deadline_ms is None else [(b"x-request-deadline-ms", str(deadline_ms).encode())]
+    return {"type": "http", "path": path, "headers": headers}
+
+
+async def call(controller, inner, scope):
+    """Jalankan satu request, kembalikan status response-nya"""
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await controller.handle(inner, scope, None, send)
+    return next(m["status"] for m in sent if m["type"] == "http.response.start")
+
+
+def slow_app(release):
+    async def inner(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return inner
+
+
+def test_sheds_when_queue_is_full():
+    async def run():
+        shed = []
+        controller = AdmissionController(routes=["/predict"], max_in_flight=1, max_queue=1,
+                                         on_shed=lambda route, reason: shed.append(reason))
+        release = asyncio.Event()
+        inner = slow_app(release)
+        running = asyncio.create_task(call(controller, inner, http_scope()))
+        queued = asyncio.create_task(call(controller, inner, http_scope()))
+        await asyncio.sleep(0.01)
+        rejected = await call(controller, inner, http_scope())
+        release.set()
+        return rejected, await running, await queued, shed
+
+    rejected, first, second, shed = asyncio.run(run())
+    assert (rejected, first, second) == (503, 200, 200)
+    assert shed == ["queue_full"]
+
+
+def test_queue_wait_timeout_and_unlisted_routes():
+    async def run():
+        controller = AdmissionController(routes=["/predict"], max_in_flight=1, max_queue=4, max_queue_wait_s=0.02)
+        release = asyncio.Event()
+        inner = slow_app(release)
+        running = asyncio.create_task(call(controller, inner, http_scope()))
+        await asyncio.sleep(0.01)
+        timed_out = await call(controller, inner, http_scope())
+        release.set()
+        other = await call(controller, inner, http_scope("/health"))  # tidak dibatasi
+        await running
+        return timed_out, other, controller.stats()
+
+    timed_out, other, stats = asyncio.run(run())
+    assert (timed_out, other) == (503, 200)
+    assert stats["shed"] == {"queue_timeout": 1} and stats["admitted"] == 1
+
+
+def test_deadline_is_visible_to_handler():
+    async def run():
+        controller = AdmissionController(routes=["/predict"])
+        seen = []
+
+        async def inner(scope, receive, send):
+            seen.append(deadline_exceeded())
+            await asyncio.sleep(0.02)
+            seen.append(deadline_exceeded())
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        await call(controller, inner, http_scope(deadline_ms=10))
+        return seen
+
+    assert asyncio.run(run()) == [False, True]
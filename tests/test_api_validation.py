@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+client = TestClient(api.app)
+RAPOR = api.RaporInput.model_config["json_schema_extra"]["example"]
+
+
+def raw_body(value):
+    """Body JSON dengan satu nilai diganti literal mentah (NaN / Infinity tidak bisa lewat json=)"""
+    scores = ", ".join(["85.0"] * 4 + [value])
+    return "{" + ", ".join(f'"{field}": [{scores}]' for field in RAPOR) + "}"
+
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity", "1e308", "-1", "100.5"])
+def test_predict_rejects_non_finite_and_out_of_range(value):
+    response = client.post("/predict", content=raw_body(value), headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_batch_rejects_nan_student():
+    body = '{"students": [' + raw_body("85") + ", " + raw_body("NaN") + "]}"
+    response = client.post("/predict/batch", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_predict_accepts_valid_rapor():
+    response = client.post("/predict", json=RAPOR)
+    assert response.status_code == 200
+    assert len(response.json()["recommendations"]) == api.TOP_N
+
+
+def test_admin_rejects_non_ascii_token(monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "rahasia")
+    response = client.get("/debug/profiles", headers={"X-Admin-Token": "rahasiä".encode("utf-8")})
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "1e308"])
+def test_whatif_rejects_non_finite_delta(value):
+    body = '{"rapor": ' + raw_body("85") + ', "deltas": [[' + value + ', 0, 0, 0]]}'
+    response = client.post("/predict/whatif", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+    body = '{"rapor": ' + raw_body("85") + ', "grid": {"mat": [0, ' + value + ']}}'
+    response = client.post("/predict/whatif", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_whatif_rejects_large_grid_before_building_it():
+    axis = [i / 10 for i in range(100)]  # 100^4 kombinasi
+    response = client.post("/predict/whatif", json={"rapor": RAPOR, "grid": {s: axis for s in api.SUBJECTS}})
+    assert response.status_code == 400
+    response = client.post("/predict/whatif", json={"rapor": RAPOR, "grid": {"mat": [0.0] * 5000}})
+    assert response.status_code == 422
+
+
+def test_whatif_grid_scenarios():
+    response = client.post("/predict/whatif", json={"rapor": RAPOR, "grid": {"mat": [0, 1, 2], "ipa": [0, 2]}})
+    assert response.status_code == 200
+    assert len(response.json()["scenarios"]) == 6
+
+
+@pytest.mark.parametrize("path", ["/predict/msgpack", "/predict/batch/msgpack"])
+def test_internal_msgpack_paths_go_through_admission(path):
+    admitted = api.admission.stats()["admitted"]
+    client.post(path, content=b"\x90", headers={"Content-Type": "application/msgpack"})
+    assert api.admission.stats()["admitted"] == admitted + 1
+
+
+def test_nearby_inputs_share_cache_entry_but_keep_own_statistics():
+    api.result_cache.clear()
+    first = client.post("/predict", json=RAPOR).json()
+    nearby = {field: [score + 0.01 for score in scores] for field, scores in RAPOR.items()}
+    stats = api.result_cache.stats()
+    second = client.post("/predict", json=nearby).json()
+    assert api.result_cache.stats()["hits"] == stats["hits"] + 1
+    assert second["recommendations"] == first["recommendations"]
+    assert second["statistics"]["avg_pkn"] == pytest.approx(first["statistics"]["avg_pkn"] + 0.01)
@@ -0,0 +1,36 @@
+import io
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from bulk_scoring import RAPOR_COLUMNS, RaporReader
+
+
+def csv_bytes(rows):
+    lines = [",".join(["student_id"] + RAPOR_COLUMNS).encode()]
+    lines += [f"s{i},".encode() + row for i, row in enumerate(rows, start=1)]
+    return b"\n".join(lines) + b"\n"
+
+
+def test_invalid_utf8_byte_only_fails_its_row():
+    good = ",".join(["90"] * len(RAPOR_COLUMNS)).encode()
+    bad = b"9\xff0," + ",".join(["90"] * (len(RAPOR_COLUMNS) - 1)).encode()
+    reader = RaporReader(io.BytesIO(csv_bytes([good, good, bad, good])), "rapor.csv")
+
+    chunks = list(reader.chunks(chunk_rows=2))
+    numbers = [n for chunk in chunks for n in chunk[0]]
+    features = np.vstack([chunk[1] for chunk in chunks])
+    errors = [e for chunk in chunks for e in chunk[3]]
+
+    assert numbers == [1, 2, 3, 4]
+    assert errors[2] is not None and np.isnan(features[2]).all()
+    assert [e for i, e in enumerate(errors) if i != 2] == [None] * 3
+    np.testing.assert_allclose(features[[0, 1, 3]], 90.0)
+
+
+def test_api_import_does_not_load_pandas():
+    code = "import sys, api; sys.exit('pandas' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).returncode == 0
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import numpy as np
+
+from hot_reload import ModelHolder
+
+
+class FakePredictor:
+    def recommend(self, X, n):
+        return np.zeros((len(X), n), dtype=int), np.zeros((len(X), n))
+
+
+class SlowLoader:
+    """loader(version) yang bisa ditahan, untuk mensimulasikan reload yang sedang berjalan"""
+
+    def __init__(self):
+        self.current = "v1"
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = 0
+
+    def __call__(self, version):
+        self.calls += 1
+        self.release.wait()
+        return FakePredictor(), version or self.current
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_reload_async_rejects_concurrent_reload():
+    loader = SlowLoader()
+    holder = ModelHolder(loader)
+    loader.release.clear()
+    assert holder.reload_async("v2")
+    assert not holder.reload_async("v3")
+    loader.release.set()
+    assert wait_for(lambda: holder.get().version == "v2")
+    assert wait_for(lambda: holder.reload_async("v3"))
+    assert wait_for(lambda: holder.get().version == "v3")
+
+
+def test_watch_retries_change_seen_during_reload():
+    loader = SlowLoader()
+    holder = ModelHolder(loader)
+    loader.release.clear()
+    assert holder.reload_async("v2")  # Reload lain sedang berjalan saat CURRENT berubah
+
+    holder.watch(lambda: loader.current, interval_s=0.02)
+    loader.current = "v9"
+    time.sleep(0.1)
+    loader.release.set()
+    assert wait_for(lambda: holder.get().version == "v9")
@@ -0,0 +1,67 @@
+import threading
+
+import numpy as np
+import pytest
+
+from evaluasi import true_class_rank
+from knn_engine import KNNEngine, top_n
+
+
+def small_engine():
+    X_train = np.array([[0.0, 0.0, 0.0, 0.0], [1.0, 1.0, 1.0, 1.0], [0.9, 0.9, 0.9, 0.9]])
+    return KNNEngine(X_train, [0, 1, 1], ["A", "B"], k=2, scale=np.full(4, 0.01), min_=np.zeros(4))
+
+
+def test_predict_proba_on_finite_input():
+    probs = small_engine().predict_proba([[95.0, 95.0, 95.0, 95.0]])
+    assert probs.shape == (1, 2)
+    assert probs[0, 1] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf, 1e39])
+def test_non_finite_input_raises(value):
+    with pytest.raises(ValueError):
+        small_engine().predict_proba([[value, 90.0, 90.0, 90.0]])
+
+
+def test_top_n_ties_match_true_class_rank():
+    # Banyak nilai sama tepat di batas Top-3: kelas berindeks terkecil yang masuk
+    probs = np.array([[0.1, 0.3, 0.1, 0.1, 0.3, 0.1], [0.2] * 6])
+    top_idx, _ = top_n(probs, 3)
+    assert top_idx.tolist() == [[1, 4, 0], [0, 1, 2]]
+    for row in range(len(probs)):
+        ranks = true_class_rank(probs[[row] * 6], np.arange(6))
+        assert np.argsort(ranks)[:3].tolist() == top_idx[row].tolist()
+
+
+def test_chunk_size_adapts_to_n_train():
+    rng = np.random.default_rng(0)
+    X_train = rng.uniform(0, 1, (10_000, 4))
+    engine = KNNEngine(X_train, rng.integers(0, 3, 10_000), ["A", "B", "C"], k=5,
+                       scale=np.full(4, 0.01), min_=np.zeros(4), buffer_bytes=400_000)
+    assert engine.chunk_size == 10  # 400 KB / (10k x 4 byte)
+    X = rng.uniform(0, 100, (37, 4))
+    full = KNNEngine(X_train, engine.y_codes, engine.classes_, k=5, scale=engine.scale, min_=engine.min_)
+    np.testing.assert_allclose(engine.predict_proba(X), full.predict_proba(X))
+
+
+def test_nbytes_counts_buffers_of_live_threads():
+    engine = small_engine()
+    one_set = engine.nbytes
+    started, release = threading.Barrier(4), threading.Event()
+
+    def worker():
+        engine.predict_proba([[95.0] * 4])
+        started.wait()
+        release.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    try:
+        started.wait(timeout=10)
+        assert engine.nbytes == one_set + 2 * engine.buffer_set_bytes
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
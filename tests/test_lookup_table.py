@@ -0,0 +1,28 @@
+import numpy as np
+
+from conftest import BUNDLE_ROOT
+from lookup_table import PROB_SCALE, build_table, with_lookup_table
+from model_bundle import load_bundle
+
+
+def test_lookup_matches_model_and_reports_rows(tmp_path):
+    bundle = load_bundle(BUNDLE_ROOT)
+    engine = bundle.to_engine()
+    build_table(lo=85.0, hi=90.0, step=1.0, bundle_root=BUNDLE_ROOT, root=str(tmp_path), chunk_rows=500, n_jobs=1)
+
+    counts = []
+    predictor = with_lookup_table(engine, bundle.version, root=str(tmp_path),
+                                  on_rows=lambda n_table, n_model: counts.append((n_table, n_model)))
+    X = np.array([[85.0, 86.0, 87.0, 90.0], [88.0] * 4, [86.5, 87.0, 88.0, 89.0], [95.0] * 4])
+    top_idx, top_prob = predictor.recommend(X, 6)
+
+    expected_idx, expected_prob = engine.recommend(X, 6)
+    np.testing.assert_array_equal(top_idx, expected_idx)
+    np.testing.assert_allclose(top_prob, expected_prob, atol=1 / PROB_SCALE)
+    assert counts == [(2, 2)]  # 2 baris di grid, 1 di antara titik grid, 1 di luar grid
+
+
+def test_missing_table_returns_predictor_unchanged(tmp_path):
+    bundle = load_bundle(BUNDLE_ROOT)
+    engine = bundle.to_engine()
+    assert with_lookup_table(engine, bundle.version, root=str(tmp_path)) is engine
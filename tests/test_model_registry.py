@@ -0,0 +1,23 @@
+import json
+
+from model_registry import ModelRegistry
+
+
+class PinnedHolder:
+    def get(self):
+        return None
+
+
+def test_pinned_requests_do_not_dirty_usage(tmp_path):
+    usage_path = tmp_path / "registry" / "usage.json"
+    registry = ModelRegistry(lambda key, version: None, 2**30, pinned={"jakut/2025": PinnedHolder()},
+                             usage_path=str(usage_path))
+    for _ in range(5):
+        registry.holder("jakut/2025")
+    registry.save_usage()
+    assert not usage_path.exists()
+
+    registry._usage["jaksel/2025"] = 3
+    registry._usage_dirty = True
+    registry.save_usage()
+    assert json.loads(usage_path.read_text()) == {"jaksel/2025": 3}
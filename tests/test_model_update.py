@@ -0,0 +1,46 @@
+import numpy as np
+
+from knn_engine import KNNEngine
+from model_bundle import load_bundle, save_bundle
+from model_update import append_rows
+
+
+def make_root(tmp_path, n=200):
+    rng = np.random.default_rng(0)
+    root = str(tmp_path / "bundle")
+    # Data mentah 80-100 -> MinMax (0-1)
+    save_bundle(rng.uniform(0, 1, (n, 4)), rng.integers(0, 3, n), ["A", "B", "C"], 5,
+                np.full(4, 0.05), np.full(4, -4.0), root=root)
+    return root
+
+
+def test_append_within_bounds_writes_only_new_segment(tmp_path):
+    root = make_root(tmp_path)
+    parent = load_bundle(root)
+    summary = append_rows(np.full((3, 4), 90.0), ["B", "D", "D"], root=root)
+
+    bundle = load_bundle(root, verify=True)
+    assert summary["segmented"] and not summary["rescaled"]
+    assert bundle.segment_versions == [parent.version, summary["model_version"]]
+    assert bundle.arrays["X_train_cols"].shape == (4, 3)
+    assert bundle.manifest["n_train"] == 203 and bundle.classes[-1] == "D"
+
+    # Hasil k-NN bersegmen sama dengan data yang digabung
+    flat = KNNEngine(bundle.X_train, bundle.y_codes, bundle.classes, bundle.k,
+                     bundle.arrays["scale"], bundle.arrays["min"])
+    queries = np.random.default_rng(1).uniform(80, 100, (50, 4))
+    assert np.array_equal(bundle.to_engine().predict_proba(queries), flat.predict_proba(queries))
+
+
+def test_rescale_and_compact_rewrite_single_segment(tmp_path):
+    root = make_root(tmp_path)
+    append_rows(np.full((2, 4), 90.0), ["A", "A"], root=root)
+    segmented = load_bundle(root)
+
+    summary = append_rows(np.full((1, 4), 90.0), ["A"], root=root, compact=True)
+    compacted = load_bundle(root, verify=True)
+    assert not summary["segmented"] and "segments" not in compacted.manifest
+    assert np.array_equal(compacted.X_train[:-1], segmented.X_train)
+
+    summary = append_rows(np.array([[79.0, 90.0, 90.0, 90.0]]), ["B"], root=root)
+    assert summary["rescaled"] and not summary["segmented"]
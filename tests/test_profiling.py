@@ -0,0 +1,18 @@
+from profiling import ProfilingMiddleware
+
+
+def profile_request(token: bytes) -> dict:
+    return {"type": "http", "headers": [(b"x-profile", b"1"), (b"x-admin-token", token)]}
+
+
+def test_non_ascii_header_token_is_rejected_without_error():
+    middleware = ProfilingMiddleware(None, None, admin_token="rahasia")
+    assert not middleware._requested(profile_request("rahasiä".encode("utf-8")))
+    assert not middleware._requested(profile_request(b"\xff\xfe"))
+    assert middleware._requested(profile_request(b"rahasia"))
+
+
+def test_non_ascii_admin_token_matches_utf8_header():
+    middleware = ProfilingMiddleware(None, None, admin_token="rahasiä")
+    assert middleware._requested(profile_request("rahasiä".encode("utf-8")))
+    assert not middleware._requested(profile_request(b"rahasia"))
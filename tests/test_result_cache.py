@@ -0,0 +1,49 @@
+import threading
+import time
+
+from result_cache import ResultCache, make_key, quantize
+
+
+def test_make_key_quantizes_to_grid():
+    assert make_key([88.6, 90.0, 85.2, 91.4], "v1") == make_key([88.60000000001, 89.98, 85.24, 91.36], "v1")
+    assert make_key([88.6, 90.0, 85.2, 91.4], "v1") != make_key([88.7, 90.0, 85.2, 91.4], "v1")
+    assert make_key([88.6] * 4, "v1") != make_key([88.6] * 4, "v2")
+    # quantum=0: hanya noise floating point yang dibuang
+    assert make_key([88.62] * 4, "v1", quantum=0) != make_key([88.6] * 4, "v1", quantum=0)
+    assert quantize([-0.01, 88.64]).tolist() == [0.0, 88.6]
+
+
+def test_lru_eviction_and_version_flush():
+    cache = ResultCache(max_size=2)
+    cache.set_version("v1")
+    for i in range(3):
+        cache.get_or_compute(("v1", i), lambda i=i: i)
+    assert cache.get_or_compute(("v1", 0), lambda: "baru") == "baru"  # 0 sudah dibuang (LRU)
+    assert cache.stats()["evictions"] == 2
+
+    cache.set_version("v2")
+    assert cache.stats()["size"] == 0 and cache.stats()["flushes"] == 1
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = ResultCache()
+    cache.set_version("v1")
+    calls, gate = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(5)
+        return "hasil"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute(("v1", 1), compute)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["misses"] + cache.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["hasil"] * 4 and len(calls) == 1
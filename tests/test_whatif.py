@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from knn_engine import KNNEngine
+from whatif import cost_shell, grid_deltas, grid_size, minimum_change, shell_size
+
+
+def random_engine(n=300, n_classes=8, seed=0):
+    rng = np.random.default_rng(seed)
+    # Rata-rata mentah 80-100 -> MinMax (0-1)
+    return KNNEngine(rng.uniform(0, 1, (n, 4)), rng.integers(0, n_classes, n), [f"S{i}" for i in range(n_classes)],
+                     k=5, scale=np.full(4, 0.05), min_=np.full(4, -4.0))
+
+
+def test_grid_size_matches_grid_deltas():
+    grid = {"mat": [0, 1, 1, 2], "ipa": [-1, 0], "pkn": []}
+    assert grid_size(grid) == len(grid_deltas(grid)) == 6
+
+
+@pytest.mark.parametrize("allow_decrease", [False, True])
+def test_shell_size_matches_cost_shell(allow_decrease):
+    for total in range(10):
+        assert shell_size(total, allow_decrease) == len(cost_shell(total, allow_decrease))
+
+
+def test_minimum_change_matches_brute_force():
+    engine = random_engine()
+    base = np.array([85.0, 86.0, 84.0, 85.0])
+    steps = np.vstack([cost_shell(r) for r in range(0, 13)])
+    probs = engine.predict_proba(base + steps * 0.5)
+    for target in range(len(engine.classes_)):
+        report = minimum_change(engine, base, target, n=3, step=0.5, max_change=6.0)
+        ranks = (probs > probs[:, [target]]).sum(axis=1) + 1  # tanpa nilai seri di data acak
+        reach = np.flatnonzero((probs[:, target] > 0) & (ranks <= 3))
+        assert report.found == bool(len(reach))
+        if report.found:
+            assert np.abs(report.delta).sum() == pytest.approx(np.abs(steps[reach[0]]).sum() * 0.5)
+
+
+def test_zero_probability_target_is_not_reached():
+    # k=1 -> tepat satu kelas bernilai > 0, sisanya mengisi Top-3 berdasarkan indeks
+    X_train = np.array([[0.0] * 4, [1.0] * 4])
+    engine = KNNEngine(X_train, [1, 0], ["A", "B"], k=1, scale=np.full(4, 0.01), min_=np.zeros(4))
+    report = minimum_change(engine, [10.0] * 4, 0, n=3, step=5.0, max_change=200.0)
+    assert report.found and report.probability > 0 and report.delta.sum() > 0
+
+
+def test_candidate_cap_truncates_search():
+    engine = random_engine()
+    base = np.array([80.0, 80.0, 80.0, 80.0])
+    target = int(np.argmin(engine.predict_proba(np.array([[80.0] * 4]))[0]))
+    report = minimum_change(engine, base, target, n=1, step=0.25, max_change=10.0,
+                            allow_decrease=True, max_candidates=500)
+    assert not report.found and report.truncated
+    assert report.evaluated + report.pruned <= 500
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from wire_format import WireFormatMiddleware, accepts_msgpack, compact_results, decode_scores, dumps_json, is_msgpack
+
+RESULT = {
+    "statistics": {"avg_pkn": 85.0, "avg_ind": 88.0, "avg_mat": 90.0, "avg_ipa": 89.0,
+                   "consistency_std": 1.8, "min_score": 85.0},
+    "recommendations": [{"school_name": "SMP NEGERI 30", "probability": 0.75},
+                        {"school_name": "SMP NEGERI 1", "probability": 0.25}],
+}
+
+
+def test_content_negotiation_headers():
+    assert is_msgpack("application/msgpack; charset=binary") and is_msgpack("application/x-msgpack")
+    assert not is_msgpack("application/json") and not is_msgpack(None)
+    assert accepts_msgpack("application/json, application/msgpack;q=0.9")
+    assert not accepts_msgpack("*/*") and not accepts_msgpack(None)
+
+
+def test_dumps_json_matches_json_module():
+    payload = {"school": "SMP NEGERI 30", "probability": 0.75, "ranks": [1, 2]}
+    assert json.loads(dumps_json(payload)) == payload
+
+
+def test_compact_results_uses_school_ids():
+    compact = compact_results([RESULT], {"SMP NEGERI 1": 0, "SMP NEGERI 30": 1}, "v1", single=True)
+    assert compact == {"model_version": "v1", "school_ids": [1, 0], "probabilities": [0.75, 0.25],
+                       "statistics": [85.0, 88.0, 90.0, 89.0, 1.8, 85.0]}
+
+
+def test_middleware_routes_msgpack_requests_only():
+    seen = []
+
+    async def inner(scope, receive, send):
+        seen.append(scope["path"])
+
+    middleware = WireFormatMiddleware(inner, routes={"/predict": "/predict/msgpack"})
+    for content_type in (b"application/msgpack", b"application/json"):
+        scope = {"type": "http", "path": "/predict", "headers": [(b"content-type", content_type)]}
+        asyncio.run(middleware(scope, None, None))
+    assert seen == ["/predict/msgpack", "/predict"]
+
+
+def test_decode_scores_validates_shape_and_range():
+    msgpack = pytest.importorskip("msgpack")
+    scores = decode_scores(msgpack.packb([90.0] * 20))
+    assert scores.shape == (1, 4, 5) and np.all(scores == 90.0)
+    assert decode_scores(msgpack.packb([[[85.0] * 5] * 4] * 3), batch=True).shape == (3, 4, 5)
+    for bad in ([90.0] * 19, [90.0] * 19 + [float("nan")], [90.0] * 19 + [101.0]):
+        with pytest.raises(ValueError):
+            decode_scores(msgpack.packb(bad))
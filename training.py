@@ -6,6 +6,10 @@ from sklearn.preprocessing import MinMaxScaler
 from sklearn.neighbors import KNeighborsClassifier
 import joblib 
 
+from dataset import DATA_FILE, load_frame
+from model_bundle import BUNDLE_DIR, save_bundle_from_sklearn
+from tuning import neighbor_graph, sweep_k
+
 # ==========================================
 # 1. SETUP & SPLIT DATA YANG TRANSPARAN
 # ==========================================
@@ -13,7 +17,7 @@ print("MEMULAI PROSES TRAINING...")
 
 # Load data utuh
 try:
-    df = pd.read_excel('DATASET/Data-Cleaning.xlsx')
+    df = load_frame(DATA_FILE)
 except FileNotFoundError:
     # Fallback kalau formatnya csv
     try:
@@ -63,39 +67,26 @@ print("Scaler disimpan.")
 # ==========================================
 # 4. TUNING (Mencari K Terbaik)
 # ==========================================
+# Tetangga dihitung SEKALI untuk k terbesar, lalu akurasi Top-6 semua k
+# diturunkan dari graf tetangga yang sama (lihat tuning.py).
 print("Mencari Nilai K Terbaik ...")
-accuracies = []
-k_range = range(10, 101, 5)
-
-best_acc = 0
-best_k = 0
-
-for k in k_range:
-    knn = KNeighborsClassifier(n_neighbors=k, weights='distance')
-    
-    # Latih model dengan data training
-    knn.fit(X_train_scaled, y_train)
-    
-    # Uji ke data testing
-    probs = knn.predict_proba(X_test_scaled)
-    hit = 0
-    for i, true_school in enumerate(y_test):
-        top6_idx = np.argsort(probs[i])[-6:]
-        if true_school in knn.classes_[top6_idx]:
-            hit += 1
-    
-    current_acc = hit / len(y_test)
-    accuracies.append(current_acc)
-    
-    if current_acc > best_acc:
-        best_acc = current_acc
-        best_k = k
+k_range = range(1, 301)
+
+classes, y_train_codes = np.unique(y_train, return_inverse=True)
+y_test_codes = np.searchsorted(classes, y_test)
+
+dist, idx = neighbor_graph(X_train_scaled, X_test_scaled, max(k_range))
+k_range, accuracies = sweep_k(dist, idx, y_train_codes, y_test_codes, len(classes), k_range, top_n=6)
+
+best_pos = int(np.argmax(accuracies))
+best_k = int(k_range[best_pos])
+best_acc = accuracies[best_pos]
 
 # ==========================================
 # 5. VISUALISASI
 # ==========================================
 plt.figure(figsize=(10, 6))
-plt.plot(k_range, accuracies, marker='o', color='blue')
+plt.plot(k_range, accuracies, marker='o', markersize=3, color='blue')
 plt.title(f'Akurasi Top-6 pada Unseen Data (Test Size: {len(df_test)})')
 plt.xlabel('Nilai K')
 plt.ylabel('Akurasi')
@@ -113,4 +104,8 @@ final_model = KNeighborsClassifier(n_neighbors=best_k, weights='distance')
 final_model.fit(X_train_scaled, y_train) 
 
 joblib.dump(final_model, 'model_knn_smp.pkl')
-print("✅ Model Final disimpan sebagai 'model_knn_smp.pkl'")
\ No newline at end of file
+print("✅ Model Final disimpan sebagai 'model_knn_smp.pkl'")
+
+# Bundle berversi (memory-mapped) untuk API, app-simple.py & script evaluasi
+bundle_version = save_bundle_from_sklearn(final_model, scaler)
+print(f"✅ Bundle model disimpan di '{BUNDLE_DIR}/{bundle_version}' (versi aktif)")
\ No newline at end of file
@@ -0,0 +1,240 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from dataset import DATA_FILE, LABEL_COLUMN, iter_source_chunks
+from knn_engine import KNNEngine
+from model_bundle import BUNDLE_DIR, FEATURE_COLUMNS, BundleWriter
+from tuning import sweep_k
+
+# ==========================================
+# TRAINING STREAMING (OUT-OF-CORE) UNTUK DATA MULTI-WILAYAH / MULTI-TAHUN
+# ==========================================
+# training.py memuat seluruh data ke satu DataFrame. Untuk data PPDB semua
+# wilayah Jakarta dari beberapa tahun ajaran, script ini membaca file sumber
+# per potongan sehingga pemakaian RAM tidak bergantung pada ukuran data:
+#
+#   Pass 1 : tentukan train/test tiap baris, hitung min/max fitur (MinMaxScaler
+#            incremental, HANYA dari baris training) & jumlah baris per sekolah
+#   Pass 2 : normalisasi baris training lalu tulis langsung ke matriks
+#            memory-map di bundle baru; baris testing ke file kerja sementara
+#   Tuning : pilih k dari sampel baris testing (graf tetangga k_max sekali)
+#
+# Pembagian train/test bersifat stratified per sekolah TANPA menyimpan daftar
+# baris: baris ke-j dari sekolah s masuk testing kalau
+#   floor((j + 1) * test_size + offset_s) > floor(j * test_size + offset_s)
+# dengan offset_s acak tetap (dari seed + nama sekolah). Hasilnya setiap
+# sekolah menyumbang ~test_size bagian barisnya ke data testing, dan
+# keputusan yang sama didapat lagi di pass 2.
+#
+# Cara pakai:
+#   python training_stream.py                                   # DATASET/Data-Cleaning.xlsx
+#   python training_stream.py data/ppdb-2023-*.csv data/ppdb-2024-*.csv --chunk-size 100000
+#   python training_stream.py data/*.csv --k 201                # lewati tuning
+#   python training_stream.py data/*.csv --no-activate          # bundle belum jadi versi aktif
+
+SOURCE_COLUMNS = [LABEL_COLUMN] + FEATURE_COLUMNS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Training k-NN streaming (out-of-core) ke bundle memory-mapped.")
+    parser.add_argument('sources', nargs='*', default=[DATA_FILE], help="File sumber (.xlsx / .csv)")
+    parser.add_argument('--chunk-size', type=int, default=50_000, help="Jumlah baris per potongan baca")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--k', type=int, default=None, help="Pakai k ini, tanpa tuning")
+    parser.add_argument('--k-max', type=int, default=300)
+    parser.add_argument('--eval-rows', type=int, default=5000,
+                        help="Maksimal baris testing yang dipakai memilih k")
+    parser.add_argument('--memory-mb', type=int, default=256,
+                        help="Batas buffer jarak saat tuning (MB)")
+    parser.add_argument('--root', default=BUNDLE_DIR)
+    parser.add_argument('--no-activate', action='store_true', help="Jangan jadikan bundle baru versi aktif")
+    return parser.parse_args()
+
+
+# ==========================================
+# 1. PEMBACAAN & PEMBAGIAN TRAIN/TEST PER BARIS
+# ==========================================
+def iter_chunks(sources, chunk_size):
+    """(label, fitur float64) per potongan dari semua file sumber. Baris tidak lengkap dibuang."""
+    for path in sources:
+        for chunk in iter_source_chunks(path, SOURCE_COLUMNS, chunk_size):
+            labels = chunk[LABEL_COLUMN]
+            features = chunk[FEATURE_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            valid = labels.notna().to_numpy() & np.isfinite(features).all(axis=1)
+            yield labels[valid].astype(str).to_numpy(dtype=object), features[valid]
+
+
+class StratifiedSplitter:
+    """Penentu train/test per baris yang stratified per sekolah, tanpa menyimpan indeks baris"""
+
+    def __init__(self, test_size=0.2, seed=42):
+        self.test_size = test_size
+        self.seed = seed
+        self._offsets = {}
+        self._seen = {}
+
+    def _offset(self, label):
+        offset = self._offsets.get(label)
+        if offset is None:
+            offset = zlib.crc32(f'{self.seed}:{label}'.encode('utf-8')) / 2 ** 32
+            self._offsets[label] = offset
+        return offset
+
+    def is_test(self, labels):
+        """Mask testing untuk satu potongan label (urutan baris harus sama di setiap pass)"""
+        names, inverse = np.unique(labels, return_inverse=True)
+        # Urutan kemunculan baris di dalam potongan, per sekolah, lalu digeser jumlah baris sebelumnya
+        occurrence = pd.Series(inverse).groupby(inverse).cumcount().to_numpy()
+        seen = np.array([self._seen.get(name, 0) for name in names])
+        offsets = np.array([self._offset(name) for name in names])
+
+        j = occurrence + seen[inverse]
+        off = offsets[inverse]
+        mask = np.floor((j + 1) * self.test_size + off) > np.floor(j * self.test_size + off)
+
+        for name, count in zip(names, np.bincount(inverse, minlength=len(names))):
+            self._seen[name] = self._seen.get(name, 0) + int(count)
+        return mask
+
+    def reset(self):
+        self._seen = {}
+
+
+def scan_sources(sources, splitter, chunk_size):
+    """Pass 1: min/max fitur training, jumlah train & test per sekolah"""
+    n_features = len(FEATURE_COLUMNS)
+    data_min = np.full(n_features, np.inf)
+    data_max = np.full(n_features, -np.inf)
+    train_counts, n_test, n_rows = {}, 0, 0
+
+    for labels, features in iter_chunks(sources, chunk_size):
+        test = splitter.is_test(labels)
+        train = ~test
+        n_rows += len(labels)
+        n_test += int(test.sum())
+        if train.any():
+            data_min = np.minimum(data_min, features[train].min(axis=0))
+            data_max = np.maximum(data_max, features[train].max(axis=0))
+            names, counts = np.unique(labels[train], return_counts=True)
+            for name, count in zip(names, counts):
+                train_counts[name] = train_counts.get(name, 0) + int(count)
+
+    return data_min, data_max, train_counts, n_test, n_rows
+
+
+def minmax_params(data_min, data_max):
+    """(scale, min_) seperti MinMaxScaler(feature_range=(0, 1)); rentang 0 dianggap 1"""
+    data_range = data_max - data_min
+    data_range[data_range == 0.0] = 1.0
+    scale = 1.0 / data_range
+    return scale, -data_min * scale
+
+
+# ==========================================
+# 2. TUNING K DARI SAMPEL DATA TESTING
+# ==========================================
+def tune_k(X_train_cols, y_train_codes, classes, scale, min_, X_test, y_test_codes, k_max, memory_mb):
+    """Akurasi Top-6 untuk k=1..k_max pada baris testing, dari satu graf tetangga k_max"""
+    n_train = X_train_cols.shape[1]
+    # Buffer dist + diff float32 per potongan: 2 * chunk * n_train * 4 byte
+    chunk_size = max(1, min(256, (memory_mb << 20) // (8 * n_train)))
+    engine = KNNEngine(X_train_cols.T, y_train_codes, classes, k_max, scale, min_, chunk_size=chunk_size)
+
+    dist, idx = engine.kneighbors(X_test)
+    order = np.argsort(dist, axis=1, kind='stable')
+    dist = np.take_along_axis(dist, order, axis=1).astype(np.float64)
+    idx = np.take_along_axis(idx, order, axis=1)
+    return sweep_k(dist, idx, y_train_codes, y_test_codes, len(classes), range(1, engine.k + 1), top_n=6)
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    print("MEMULAI TRAINING STREAMING...")
+    for path in args.sources:
+        if not os.path.exists(path):
+            print(f"❌ Error: File '{path}' tidak ditemukan.")
+            return
+
+    # Pass 1
+    splitter = StratifiedSplitter(args.test_size, args.seed)
+    data_min, data_max, train_counts, n_test, n_rows = scan_sources(args.sources, splitter, args.chunk_size)
+    n_train = sum(train_counts.values())
+    if n_train == 0:
+        print("❌ Error: Tidak ada baris training yang valid.")
+        return
+    classes = np.array(sorted(train_counts), dtype=object)
+    scale, min_ = minmax_params(data_min, data_max)
+    print(f"Pass 1 selesai: {n_rows} siswa dari {len(args.sources)} file, {len(classes)} sekolah")
+    print(f"   - Training: {n_train} siswa")
+    print(f"   - Testing : {n_test} siswa")
+
+    # Pass 2
+    writer = BundleWriter(n_train, root=args.root)
+    workdir = tempfile.mkdtemp(prefix='.stream-', dir=args.root)
+    try:
+        X_test = np.lib.format.open_memmap(os.path.join(workdir, 'X_test.npy'), mode='w+',
+                                           dtype=np.float64, shape=(max(n_test, 1), len(FEATURE_COLUMNS)))
+        test_labels = np.lib.format.open_memmap(os.path.join(workdir, 'y_test.npy'), mode='w+',
+                                                dtype=np.int32, shape=(max(n_test, 1),))
+        splitter.reset()
+        train_pos = test_pos = 0
+        for labels, features in iter_chunks(args.sources, args.chunk_size):
+            test = splitter.is_test(labels)
+            train = ~test
+            codes = np.searchsorted(classes, labels)
+            codes = np.where(classes[np.minimum(codes, len(classes) - 1)] == labels, codes, -1)
+
+            writer.write_rows(train_pos, features[train] * scale + min_, codes[train])
+            train_pos += int(train.sum())
+            m = int(test.sum())
+            X_test[test_pos:test_pos + m] = features[test]
+            test_labels[test_pos:test_pos + m] = codes[test]
+            test_pos += m
+        if train_pos != n_train or test_pos != n_test:
+            raise RuntimeError("File sumber berubah di antara pass 1 dan pass 2.")
+        print(f"Pass 2 selesai: matriks training memory-map {len(FEATURE_COLUMNS)} x {n_train} ditulis.")
+
+        # Tuning
+        extra = {'trainer': 'training_stream', 'sources': [os.path.basename(p) for p in args.sources],
+                 'test_size': args.test_size, 'seed': args.seed, 'n_test': n_test}
+        if args.k is not None:
+            best_k = args.k
+        elif n_test == 0:
+            print("⚠️  Tidak ada data testing, tuning dilewati (k=5).")
+            best_k = 5
+        else:
+            rng = np.random.default_rng(args.seed)
+            n_eval = min(args.eval_rows, n_test)
+            sample = np.sort(rng.choice(n_test, size=n_eval, replace=False))
+            print(f"Mencari Nilai K Terbaik dari {n_eval} siswa testing ...")
+            k_values, accuracies = tune_k(writer.X_train_cols, np.asarray(writer.y_codes), classes, scale, min_,
+                                          X_test[sample], test_labels[sample], args.k_max, args.memory_mb)
+            best_pos = int(np.argmax(accuracies))
+            best_k = int(k_values[best_pos])
+            extra.update(eval_rows=int(n_eval), test_top6=float(accuracies[best_pos]))
+            print(f"\n🏆 K Terbaik: {best_k} dengan Akurasi: {accuracies[best_pos]:.2%}")
+
+        del X_test, test_labels
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    version = writer.finalize(classes, best_k, scale, min_, extra=extra, activate=not args.no_activate)
+    status = "belum aktif" if args.no_activate else "versi aktif"
+    print(f"✅ Bundle model disimpan di '{args.root}/{version}' ({status}) "
+          f"dalam {time.perf_counter() - started:.1f} detik")
+
+
+if __name__ == '__main__':
+    main()
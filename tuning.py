@@ -0,0 +1,149 @@
+import numpy as np
+
+from evaluasi import true_class_rank
+
+# ==========================================
+# TUNING K DALAM SATU KALI HITUNG TETANGGA
+# ==========================================
+# Tetangga untuk k yang lebih kecil selalu merupakan awalan (prefix) dari
+# tetangga untuk k terbesar. Jadi cukup cari k_max tetangga SEKALI, lalu
+# skor berbobot jarak untuk semua k didapat dari cumulative sum.
+
+
+def neighbor_graph(X_train_scaled, X_test_scaled, k_max, p=2):
+    """Jarak & indeks k_max tetangga terdekat setiap baris uji, urut dari yang terdekat"""
+    from sklearn.neighbors import NearestNeighbors
+
+    nn = NearestNeighbors(n_neighbors=min(k_max, len(X_train_scaled)), p=p)
+    nn.fit(X_train_scaled)
+    return nn.kneighbors(X_test_scaled)
+
+
+def distance_weights(dist):
+    """
+    Bobot 1/jarak seperti weights='distance' di sklearn. Kalau ada tetangga
+    berjarak 0, hanya tetangga itu yang dihitung. Karena jarak sudah urut,
+    tetangga berjarak 0 selalu berada di depan, jadi aturan ini berlaku
+    sama untuk semua nilai k.
+    """
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / dist
+    zero = dist == 0
+    has_zero = zero[:, :1]
+    return np.where(has_zero, zero.astype(np.float64), weights)
+
+
+def class_scores_per_k(dist, idx, y_train_codes, n_classes, k_values, weights='distance'):
+    """
+    Skor (belum dinormalisasi) setiap kelas untuk setiap k: array (n_uji, n_k, n_kelas).
+    Normalisasi tidak mengubah urutan ranking, jadi tidak perlu dibagi total.
+    """
+    n = len(dist)
+    k_max = max(k_values)
+    if weights == 'uniform':
+        weights = np.ones((n, k_max))
+    else:
+        weights = distance_weights(dist[:, :k_max])
+    labels = y_train_codes[idx[:, :k_max]]
+
+    # Bobot per (baris, urutan tetangga, kelas), lalu cumulative sum sepanjang urutan tetangga
+    votes = np.zeros((n, k_max, n_classes))
+    np.put_along_axis(votes, labels[:, :, None], weights[:, :, None], axis=2)
+    cumulative = np.cumsum(votes, axis=1)
+    return cumulative[:, np.asarray(k_values) - 1, :]
+
+
+def sweep_k(dist, idx, y_train_codes, y_test_codes, n_classes, k_values, top_n=6,
+            weights='distance', chunk_size=256):
+    """
+    Akurasi Top-N untuk semua nilai k sekaligus dari satu graf tetangga.
+    Dihitung per potongan baris uji supaya memori tetap kecil.
+    """
+    k_values = [k for k in k_values if k <= dist.shape[1]]
+    hits = np.zeros(len(k_values))
+    for start in range(0, len(dist), chunk_size):
+        stop = start + chunk_size
+        scores = class_scores_per_k(dist[start:stop], idx[start:stop], y_train_codes, n_classes,
+                                    k_values, weights=weights)
+        ranks = true_class_rank(scores, y_test_codes[start:stop])
+        hits += (ranks < top_n).sum(axis=0)
+    return np.asarray(k_values), hits / len(dist)
+
+
+# ==========================================
+# PENCARIAN HYPERPARAMETER DENGAN STRATIFIED K-FOLD (PARALEL)
+# ==========================================
+# Satu tugas = satu (fold, jenis scaler). Di dalamnya data cukup di-scale
+# sekali, dan untuk setiap p graf tetangga cukup dihitung sekali. Semua k
+# dan kedua skema bobot diturunkan dari graf yang sama, jadi konfigurasi
+# yang berbagi scaling/tetangga tidak menghitung ulang.
+
+SCALERS = ('minmax', 'standard', 'robust')
+
+
+def make_scaler(name):
+    from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
+
+    return {'minmax': MinMaxScaler, 'standard': StandardScaler, 'robust': RobustScaler}[name]()
+
+
+def _evaluate_fold(task):
+    """Kerjakan satu (fold, scaler): kembalikan baris hasil untuk setiap (p, weights, k)"""
+    X, y_codes, n_classes, fold, train_idx, test_idx, scaler_name, p_values, weight_options, k_values, top_n = task
+    scaler = make_scaler(scaler_name).fit(X[train_idx])
+    X_train_scaled = scaler.transform(X[train_idx])
+    X_test_scaled = scaler.transform(X[test_idx])
+
+    rows = []
+    for p in p_values:
+        dist, idx = neighbor_graph(X_train_scaled, X_test_scaled, max(k_values), p=p)
+        for weights in weight_options:
+            ks, acc = sweep_k(dist, idx, y_codes[train_idx], y_codes[test_idx], n_classes,
+                              k_values, top_n=top_n, weights=weights)
+            rows.extend(
+                {'fold': fold, 'scaler': scaler_name, 'p': p, 'weights': weights, 'k': int(k), 'acc': float(a)}
+                for k, a in zip(ks, acc)
+            )
+    return rows
+
+
+def cv_search(X, y, k_values=range(1, 301), weight_options=('distance', 'uniform'), p_values=(1, 2),
+              scalers=SCALERS, n_splits=5, top_n=6, random_state=42, n_jobs=None):
+    """
+    Stratified k-fold CV untuk semua kombinasi (k, weights, p, scaler) dengan target akurasi Top-N.
+    Fold & scaler dijalankan paralel di process pool (n_jobs=None = semua core).
+    Mengembalikan DataFrame berperingkat: rata-rata & std akurasi antar fold.
+    """
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    import pandas as pd
+    from sklearn.model_selection import StratifiedKFold
+
+    X = np.asarray(X, dtype=np.float64)
+    classes, y_codes = np.unique(y, return_inverse=True)
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X, y_codes)
+
+    tasks = [
+        (X, y_codes, len(classes), fold, train_idx, test_idx, scaler_name,
+         tuple(p_values), tuple(weight_options), list(k_values), top_n)
+        for fold, (train_idx, test_idx) in enumerate(folds)
+        for scaler_name in scalers
+    ]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    rows = []
+    if n_jobs == 1:
+        for task in tasks:
+            rows.extend(_evaluate_fold(task))
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+            for fold_rows in pool.map(_evaluate_fold, tasks):
+                rows.extend(fold_rows)
+
+    per_fold = pd.DataFrame(rows)
+    ranked = (per_fold.groupby(['scaler', 'p', 'weights', 'k'])['acc']
+              .agg(mean_acc='mean', std_acc='std', n_folds='count')
+              .reset_index()
+              .sort_values(['mean_acc', 'std_acc', 'k'], ascending=[False, True, True], ignore_index=True))
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+    return ranked
@@ -2,9 +2,11 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+from dataset import DATA_FILE, load_frame
+
 # 1. Load Data
 try:
-    df = pd.read_excel('DATASET/Data-Cleaning.xlsx')
+    df = load_frame(DATA_FILE)
     print("✅ Data berhasil dimuat!")
 except FileNotFoundError:
     print("❌ File tidak ditemukan. Cek path 'DATASET/Data-Cleaning.xlsx'")
@@ -0,0 +1,292 @@
+from dataclasses import dataclass
+from itertools import combinations, product
+from math import comb, prod
+
+import numpy as np
+
+from evaluasi import true_class_rank
+from knn_engine import KNNEngine, SklearnPredictor, top_n
+
+# ==========================================
+# SIMULASI WHAT-IF ("KALAU NILAI MTK NAIK 2 POIN?")
+# ==========================================
+# Rata-rata dasar siswa digeser dengan sejumlah skenario delta per mapel,
+# lalu rata-rata dasar + SEMUA skenario dinilai dalam satu kali
+# normalisasi + k-NN. Dari matriks probabilitasnya dihitung Top-N per
+# skenario serta peringkat & probabilitas setiap sekolah yang pernah masuk
+# Top-N, jadi perubahan peringkat di sepanjang grid bisa dibaca langsung.
+# Dipakai oleh POST /predict/whatif (api.py) dan slider di app-simple.py.
+#
+# Kebalikannya, minimum_change(), menjawab "rata-rata berapa yang kubutuhkan
+# supaya SMPN X masuk Top-6?" (POST /predict/target, lihat bagian bawah).
+
+SUBJECTS = ('pkn', 'ind', 'mat', 'ipa')  # Urutan fitur model [PKN, IND, MAT, IPA]
+SCORE_RANGE = (0.0, 100.0)
+MAX_SEARCH_CANDIDATES = 300_000  # Batas kandidat per pencarian terbalik (CPU per request)
+SEARCH_CHUNK_BYTES = 32 * 2**20  # Memori kerja per potongan kandidat (jarak ke alumni target)
+
+
+def _grid_axes(grid: dict) -> list:
+    return [sorted(set(float(d) for d in grid.get(subject, [0.0]))) or [0.0] for subject in SUBJECTS]
+
+
+def grid_size(grid: dict) -> int:
+    """Jumlah baris grid_deltas(grid), dihitung tanpa membuat kombinasinya (cek batas sebelum product)"""
+    return prod(len(axis) for axis in _grid_axes(grid))
+
+
+def grid_deltas(grid: dict) -> np.ndarray:
+    """{'mat': [0, 1, 2], 'ipa': [-1, 0]} -> semua kombinasi (n x 4); mapel yang tidak disebut = 0"""
+    return np.array(list(product(*_grid_axes(grid))), dtype=np.float64).reshape(-1, len(SUBJECTS))
+
+
+@dataclass
+class WhatIfReport:
+    """Hasil simulasi: baris 0 = rata-rata dasar, baris 1.. = skenario"""
+    features: np.ndarray       # (1 + n_skenario, 4) rata-rata setelah digeser (dibatasi 0-100)
+    top_idx: np.ndarray        # (1 + n_skenario, n) indeks kelas Top-N
+    top_probs: np.ndarray      # (1 + n_skenario, n) probabilitasnya
+    tracked: np.ndarray        # (n_sekolah,) sekolah yang pernah masuk Top-N, urut peringkat dasar
+    ranks: np.ndarray          # (1 + n_skenario, n_sekolah) peringkat (1 = teratas)
+    probabilities: np.ndarray  # (1 + n_skenario, n_sekolah) probabilitas
+
+
+def what_if(predictor, base, deltas, n=6) -> WhatIfReport:
+    """Nilai rata-rata dasar (4,) + setiap baris delta (m x 4) dalam satu batch"""
+    base = np.asarray(base, dtype=np.float64).reshape(1, len(SUBJECTS))
+    deltas = np.asarray(deltas, dtype=np.float64).reshape(-1, len(SUBJECTS))
+    features = np.clip(np.vstack([base, base + deltas]), *SCORE_RANGE)
+
+    probs = predictor.predict_proba(features)
+    top_idx, top_probs = top_n(probs, n)
+
+    # Sekolah yang pernah masuk Top-N: urut peringkat di rata-rata dasar, lalu urutan kemunculan
+    seen = dict.fromkeys(top_idx.ravel().tolist())
+    base_rank = {c: int(r) for c, r in zip(seen, _ranks(probs[:1], list(seen))[0])}
+    tracked = np.array(sorted(seen, key=lambda c: base_rank[c]), dtype=np.int64)
+
+    return WhatIfReport(
+        features=features,
+        top_idx=top_idx,
+        top_probs=top_probs,
+        tracked=tracked,
+        ranks=_ranks(probs, tracked),
+        probabilities=probs[:, tracked],
+    )
+
+
+def _ranks(probs, classes) -> np.ndarray:
+    """Peringkat (1 = teratas) kelas-kelas tertentu di setiap baris, aturan seri sama dengan evaluasi Top-N"""
+    rows = len(probs)
+    return np.stack([true_class_rank(probs, np.full(rows, c)) + 1 for c in classes], axis=1).reshape(rows, -1)
+
+
+# ==========================================
+# PENCARIAN TERBALIK ("NILAI MINIMAL UNTUK SMPN X")
+# ==========================================
+# Dicari perubahan rata-rata terkecil (total poin, |delta| dijumlahkan) di
+# grid berlangkah `step` yang membuat sekolah target masuk Top-N. Alurnya:
+#
+#   1. Grid kasar (langkah step x coarse_factor) dinilai per kulit biaya, satu
+#      batch per kulit -> biaya termurah di grid kasar menjadi batas atas.
+#      Kalau sampai batas perubahan pun tidak ada, sekolah dianggap tidak
+#      terjangkau.
+#   2. Grid halus dinilai per "kulit" biaya (0, 1, 2, ... langkah) sampai batas
+#      atas itu; kulit pertama yang berisi solusi adalah biaya minimal.
+#
+# Pemangkasan (tanpa mengubah hasil, memakai ketaksamaan segitiga di ruang
+# fitur yang sudah dinormalisasi, b = rata-rata dasar, q = kandidat):
+#   - Jarak b ke semua data training dihitung SEKALI. Tetangga ke-k dari q
+#     berjarak <= d_k(b) + |q - b|, jadi semua tetangganya ada dalam radius
+#     d_k(b) + 2|q - b| dari b. Grid halus cukup dinilai terhadap subset itu.
+#   - Kandidat yang alumni sekolah target terdekatnya lebih jauh dari
+#     d_k(b) + |q - b| pasti tidak punya tetangga dari sekolah target
+#     (probabilitas 0), jadi dibuang tanpa k-NN.
+# Hasil akhir dicek ulang dengan predictor asli, jadi angkanya sama dengan /predict.
+# "Masuk Top-N" berarti probabilitas target > 0 (kelas bernilai 0 yang hanya
+# mengisi sisa Top-N tidak dihitung), sejalan dengan pemangkasan di atas.
+# Kandidat dinilai per potongan (memori tetap), dan pencarian berhenti dengan
+# truncated=True kalau total kandidat melewati max_candidates.
+
+
+@dataclass
+class TargetReport:
+    """Hasil pencarian terbalik; delta/features/top_* None kalau tidak terjangkau"""
+    found: bool
+    delta: np.ndarray           # (4,) perubahan rata-rata per mapel
+    features: np.ndarray        # (4,) rata-rata yang dibutuhkan
+    rank: int                   # peringkat sekolah target di titik itu (1 = teratas)
+    probability: float
+    top_idx: np.ndarray         # (n,) Top-N di titik itu
+    top_probs: np.ndarray
+    evaluated: int              # jumlah kandidat yang dinilai k-NN
+    pruned: int                 # jumlah kandidat yang dibuang tanpa k-NN
+    truncated: bool = False     # pencarian dihentikan karena melewati max_candidates
+
+
+def search_engine(predictor) -> KNNEngine:
+    """KNNEngine di balik predictor (lookup table dibuka, model sklearn dikonversi)"""
+    predictor = getattr(predictor, 'predictor', predictor)  # LookupPredictor
+    if isinstance(predictor, SklearnPredictor):
+        return KNNEngine.from_sklearn(predictor.model, predictor.scaler)
+    return predictor
+
+
+def cost_shell(total, allow_decrease=False) -> np.ndarray:
+    """Semua vektor langkah bilangan bulat (m x 4) dengan jumlah |langkah| tepat `total`"""
+    parts = len(SUBJECTS)
+    # Stars and bars: posisi parts-1 pembatas di antara total+parts-1 slot
+    bars = np.array(list(combinations(range(total + parts - 1), parts - 1)), dtype=np.int64).reshape(-1, parts - 1)
+    edges = np.hstack([np.full((len(bars), 1), -1), bars, np.full((len(bars), 1), total + parts - 1)])
+    steps = np.diff(edges, axis=1) - 1
+    if allow_decrease:
+        signs = np.array(list(product((1, -1), repeat=parts)), dtype=np.int64)
+        steps = np.unique((steps[:, None, :] * signs[None, :, :]).reshape(-1, parts), axis=0)
+    return steps
+
+
+def shell_size(total, allow_decrease=False) -> int:
+    """len(cost_shell(total, allow_decrease)) tanpa membuat kandidatnya"""
+    parts = len(SUBJECTS)
+    if not allow_decrease or total == 0:
+        return comb(total + parts - 1, parts - 1)
+    # k mapel berubah (tanda bebas), total dibagi ke k bagian yang masing-masing >= 1
+    return sum(comb(parts, k) * 2**k * comb(total - 1, k - 1) for k in range(1, parts + 1))
+
+
+def minimum_change(predictor, base, target, n=6, step=0.5, max_change=20.0,
+                   allow_decrease=False, coarse_factor=2,
+                   max_candidates=MAX_SEARCH_CANDIDATES) -> TargetReport:
+    """
+    Perubahan rata-rata terkecil (kelipatan `step`, total maks. `max_change` poin)
+    yang membuat kelas `target` masuk Top-N predictor dengan probabilitas > 0.
+    Hanya menaikkan nilai, kecuali allow_decrease=True. Solusi dengan biaya sama:
+    probabilitas target terbesar. Lebih dari `max_candidates` kandidat: berhenti
+    dengan found=False, truncated=True.
+    """
+    engine = search_engine(predictor)
+    base = np.asarray(base, dtype=np.float64).reshape(1, len(SUBJECTS))
+    base_probs = predictor.predict_proba(base)
+    if _reaches(base_probs, target, n)[0]:
+        return _target_report(base_probs[0], target, n, base[0], np.zeros(len(SUBJECTS)), 1, 0)
+
+    scale = engine.scale.astype(np.float64)
+    min_ = engine.min_.astype(np.float64)
+    train = engine.X_train.astype(np.float64)
+    base_scaled = base[0] * scale + min_
+
+    # Jarak b ke semua data training & ke alumni sekolah target, dihitung sekali
+    base_dist = _norm(train - base_scaled, engine.p)
+    kth = np.partition(base_dist, engine.k - 1)[engine.k - 1]
+    target_alumni = train[engine.y_codes == target]
+    if not len(target_alumni):
+        return _not_found(0, 0)
+
+    evaluated = pruned = 0
+    # Potongan kandidat: jarak ke alumni target butuh (baris x n_alumni x 4) float64
+    chunk_rows = max(1, min(50_000, SEARCH_CHUNK_BYTES // (target_alumni.size * 8)))
+
+    def evaluate(steps, unit, search):
+        """Nilai kandidat (langkah x unit) per potongan; kembalikan (delta, probabilitas target) yang lolos Top-N"""
+        nonlocal evaluated, pruned
+        hits, hit_probs = [], []
+        for start in range(0, len(steps), chunk_rows):
+            delta = steps[start:start + chunk_rows] * unit
+            features = base + delta
+            inside = ((features >= SCORE_RANGE[0]) & (features <= SCORE_RANGE[1])).all(axis=1)
+            delta, features = delta[inside], features[inside]
+            shift = _norm(delta * scale, engine.p)
+            nearest_target = _norm(features[:, None, :] * scale + min_ - target_alumni[None, :, :], engine.p).min(axis=1)
+            feasible = nearest_target <= kth + shift + 1e-4
+            pruned += int(len(features) - feasible.sum())
+            delta, features = delta[feasible], features[feasible]
+            if not len(features):
+                continue
+            evaluated += len(features)
+            probs = search.predict_proba(features)
+            hit = _reaches(probs, target, n)
+            hits.append(delta[hit])
+            hit_probs.append(probs[hit, target])
+        if not hits:
+            return np.empty((0, len(SUBJECTS))), np.empty(0)
+        return np.vstack(hits), np.concatenate(hit_probs)
+
+    generated = 0
+
+    def shell(r):
+        """Kulit biaya r, None kalau total kandidat akan melewati max_candidates (dicek sebelum dibuat)"""
+        nonlocal generated
+        generated += shell_size(r, allow_decrease)
+        return cost_shell(r, allow_decrease) if generated <= max_candidates else None
+
+    # 1. Grid kasar -> batas atas biaya (dalam langkah halus)
+    coarse_unit = step * coarse_factor
+    coarse_max = int(max_change // coarse_unit)
+    for r in range(1, coarse_max + 1):
+        steps = shell(r)
+        if steps is None:
+            return _not_found(evaluated, pruned, truncated=True)
+        delta, _ = evaluate(steps, coarse_unit, engine)
+        if len(delta):
+            break
+    else:
+        return _not_found(evaluated, pruned)
+    bound = r * coarse_factor
+
+    # 2. Grid halus per kulit biaya, terhadap subset training yang mungkin jadi tetangga
+    radius = kth + 2 * bound * step * scale.max() + 1e-4
+    near = base_dist <= radius
+    local = KNNEngine(engine.X_train[near], engine.y_codes[near], engine.classes_, engine.k,
+                      engine.scale, engine.min_, weights=engine.weights, p=engine.p)
+    for r in range(1, bound + 1):
+        steps = shell(r)
+        if steps is None:
+            return _not_found(evaluated, pruned, truncated=True)
+        delta, probability = evaluate(steps, step, local)
+        if not len(delta):
+            continue
+        # Cek ulang dengan predictor asli (urut probabilitas target terbesar)
+        order = np.argsort(-probability, kind="stable")
+        features = base + delta[order]
+        probs = predictor.predict_proba(features)
+        ok = np.flatnonzero(_reaches(probs, target, n))
+        if len(ok):
+            i = ok[0]
+            return _target_report(probs[i], target, n, features[i], delta[order][i], evaluated, pruned)
+    return _not_found(evaluated, pruned)
+
+
+def _reaches(probs, target, n) -> np.ndarray:
+    """
+    Baris mana yang memasukkan target ke Top-N dengan probabilitas > 0. Kelas
+    berprobabilitas 0 bisa ikut mengisi Top-N (urut indeks) kalau kelas yang
+    bernilai kurang dari N, tapi itu tidak dihitung sebagai "masuk" -- sejalan
+    dengan pemangkasan yang membuang kandidat tanpa tetangga dari sekolah target.
+    """
+    return (probs[:, target] > 0) & (_ranks(probs, [target])[:, 0] <= n)
+
+
+def _norm(diff, p) -> np.ndarray:
+    """Jarak Minkowski sepanjang sumbu terakhir (sama seperti KNNEngine)"""
+    if p == 2:
+        return np.sqrt((diff * diff).sum(axis=-1))
+    return (np.abs(diff) ** p).sum(axis=-1) ** (1.0 / p)
+
+
+def _target_report(probs, target, n, features, delta, evaluated, pruned) -> TargetReport:
+    top_idx, top_probs = top_n(probs[None, :], n)
+    return TargetReport(
+        found=True,
+        delta=np.asarray(delta, dtype=np.float64),
+        features=np.asarray(features, dtype=np.float64),
+        rank=int(_ranks(probs[None, :], [target])[0, 0]),
+        probability=float(probs[target]),
+        top_idx=top_idx[0],
+        top_probs=top_probs[0],
+        evaluated=evaluated,
+        pruned=pruned,
+    )
+
+
+def _not_found(evaluated, pruned, truncated=False) -> TargetReport:
+    return TargetReport(False, None, None, None, None, None, None, evaluated, pruned, truncated)
@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson opsional: tanpa itu dipakai json bawaan (lebih lambat, hasil sama)
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack opsional: tanpa itu format biner menjawab 415
+    msgpack = None
+
+# ==========================================
+# FORMAT KIRIM DATA: JSON CEPAT & MSGPACK RINGKAS
+# ==========================================
+# JSON tetap format utama, tapi diserialisasi dengan orjson (kalau ada).
+# Klien dengan volume tinggi bisa memakai msgpack (Content-Type /
+# Accept: application/msgpack) dengan bentuk data tetap:
+#
+#   request /predict       : 20 angka [pkn_1..pkn_5, ind_1..ind_5, mat_1..mat_5, ipa_1..ipa_5]
+#                            (atau 4 x 5 bersarang, urutan sama)
+#   request /predict/batch : daftar berisi bentuk di atas, satu per siswa
+#   response (ringkas)     : {"model_version", "school_ids", "probabilities", "statistics"}
+#
+# school_ids adalah indeks ke tabel nama sekolah GET /schools (di-cache
+# klien per model_version), statistics = [avg_pkn, avg_ind, avg_mat, avg_ipa,
+# consistency_std, min_score]. Isinya diturunkan dari hasil JSON yang sama,
+# jadi angka & urutannya identik di kedua format.
+
+MSGPACK_TYPE = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK_TYPE, "application/x-msgpack")
+STAT_FIELDS = ("avg_pkn", "avg_ind", "avg_mat", "avg_ipa", "consistency_std", "min_score")
+
+
+def is_msgpack(content_type) -> bool:
+    return content_type is not None and content_type.split(";")[0].strip().lower() in MSGPACK_TYPES
+
+
+def accepts_msgpack(accept) -> bool:
+    return accept is not None and any(t in accept.lower() for t in MSGPACK_TYPES)
+
+
+def dumps_json(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(payload) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def decode_scores(body: bytes, n_subjects=4, n_semester=5, batch=False) -> np.ndarray:
+    """
+    Body msgpack -> array nilai (n_siswa, n_mapel, n_semester). ValueError kalau
+    bentuknya tidak tetap / ada nilai yang bukan angka 0-100.
+    """
+    try:
+        data = msgpack.unpackb(body, raw=False)
+        scores = np.asarray(data if batch else [data], dtype=np.float64)
+    except (ValueError, TypeError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as e:
+        raise ValueError(f"Body msgpack tidak valid: {e or type(e).__name__}")
+    per_student = n_subjects * n_semester
+    if scores.ndim < 2 or scores[0].size != per_student or scores.size != len(scores) * per_student:
+        raise ValueError(f"Setiap siswa harus berisi tepat {per_student} nilai ({n_subjects} mapel x {n_semester} semester).")
+    if not np.isfinite(scores).all():
+        raise ValueError("Nilai harus berupa angka.")
+    if ((scores < 0) | (scores > 100)).any():
+        raise ValueError("Nilai harus di antara 0 dan 100 (sama seperti body JSON).")
+    return scores.reshape(len(scores), n_subjects, n_semester)
+
+
+def compact_results(results, school_index, model_version, single=False) -> dict:
+    """Hasil per siswa (dict seperti JSON) -> bentuk kolom ringkas dengan ID sekolah"""
+    school_ids = [[school_index[rec["school_name"]] for rec in r["recommendations"]] for r in results]
+    probabilities = [[rec["probability"] for rec in r["recommendations"]] for r in results]
+    statistics = [[r["statistics"][field] for field in STAT_FIELDS] for r in results]
+    if single:
+        school_ids, probabilities, statistics = school_ids[0], probabilities[0], statistics[0]
+    return {
+        "model_version": model_version,
+        "school_ids": school_ids,
+        "probabilities": probabilities,
+        "statistics": statistics,
+    }
+
+
+class WireFormatMiddleware:
+    """
+    Middleware ASGI: request msgpack ke endpoint JSON diarahkan ke endpoint
+    pasangannya (`routes`: path JSON -> path msgpack), jadi URL yang dipakai
+    klien tetap sama dan yang memilih format cukup header Content-Type.
+    """
+
+    def __init__(self, inner, routes):
+        self.inner = inner
+        self.routes = dict(routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.routes:
+            for name, value in scope.get("headers", ()):
+                if name == b"content-type":
+                    if is_msgpack(value.decode("latin-1")):
+                        scope = {**scope, "path": self.routes[scope["path"]]}
+                    break
+        await self.inner(scope, receive, send)